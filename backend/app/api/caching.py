@@ -0,0 +1,71 @@
+"""
+ETag and conditional GET support for the read endpoints.
+
+ETags are strong: the data version plus everything else the response
+depends on (query parameters, representation, and for time filters the
+hourly bucket the window starts in, since the rollup answers in whole
+buckets). Responses are cacheable but must be revalidated after
+http_cache_max_age seconds; a matching If-None-Match gets an empty 304
+before any aggregate runs.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Response
+
+from ..config import get_settings
+from ..services.rollup import bucket_for
+
+
+def make_etag(version: int, *parts) -> str:
+    """
+    Build a strong ETag for a response.
+
+    Args:
+        version: Current data version (see get_data_version)
+        parts: Everything besides the data that selects the response body;
+            datetimes are reduced to their rollup bucket
+    """
+    key = [str(version)]
+    for part in parts:
+        if isinstance(part, datetime):
+            part = bucket_for(part).isoformat()
+        key.append(repr(part))
+
+    digest = hashlib.blake2b("|".join(key).encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def cache_headers(etag: str) -> dict:
+    """ETag and Cache-Control headers for a cacheable response."""
+    max_age = get_settings().http_cache_max_age
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}, must-revalidate",
+    }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def not_modified(if_none_match: Optional[str], etag: str, headers: Optional[dict] = None) -> Optional[Response]:
+    """
+    Return a 304 response if the client's copy is current, else None.
+
+    Args:
+        if_none_match: The request's If-None-Match header
+        etag: ETag of the current representation
+        headers: Extra headers to repeat on the 304 (e.g. Vary)
+    """
+    if not etag_matches(if_none_match, etag):
+        return None
+    return Response(status_code=304, headers={**cache_headers(etag), **(headers or {})})
@@ -1,82 +1,336 @@
-from datetime import datetime, timedelta
-from typing import Optional, Literal
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import AsyncIterator, Optional, Literal
+from fastapi import APIRouter, Depends, Header, Query, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import Integer, Select, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from ..database import get_db
-from ..models import Location, Mention, Post
-from ..schemas import HeatmapResponse, HeatmapFeature, GeoJSONPoint, HeatmapProperties
+from ..database import get_async_db, get_async_sessionmaker
+from ..models import Location
+from ..services.data_version import get_data_version
+from ..services.density import TILE_SIZE, kernel_radius, render_density_tile
+from ..services.geojson import CHUNK_FEATURES, feature_collection_stream
+from ..services.heatmap_columns import MEDIA_TYPE as HEATMAP_COLUMNS_TYPE, encode_heatmap_columns
+from ..services.result_cache import cache_key, get_result_cache
+from ..services.rollup import bucket_for, stats_subquery, window_start
+from ..services.spatial import in_bounds, within_bounds
+from ..services.tiles import CELLS_PER_TILE, CLUSTER_MAX_ZOOM, is_valid_tile, tile_bounds
+from ..schemas import (
+    HeatmapResponse,
+    GeoJSONPoint,
+    HeatmapTileResponse,
+    HeatmapTileFeature,
+    HeatmapTileProperties
+)
+from .caching import cache_headers, make_etag, not_modified
 
 router = APIRouter()
 
 
 def get_time_filter(time_range: str) -> Optional[datetime]:
-    """Convert time_range string to datetime filter."""
-    if time_range == "day":
-        return datetime.utcnow() - timedelta(days=1)
-    elif time_range == "week":
-        return datetime.utcnow() - timedelta(weeks=1)
-    return None  # "all" - no filter
+    """Convert time_range string to datetime filter, aligned to a rollup bucket."""
+    return window_start(time_range)  # None for "all"
+
+
+def heatmap_statement(
+    time_range: str = "all",
+    min_lat: Optional[float] = None,
+    max_lat: Optional[float] = None,
+    min_lng: Optional[float] = None,
+    max_lng: Optional[float] = None
+) -> Select:
+    """
+    Build the heatmap query, one row per location.
+
+    Rows are plain columns in the order heatmap_feature() expects,
+    so no ORM objects are built for them.
+    """
+    # Aggregate from the per-location rollup rather than the mentions table.
+    # Time filters only keep locations with mentions in range.
+    stats = stats_subquery(get_time_filter(time_range))
+    statement = select(
+        Location.id,
+        Location.name,
+        Location.lng,
+        Location.lat,
+        Location.place_type,
+        Location.city,
+        func.coalesce(stats.c.mention_count, 0).label("mention_count"),
+        func.coalesce(stats.c.sentiment_sum, 0.0).label("sentiment_sum")
+    )
+    if time_range == "all":
+        statement = statement.outerjoin(stats, stats.c.location_id == Location.id)
+    else:
+        statement = statement.join(stats, stats.c.location_id == Location.id)
+
+    # Apply geographic bounds filter through the geohash index
+    if None not in (min_lat, max_lat, min_lng, max_lng):
+        statement = statement.where(within_bounds(Location, min_lat, max_lat, min_lng, max_lng))
+
+    return statement
+
+
+async def stream_heatmap_async(
+    statement: Select,
+    session_factory: Optional[async_sessionmaker] = None
+) -> AsyncIterator[bytes]:
+    """
+    Run a heatmap query and yield its GeoJSON encoding in chunks.
+
+    The session is opened here rather than taken from get_async_db:
+    request dependencies are closed before a streamed body is sent, and
+    the rows are read from a server-side cursor while the response is
+    written.
+    """
+    async with (session_factory or get_async_sessionmaker())() as db:
+        result = await db.stream(statement)
+        async for chunk in feature_collection_stream(result.partitions(CHUNK_FEATURES)):
+            yield chunk
 
 
 @router.get("", response_model=HeatmapResponse)
-def get_heatmap_data(
+async def get_heatmap_data(
     time_range: Literal["all", "week", "day"] = Query("all", description="Time range filter"),
     min_lat: Optional[float] = Query(None, description="Minimum latitude for bounds"),
     max_lat: Optional[float] = Query(None, description="Maximum latitude for bounds"),
     min_lng: Optional[float] = Query(None, description="Minimum longitude for bounds"),
     max_lng: Optional[float] = Query(None, description="Maximum longitude for bounds"),
-    db: Session = Depends(get_db)
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get heatmap-ready GeoJSON data with aggregated location info.
 
     Returns locations with mention counts and average sentiment scores.
-    Optionally filter by time range and geographic bounds.
+    Optionally filter by time range and geographic bounds. The body is
+    streamed as it is encoded; it matches HeatmapResponse but skips
+    building and validating a model per feature.
+
+    Clients that accept the columnar media type (see heatmap_columns) get
+    the same points as typed arrays instead.
+
+    Encoded bodies are kept in the result cache until a change to a
+    location inside the bounds invalidates them.
     """
-    # Base query: aggregate mentions per location
-    query = db.query(
-        Location,
-        func.count(Mention.id).label("mention_count"),
-        func.coalesce(func.avg(Mention.sentiment_score), 0.0).label("avg_sentiment")
-    ).outerjoin(Mention)
-
-    # Apply time filter
-    time_cutoff = get_time_filter(time_range)
-    if time_cutoff:
-        query = query.filter(
-            (Mention.created_at >= time_cutoff) | (Mention.id.is_(None))
-        )
+    columns = bool(accept) and HEATMAP_COLUMNS_TYPE in accept
+    media_type = HEATMAP_COLUMNS_TYPE if columns else "application/json"
+    since = get_time_filter(time_range)
+    bounds = (min_lat, max_lat, min_lng, max_lng)
+    if None in bounds:
+        bounds = None
 
-    # Apply geographic bounds filter
-    if all([min_lat, max_lat, min_lng, max_lng]):
-        query = query.filter(
-            Location.lat >= min_lat,
-            Location.lat <= max_lat,
-            Location.lng >= min_lng,
-            Location.lng <= max_lng
-        )
+    version = await db.run_sync(get_data_version)
+    etag = make_etag(version, "heatmap", columns, time_range, since, bounds)
+    vary = {"Vary": "Accept"}
+    cached = not_modified(if_none_match, etag, vary)
+    if cached:
+        return cached
+    headers = {**cache_headers(etag), **vary}
+
+    cache = get_result_cache()
+    key = cache_key("heatmap", media_type, time_range, since and bucket_for(since).isoformat(), bounds)
+    body = await db.run_sync(cache.get, key, version, lambda changes: _touches_bounds(changes, bounds))
+    if body is not None:
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    statement = heatmap_statement(time_range, *(bounds or (None,) * 4))
+
+    if columns:
+        body = encode_heatmap_columns(await db.execute(statement))
+        await cache.put_async(key, version, body)
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    # Release the request session's connection; the stream opens its own
+    await db.close()
+    return StreamingResponse(
+        cache.storing_async(key, version, stream_heatmap_async(statement)),
+        media_type=media_type,
+        headers=headers
+    )
+
+
+def _touches_bounds(changes, bounds: Optional[tuple]) -> bool:
+    """Whether any changed location lies in the bounds (None: everywhere)."""
+    if bounds is None:
+        return True
+    return any(in_bounds(change.lat, change.lng, *bounds) for change in changes)
+
+
+@router.get("/tiles/{z}/{x}/{y}", response_model=HeatmapTileResponse)
+async def get_heatmap_tile(
+    z: int,
+    x: int,
+    y: int,
+    response: Response,
+    time_range: Literal["all", "week", "day"] = Query("all", description="Time range filter"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get heatmap GeoJSON for a single XYZ map tile.
+
+    Below the cluster zoom, locations sharing a grid cell are merged into
+    one feature with summed mention counts, so a tile holds at most
+    CELLS_PER_TILE squared features regardless of how many places it covers.
+    """
+    if not is_valid_tile(z, x, y):
+        raise HTTPException(status_code=404, detail="Tile not found")
+
+    since = get_time_filter(time_range)
+    etag = make_etag(await db.run_sync(get_data_version), "tile", z, x, y, time_range, since)
+    cached = not_modified(if_none_match, etag)
+    if cached:
+        return cached
+    response.headers.update(cache_headers(etag))
 
-    # Group by location
-    results = query.group_by(Location.id).all()
+    bounds = tile_bounds(z, x, y)
+
+    stats = stats_subquery(since)
+    mention_count = func.coalesce(stats.c.mention_count, 0)
+    sentiment_sum = func.coalesce(stats.c.sentiment_sum, 0.0)
+
+    # Half-open bounds so locations on a tile edge belong to exactly one tile
+    in_tile = (
+        within_bounds(Location, bounds.south, bounds.north, bounds.west, bounds.east),
+        Location.lng >= bounds.west,
+        Location.lng < bounds.east,
+        Location.lat > bounds.south,
+        Location.lat <= bounds.north
+    )
+
+    def with_stats(query):
+        if time_range == "all":
+            return query.outerjoin(stats, stats.c.location_id == Location.id)
+        return query.join(stats, stats.c.location_id == Location.id)
 
-    # Build GeoJSON features
     features = []
-    for location, mention_count, avg_sentiment in results:
-        # Only include locations with mentions (or all if no time filter)
-        if mention_count > 0 or time_range == "all":
-            feature = HeatmapFeature(
-                geometry=GeoJSONPoint(coordinates=[location.lng, location.lat]),
-                properties=HeatmapProperties(
-                    id=location.id,
-                    name=location.name,
-                    mention_count=mention_count,
-                    avg_sentiment=round(float(avg_sentiment), 2),
-                    place_type=location.place_type,
-                    city=location.city
-                )
-            )
-            features.append(feature)
-
-    return HeatmapResponse(features=features)
+
+    if z >= CLUSTER_MAX_ZOOM:
+        results = await db.execute(
+            with_stats(select(Location, mention_count, sentiment_sum)).where(*in_tile)
+        )
+
+        for location, count, total in results:
+            features.append(_tile_feature(location.lng, location.lat, count, total, location=location))
+
+        return HeatmapTileResponse(features=features)
+
+    # Aggregate locations into grid cells in the database
+    cell_x = cast((Location.lng - bounds.west) / ((bounds.east - bounds.west) / CELLS_PER_TILE), Integer)
+    cell_y = cast((bounds.north - Location.lat) / ((bounds.north - bounds.south) / CELLS_PER_TILE), Integer)
+
+    cells = (await db.execute(
+        with_stats(
+            select(
+                func.count(Location.id),
+                func.min(Location.id),
+                func.avg(Location.lng),
+                func.avg(Location.lat),
+                func.sum(mention_count),
+                func.sum(sentiment_sum)
+            ).select_from(Location)
+        ).where(*in_tile).group_by(cell_x, cell_y)
+    )).all()
+
+    # Cells holding a single location are returned as that location
+    single_ids = [location_id for point_count, location_id, *_ in cells if point_count == 1]
+    singles = {
+        location.id: location
+        for location in await db.scalars(select(Location).where(Location.id.in_(single_ids)))
+    } if single_ids else {}
+
+    for point_count, location_id, lng, lat, count, total in cells:
+        location = singles.get(location_id) if point_count == 1 else None
+        if location:
+            features.append(_tile_feature(location.lng, location.lat, count, total, location=location))
+        else:
+            features.append(_tile_feature(lng, lat, count, total, point_count=point_count))
+
+    return HeatmapTileResponse(features=features)
+
+
+@router.get(
+    "/density/{z}/{x}/{y}.png",
+    response_class=Response,
+    responses={200: {"content": {"image/png": {}}}}
+)
+async def get_density_tile(
+    z: int,
+    x: int,
+    y: int,
+    time_range: Literal["all", "week", "day"] = Query("all", description="Time range filter"),
+    weight: Literal["mentions", "sentiment"] = Query("mentions", description="Weight by mentions, or by mentions and sentiment"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the heatmap density of one XYZ map tile as a PNG raster.
+
+    The kernel density is computed here (see services.density), so the
+    map draws a raster layer instead of running a heatmap over every
+    point on the client.
+    """
+    if not is_valid_tile(z, x, y):
+        raise HTTPException(status_code=404, detail="Tile not found")
+
+    since = get_time_filter(time_range)
+    version = await db.run_sync(get_data_version)
+    etag = make_etag(version, "density", z, x, y, time_range, since, weight)
+    cached = not_modified(if_none_match, etag)
+    if cached:
+        return cached
+    headers = cache_headers(etag)
+
+    # Points up to one kernel radius outside the tile still blur into it
+    bounds = tile_bounds(z, x, y, buffer=kernel_radius(z) / TILE_SIZE)
+    area = (bounds.south, bounds.north, bounds.west, bounds.east)
+
+    cache = get_result_cache()
+    key = cache_key("density", z, x, y, time_range, since and since.isoformat(), weight)
+    body = await db.run_sync(cache.get, key, version, lambda changes: _touches_bounds(changes, area))
+    if body is None:
+        stats = stats_subquery(since)
+        rows = (await db.execute(
+            select(Location.lng, Location.lat, stats.c.mention_count, stats.c.sentiment_sum)
+            .join(stats, stats.c.location_id == Location.id)
+            .where(within_bounds(Location, *area))
+        )).all()
+        body = render_density_tile(rows, z, x, y, sentiment=weight == "sentiment")
+        await cache.put_async(key, version, body)
+
+    return Response(content=body, media_type="image/png", headers=headers)
+
+
+def _tile_feature(
+    lng: float,
+    lat: float,
+    mention_count: int,
+    sentiment_sum: float,
+    location: Optional[Location] = None,
+    point_count: int = 1
+) -> HeatmapTileFeature:
+    """Build a tile feature for a single location or a cluster."""
+    avg_sentiment = sentiment_sum / mention_count if mention_count else 0.0
+
+    if location:
+        properties = HeatmapTileProperties(
+            id=location.id,
+            name=location.name,
+            mention_count=mention_count,
+            avg_sentiment=round(float(avg_sentiment), 2),
+            place_type=location.place_type,
+            city=location.city
+        )
+    else:
+        properties = HeatmapTileProperties(
+            mention_count=mention_count,
+            avg_sentiment=round(float(avg_sentiment), 2),
+            cluster=True,
+            point_count=point_count
+        )
+
+    return HeatmapTileFeature(
+        geometry=GeoJSONPoint(coordinates=[lng, lat]),
+        properties=properties
+    )
@@ -1,73 +1,131 @@
-from datetime import datetime, timedelta
+import base64
+from datetime import datetime
 from typing import Optional, Literal
-from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy import func, or_
-from sqlalchemy.orm import Session
+import orjson
+from fastapi import APIRouter, Depends, Header, Query, HTTPException, Response
+from sqlalchemy import Select, and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 
-from ..database import get_db
-from ..models import Location, Mention, Post
+from ..database import get_async_db
+from ..models import Location, Mention
+from ..services.data_version import get_data_version
+from ..services.result_cache import cache_key, get_result_cache
+from ..services.rollup import bucket_for, stats_subquery, window_start
+from ..services.search_index import blend_scores, search_candidates
 from ..schemas import (
     LocationResponse,
     LocationDetail,
     LocationSearchResult,
-    MentionWithPost,
-    PostResponse
+    MentionPage,
+    MentionWithPost
 )
+from .caching import cache_headers, make_etag, not_modified
 
 router = APIRouter()
 
+RECENT_MENTIONS_LIMIT = 10
+
+# Candidates taken from the search index per requested result, by text
+# relevance and by popularity each, then ranked by blend_scores()
+SEARCH_CANDIDATE_FACTOR = 5
+
 
 def get_time_filter(time_range: str) -> Optional[datetime]:
-    """Convert time_range string to datetime filter."""
-    if time_range == "day":
-        return datetime.utcnow() - timedelta(days=1)
-    elif time_range == "week":
-        return datetime.utcnow() - timedelta(weeks=1)
-    return None
+    """Convert time_range string to datetime filter, aligned to a rollup bucket."""
+    return window_start(time_range)  # None for "all"
 
 
 @router.get("/search", response_model=list[LocationSearchResult])
-def search_locations(
+async def search_locations(
     q: str = Query(..., min_length=1, description="Search query"),
     time_range: Literal["all", "week", "day"] = Query("all", description="Time range filter"),
     limit: int = Query(20, ge=1, le=100, description="Maximum results to return"),
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Search locations by name, city, or state.
 
-    Returns matching locations with mention counts and sentiment scores.
+    Returns matching locations with mention counts and sentiment scores,
+    ranked by a blend of text relevance and mention count. Results are
+    kept in the result cache until a change to a location matching q
+    invalidates them.
     """
-    search_term = f"%{q}%"
+    since = get_time_filter(time_range)
 
-    # Base query with aggregation
-    query = db.query(
-        Location,
-        func.count(Mention.id).label("mention_count"),
-        func.coalesce(func.avg(Mention.sentiment_score), 0.0).label("avg_sentiment")
-    ).outerjoin(Mention)
-
-    # Apply search filter
-    query = query.filter(
-        or_(
-            Location.name.ilike(search_term),
-            Location.city.ilike(search_term),
-            Location.state.ilike(search_term),
-            Location.place_type.ilike(search_term)
-        )
+    version = await db.run_sync(get_data_version)
+    etag = make_etag(version, "search", q, time_range, since, limit)
+    cached = not_modified(if_none_match, etag)
+    if cached:
+        return cached
+
+    # Both search paths fold ASCII case (SQLite's LIKE folds nothing else)
+    cache = get_result_cache()
+    key = cache_key("search", q.lower() if q.isascii() else q, time_range, since and bucket_for(since).isoformat(), limit)
+    body = await db.run_sync(cache.get, key, version, lambda changes: _matches_query(changes, q))
+    if body is None:
+        results = await db.run_sync(find_locations, q, since, limit)
+        body = orjson.dumps([result.model_dump() for result in results])
+        await cache.put_async(key, version, body)
+
+    return Response(content=body, media_type="application/json", headers=cache_headers(etag))
+
+
+def _matches_query(changes, q: str) -> bool:
+    """Whether any changed location could match a search (ILIKE wildcards match anything)."""
+    if "%" in q or "_" in q:
+        return True
+    needle = q.strip().lower()
+    return any(
+        needle in (value or "").lower()
+        for change in changes
+        for value in (change.name, change.city, change.state, change.place_type)
     )
 
-    # Apply time filter
-    time_cutoff = get_time_filter(time_range)
-    if time_cutoff:
+
+def find_locations(db: Session, q: str, since: Optional[datetime], limit: int) -> list[LocationSearchResult]:
+    """Run a location search, best matches first, bypassing the result cache."""
+    # Fast path: trigram index lookup, then rank the candidates
+    candidates = search_candidates(db, q, limit * SEARCH_CANDIDATE_FACTOR, since)
+    if candidates is not None:
+        relevance = dict(candidates)
+        stats = stats_subquery(since, location_ids=relevance)
+        rows = db.query(
+            Location,
+            func.coalesce(stats.c.mention_count, 0).label("mention_count"),
+            func.coalesce(stats.c.sentiment_sum, 0.0).label("sentiment_sum")
+        ).outerjoin(stats, stats.c.location_id == Location.id).filter(
+            Location.id.in_(list(relevance))
+        ).all()
+
+        scores = blend_scores(relevance, {location.id: count for location, count, _ in rows})
+        results = sorted(rows, key=lambda row: scores[row[0].id], reverse=True)[:limit]
+
+    else:
+        search_term = f"%{q}%"
+
+        # Aggregate from the per-location rollup rather than the mentions table
+        stats = stats_subquery(since)
+        mention_count = func.coalesce(stats.c.mention_count, 0)
+        query = db.query(
+            Location,
+            mention_count.label("mention_count"),
+            func.coalesce(stats.c.sentiment_sum, 0.0).label("sentiment_sum")
+        ).outerjoin(stats, stats.c.location_id == Location.id)
+
+        # Apply search filter
         query = query.filter(
-            (Mention.created_at >= time_cutoff) | (Mention.id.is_(None))
+            or_(
+                Location.name.ilike(search_term),
+                Location.city.ilike(search_term),
+                Location.state.ilike(search_term),
+                Location.place_type.ilike(search_term)
+            )
         )
 
-    # Group and order by mention count
-    results = query.group_by(Location.id).order_by(
-        func.count(Mention.id).desc()
-    ).limit(limit).all()
+        # Order by mention count
+        results = query.order_by(mention_count.desc()).limit(limit).all()
 
     return [
         LocationSearchResult(
@@ -76,63 +134,38 @@ def search_locations(
             place_type=location.place_type,
             city=location.city,
             mention_count=mention_count,
-            avg_sentiment=round(float(avg_sentiment), 2)
+            avg_sentiment=round(sentiment_sum / mention_count, 2) if mention_count else 0.0
         )
-        for location, mention_count, avg_sentiment in results
+        for location, mention_count, sentiment_sum in results
     ]
 
 
 @router.get("/{location_id}", response_model=LocationDetail)
-def get_location(
+async def get_location(
     location_id: int,
-    db: Session = Depends(get_db)
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get detailed information about a specific location.
 
-    Includes recent mentions with post context.
+    Includes the most recent mentions with post context, plus a cursor
+    for paging through older ones via /{location_id}/mentions.
     """
-    # Get location with aggregated stats
-    result = db.query(
-        Location,
-        func.count(Mention.id).label("mention_count"),
-        func.coalesce(func.avg(Mention.sentiment_score), 0.0).label("avg_sentiment")
-    ).outerjoin(Mention).filter(
-        Location.id == location_id
-    ).group_by(Location.id).first()
+    etag = make_etag(await db.run_sync(get_data_version), "location", location_id)
+    cached = not_modified(if_none_match, etag)
+    if cached:
+        return cached
+    response.headers.update(cache_headers(etag))
+
+    result = (await db.execute(location_statement(location_id))).first()
 
     if not result:
         raise HTTPException(status_code=404, detail="Location not found")
 
-    location, mention_count, avg_sentiment = result
-
-    # Get recent mentions with post details
-    recent_mentions = db.query(Mention).join(Post).filter(
-        Mention.location_id == location_id
-    ).order_by(Mention.created_at.desc()).limit(10).all()
-
-    mentions_with_posts = []
-    for mention in recent_mentions:
-        post = db.query(Post).filter(Post.id == mention.post_id).first()
-        mentions_with_posts.append(
-            MentionWithPost(
-                id=mention.id,
-                location_id=mention.location_id,
-                post_id=mention.post_id,
-                sentiment_score=mention.sentiment_score,
-                context=mention.context,
-                created_at=mention.created_at,
-                post=PostResponse(
-                    id=post.id,
-                    reddit_id=post.reddit_id,
-                    title=post.title,
-                    body=post.body,
-                    subreddit=post.subreddit,
-                    posted_at=post.posted_at,
-                    scraped_at=post.scraped_at
-                )
-            )
-        )
+    location, mention_count, sentiment_sum = result
+    recent_mentions, next_cursor = await _mention_page(db, location_id, None, RECENT_MENTIONS_LIMIT)
 
     return LocationDetail(
         id=location.id,
@@ -144,6 +177,91 @@ def get_location(
         state=location.state,
         created_at=location.created_at,
         mention_count=mention_count,
-        avg_sentiment=round(float(avg_sentiment), 2),
-        recent_mentions=mentions_with_posts
+        avg_sentiment=round(sentiment_sum / mention_count, 2) if mention_count else 0.0,
+        recent_mentions=recent_mentions,
+        next_cursor=next_cursor
     )
+
+
+@router.get("/{location_id}/mentions", response_model=MentionPage)
+async def get_location_mentions(
+    location_id: int,
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page"),
+    limit: int = Query(RECENT_MENTIONS_LIMIT, ge=1, le=100, description="Mentions per page"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Page through a location's mentions, newest first.
+
+    Uses keyset pagination on (created_at, id), so deep pages cost the
+    same as the first one.
+    """
+    mentions, next_cursor = await _mention_page(db, location_id, cursor, limit)
+
+    if not mentions and await db.get(Location, location_id) is None:
+        raise HTTPException(status_code=404, detail="Location not found")
+
+    return MentionPage(mentions=mentions, next_cursor=next_cursor)
+
+
+def _encode_cursor(mention: Mention) -> str:
+    raw = f"{mention.created_at.isoformat()}|{mention.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, mention_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(mention_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def location_statement(location_id: int) -> Select:
+    """Build the query for a location with its aggregated stats from the rollup."""
+    stats = stats_subquery(location_ids=[location_id])
+    return select(
+        Location,
+        func.coalesce(stats.c.mention_count, 0).label("mention_count"),
+        func.coalesce(stats.c.sentiment_sum, 0.0).label("sentiment_sum")
+    ).outerjoin(stats, stats.c.location_id == Location.id).where(
+        Location.id == location_id
+    )
+
+
+def mention_page_statement(location_id: int, cursor: Optional[str], limit: int) -> Select:
+    """
+    Build the query for one page of mentions with their posts.
+
+    Fetches one extra row to learn whether another page exists.
+    """
+    statement = select(Mention).options(joinedload(Mention.post)).where(
+        Mention.location_id == location_id
+    )
+
+    if cursor:
+        created_at, mention_id = _decode_cursor(cursor)
+        statement = statement.where(
+            or_(
+                Mention.created_at < created_at,
+                and_(Mention.created_at == created_at, Mention.id < mention_id)
+            )
+        )
+
+    return statement.order_by(
+        Mention.created_at.desc(),
+        Mention.id.desc()
+    ).limit(limit + 1)
+
+
+async def _mention_page(
+    db: AsyncSession,
+    location_id: int,
+    cursor: Optional[str],
+    limit: int
+) -> tuple[list[MentionWithPost], Optional[str]]:
+    """Fetch one page of mentions with their posts in a single query."""
+    mentions = (await db.scalars(mention_page_statement(location_id, cursor, limit))).all()
+
+    next_cursor = _encode_cursor(mentions[limit - 1]) if len(mentions) > limit else None
+    return [MentionWithPost.model_validate(mention) for mention in mentions[:limit]], next_cursor
@@ -1,14 +1,127 @@
-from sqlalchemy import create_engine
+from typing import AsyncIterator, Optional
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from .config import get_settings
+from .config import Settings, get_settings
 
 settings = get_settings()
 
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False}  # SQLite specific
-)
+
+def sqlite_pragmas(settings: Settings) -> dict:
+    """Pragmas applied to every SQLite connection."""
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "mmap_size": settings.sqlite_mmap_size,
+        "cache_size": -settings.sqlite_cache_size_kb,  # Negative: KiB instead of pages
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+    }
+
+
+def create_db_engine(database_url: str, settings: Settings):
+    """
+    Create an engine for SQLite or Postgres, configured from settings.
+
+    SQLite connections get the pragmas from sqlite_pragmas(); Postgres
+    gets a connection pool sized by the db_pool_* settings.
+    """
+    url = make_url(database_url)
+
+    if url.get_backend_name() != "sqlite":
+        return create_engine(
+            url,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=True,
+        )
+
+    in_memory = url.database in (None, "", ":memory:")
+    pool_args = {} if in_memory else {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+    }
+    sqlite_engine = create_engine(
+        url,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": settings.sqlite_busy_timeout_ms / 1000,
+        },
+        **pool_args
+    )
+
+    pragmas = sqlite_pragmas(settings)
+
+    @event.listens_for(sqlite_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return sqlite_engine
+
+
+def async_url(database_url: str) -> URL:
+    """Database URL with the asyncio driver for its backend (aiosqlite or asyncpg)."""
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url.set(drivername="postgresql+asyncpg")
+
+
+def create_async_db_engine(database_url: str, settings: Settings) -> AsyncEngine:
+    """
+    Create an asyncio engine for the same database as create_db_engine().
+
+    Used by the read endpoints, so waiting on the database doesn't hold a
+    threadpool worker. Pool settings and SQLite pragmas match the sync engine.
+    """
+    url = async_url(database_url)
+
+    if url.get_backend_name() != "sqlite":
+        return create_async_engine(
+            url,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=True,
+        )
+
+    # aiosqlite opens a new connection (and thread) per checkout by default
+    in_memory = url.database in (None, "", ":memory:")
+    pool_args = {} if in_memory else {
+        "poolclass": AsyncAdaptedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+    }
+    sqlite_engine = create_async_engine(
+        url,
+        connect_args={"timeout": settings.sqlite_busy_timeout_ms / 1000},
+        **pool_args
+    )
+
+    pragmas = sqlite_pragmas(settings)
+
+    @event.listens_for(sqlite_engine.sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return sqlite_engine
+
+
+engine = create_db_engine(settings.database_url, settings)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -24,6 +137,92 @@ def get_db():
         db.close()
 
 
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    """
+    Get or create the asyncio session factory.
+
+    The async engine is created on first use, so scripts that only use
+    the sync engine don't need the asyncio driver installed.
+    """
+    global _async_session_factory
+    if _async_session_factory is None:
+        _async_session_factory = async_sessionmaker(
+            create_async_db_engine(settings.database_url, settings),
+            autoflush=False,
+            expire_on_commit=False
+        )
+    return _async_session_factory
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency for getting asyncio database sessions."""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+def dialect_insert(db):
+    """
+    Return the insert() construct for the session's dialect.
+
+    The SQLite and Postgres variants both support ON CONFLICT clauses
+    (on_conflict_do_nothing / on_conflict_do_update).
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
 def init_db():
     """Initialize the database tables."""
+    from . import models  # noqa: F401 - registers tables on Base.metadata
+
     Base.metadata.create_all(bind=engine)
+    upgrade_schema()
+
+
+# Indexes replaced by composite ones that lead with the same column
+SUPERSEDED_INDEXES = ["ix_mentions_location_id", "ix_location_stats_bucket_start"]
+
+
+def upgrade_schema():
+    """
+    Bring tables created by an older version up to date.
+
+    create_all() only creates missing tables, so add any new nullable
+    columns and indexes to existing ones (dropping the ones they replace),
+    then backfill derived data.
+    """
+    from .services.partitions import ensure_mention_partitions
+    from .services.search_index import ensure_search_index
+    from .services.spatial import backfill_geohashes
+
+    inspector = inspect(engine)
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+        for name in SUPERSEDED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    ensure_search_index(engine)
+    ensure_mention_partitions(engine)
+
+    db = SessionLocal()
+    try:
+        backfill_geohashes(db)
+    finally:
+        db.close()
@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from .api import api_router
 from .database import init_db
+from .services.result_cache import get_result_cache
 
 app = FastAPI(
     title="Scrapey",
@@ -42,5 +43,5 @@ def root():
 
 @app.get("/health")
 def health_check():
-    """Health check endpoint."""
-    return {"status": "healthy"}
+    """Health check endpoint, with this worker's result cache counters."""
+    return {"status": "healthy", "result_cache": get_result_cache().stats()}
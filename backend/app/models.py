@@ -1,8 +1,16 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Boolean, ForeignKey, Index, event
 from sqlalchemy.orm import relationship
 
 from .database import Base
+from .services.partitions import mention_table_args
+from .services.spatial import encode as encode_geohash
+
+
+def _location_geohash(context):
+    """Column default: geohash of the lat/lng being inserted."""
+    params = context.get_current_parameters()
+    return encode_geohash(params["lat"], params["lng"])
 
 
 class Location(Base):
@@ -16,13 +24,26 @@ class Location(Base):
     city = Column(String(100), index=True)
     state = Column(String(50), default="HI", index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    geohash = Column(String(12), default=_location_geohash)  # Spatial index key
 
     mentions = relationship("Mention", back_populates="location", cascade="all, delete-orphan")
+    stats = relationship("LocationStat", back_populates="location", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Bounding-box queries scan geohash ranges and filter on lat/lng in the index
+        Index("ix_locations_geohash_lat_lng", "geohash", "lat", "lng"),
+    )
 
     def __repr__(self):
         return f"<Location(name='{self.name}', city='{self.city}')>"
 
 
+@event.listens_for(Location, "before_update")
+def _update_location_geohash(mapper, connection, target):
+    """Keep the geohash in sync when a location is moved."""
+    target.geohash = encode_geohash(target.lat, target.lng)
+
+
 class Post(Base):
     __tablename__ = "posts"
 
@@ -43,15 +64,129 @@ class Post(Base):
 class Mention(Base):
     __tablename__ = "mentions"
 
-    id = Column(Integer, primary_key=True, index=True)
-    location_id = Column(Integer, ForeignKey("locations.id"), nullable=False, index=True)
+    id = Column(Integer, index=True, autoincrement=True)  # Primary key, see __table_args__
+    location_id = Column(Integer, ForeignKey("locations.id"), nullable=False)
     post_id = Column(Integer, ForeignKey("posts.id"), nullable=False, index=True)
     sentiment_score = Column(Float, default=0.0)  # -1.0 to 1.0
+    sentiment_version = Column(String(32), nullable=True)  # Scorer that produced it, null if unknown
     context = Column(Text)  # Snippet of text mentioning the location
     created_at = Column(DateTime, default=datetime.utcnow)
 
     location = relationship("Location", back_populates="mentions")
     post = relationship("Post", back_populates="mentions")
 
+    __table_args__ = (
+        # A location's mentions newest first (detail page, mention paging)
+        Index("ix_mentions_location_created", "location_id", "created_at", "id"),
+        # Mentions in a time window (rollup backfills, time-range scans)
+        Index("ix_mentions_created_location", "created_at", "location_id"),
+        # Primary key on id, or (id, created_at) when partitioned
+        *mention_table_args(),
+    )
+    __mapper_args__ = {"primary_key": [id]}
+
     def __repr__(self):
         return f"<Mention(location_id={self.location_id}, sentiment={self.sentiment_score})>"
+
+
+class LocationStat(Base):
+    """
+    Per-location mention rollup, one row per hourly time bucket.
+
+    Buckets older than rollup.HOURLY_RETENTION are folded into a single
+    row at rollup.ARCHIVE_BUCKET (see compact_stats()).
+    """
+    __tablename__ = "location_stats"
+
+    location_id = Column(Integer, ForeignKey("locations.id"), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)  # Start of the hour, or ARCHIVE_BUCKET
+    mention_count = Column(Integer, nullable=False, default=0)
+    sentiment_sum = Column(Float, nullable=False, default=0.0)
+
+    location = relationship("Location", back_populates="stats")
+
+    __table_args__ = (
+        # Covering index: time-filtered aggregates read only the recent range
+        Index(
+            "ix_location_stats_bucket_location",
+            "bucket_start", "location_id", "mention_count", "sentiment_sum"
+        ),
+    )
+
+    def __repr__(self):
+        return f"<LocationStat(location_id={self.location_id}, bucket={self.bucket_start}, count={self.mention_count})>"
+
+
+class ScrapeCursor(Base):
+    """High-water mark of a subreddit listing, so scrapes only fetch newer posts."""
+    __tablename__ = "scrape_cursors"
+
+    subreddit = Column(String(100), primary_key=True)  # Lowercased
+    listing = Column(String(20), primary_key=True)  # e.g. "new"
+    last_fullname = Column(String(20), nullable=False)  # Newest ingested post, e.g. "t3_abc123"
+    last_created_utc = Column(Float, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ScrapeCursor(subreddit='{self.subreddit}', listing='{self.listing}', last='{self.last_fullname}')>"
+
+
+class GeocodeCacheEntry(Base):
+    """Cached geocoder answer, including "not found" answers until they expire."""
+    __tablename__ = "geocode_cache"
+
+    query_key = Column(String(255), primary_key=True)  # Normalized query, see Geocoder.query_key
+    found = Column(Boolean, nullable=False)
+    lat = Column(Float, nullable=True)
+    lng = Column(Float, nullable=True)
+    address = Column(Text, nullable=True)  # JSON address components (reverse lookups)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=True)  # Null: never expires
+
+    def __repr__(self):
+        return f"<GeocodeCacheEntry(query_key='{self.query_key}', found={self.found})>"
+
+
+class PendingMention(Base):
+    """Mention of a location that is waiting to be geocoded."""
+    __tablename__ = "pending_mentions"
+
+    id = Column(Integer, primary_key=True)
+    geocode_key = Column(String(255), nullable=False, index=True)
+    name = Column(String(255), nullable=False)
+    place_type = Column(String(50), nullable=False)
+    city = Column(String(100))
+    state = Column(String(50))  # None for settings.default_state
+    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
+    sentiment_score = Column(Float, default=0.0)
+    sentiment_version = Column(String(32), nullable=True)
+    context = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<PendingMention(name='{self.name}', post_id={self.post_id})>"
+
+
+class DataVersion(Base):
+    """Counter bumped by every transaction that changes served data (ETags)."""
+    __tablename__ = "data_versions"
+
+    name = Column(String(50), primary_key=True)  # e.g. "mentions"
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DataVersion(name='{self.name}', version={self.version})>"
+
+
+class DataChange(Base):
+    """Locations changed by a data version bump; lets caches invalidate precisely."""
+    __tablename__ = "data_changes"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, index=True)
+    location_id = Column(Integer, nullable=True)  # Null: unknown, treat everything as changed
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<DataChange(version={self.version}, location_id={self.location_id})>"
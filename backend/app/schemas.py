@@ -49,6 +49,11 @@ class MentionWithPost(MentionResponse):
     post: PostResponse
 
 
+class MentionPage(BaseModel):
+    mentions: list[MentionWithPost]
+    next_cursor: Optional[str] = None  # None on the last page
+
+
 # Location schemas
 class LocationBase(BaseModel):
     name: str
@@ -75,6 +80,7 @@ class LocationDetail(LocationResponse):
     mention_count: int = 0
     avg_sentiment: float = 0.0
     recent_mentions: list[MentionWithPost] = []
+    next_cursor: Optional[str] = None  # Pass to /locations/{id}/mentions for older mentions
 
 
 # GeoJSON schemas for heatmap
@@ -103,6 +109,29 @@ class HeatmapResponse(BaseModel):
     features: list[HeatmapFeature]
 
 
+# Tiled heatmap schemas: features are single locations or grid clusters
+class HeatmapTileProperties(BaseModel):
+    id: Optional[int] = None  # None for clusters
+    name: Optional[str] = None
+    mention_count: int
+    avg_sentiment: float
+    place_type: Optional[str] = None
+    city: Optional[str] = None
+    cluster: bool = False
+    point_count: int = 1
+
+
+class HeatmapTileFeature(BaseModel):
+    type: str = "Feature"
+    geometry: GeoJSONPoint
+    properties: HeatmapTileProperties
+
+
+class HeatmapTileResponse(BaseModel):
+    type: str = "FeatureCollection"
+    features: list[HeatmapTileFeature]
+
+
 # Search response
 class LocationSearchResult(BaseModel):
     id: int
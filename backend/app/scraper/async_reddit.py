@@ -0,0 +1,571 @@
+"""
+Concurrent Reddit scraper using asyncio and httpx.
+
+Talks to the same JSON endpoints PRAW uses, so many subreddits and comment
+trees can be fetched at once. Every request goes through one shared
+RateLimiter, a token bucket that is corrected by the X-Ratelimit-* headers
+Reddit sends back, so concurrency never exceeds the API budget.
+
+The HTTP layer is a RedditFetcher; point HttpRedditFetcher at another
+base_url (and auth_url=None) to run against a local fake Reddit server.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from itertools import takewhile
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Protocol
+
+import httpx
+
+from ..config import get_settings
+from .cursors import Cursor, mark_partial_walk, reached
+
+LISTING_PAGE_SIZE = 100
+MAX_RETRIES = 3
+
+# Most "load more" ids Reddit expands per /api/morechildren call
+MORE_CHILDREN_BATCH = 100
+# Comment trees scrape_many() walks at once
+COMMENT_TREES_IN_FLIGHT = 4
+
+
+class RateLimiter:
+    """
+    Token bucket shared by all requests of a scraper.
+
+    Tokens refill at requests_per_minute / 60 per second up to burst.
+    Reddit reports the requests left in the current window and the seconds
+    until it resets; update_from_headers() never lets the bucket hold more
+    than that, and blocks everyone until the reset once the budget is spent.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: int = 10):
+        self.max_rate = requests_per_minute / 60.0
+        self.rate = self.max_rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Wait for a token. Waiters are served in arrival order."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def update_from_headers(self, headers):
+        """
+        Adjust the bucket to the budget reported by Reddit.
+
+        Args:
+            headers: Response headers (case-insensitive mapping)
+        """
+        remaining = headers.get("x-ratelimit-remaining")
+        reset = headers.get("x-ratelimit-reset")
+        if remaining is None or reset is None:
+            return
+
+        try:
+            remaining = float(remaining)
+            reset = float(reset)
+        except ValueError:
+            return
+
+        now = time.monotonic()
+        self._refill(now)
+
+        if remaining < 1:
+            self.tokens = 0.0
+            self.blocked_until = max(self.blocked_until, now + reset)
+            return
+
+        self.tokens = min(self.tokens, remaining)
+        # Spread what is left over the rest of the window
+        if reset > 0:
+            self.rate = min(self.max_rate, remaining / reset)
+        else:
+            self.rate = self.max_rate
+
+    def token_interval(self) -> float:
+        """Seconds between tokens at the current rate."""
+        return 1 / self.rate if self.rate > 0 else 1 / self.max_rate
+
+    def block_for(self, seconds: float):
+        """Stop handing out tokens for a while, e.g. after a 429."""
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class RedditFetcher(Protocol):
+    """Fetches Reddit JSON endpoints; swap in a fake for testing."""
+
+    async def get_json(self, path: str, params: Optional[dict] = None):
+        ...
+
+    async def aclose(self):
+        ...
+
+
+class HttpRedditFetcher:
+    """RedditFetcher using the OAuth API with an application-only token."""
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        user_agent: str,
+        rate_limiter: RateLimiter,
+        base_url: str = "https://oauth.reddit.com",
+        auth_url: Optional[str] = "https://www.reddit.com/api/v1/access_token",
+        max_connections: int = 16,
+        client: Optional[httpx.AsyncClient] = None
+    ):
+        """
+        Args:
+            client_id: Reddit app client id
+            client_secret: Reddit app client secret
+            user_agent: User agent sent with every request
+            rate_limiter: Limiter shared by all requests
+            base_url: API root, e.g. a local fake server
+            auth_url: Token endpoint, or None to send requests unauthenticated
+            max_connections: Maximum requests in flight
+            client: Optional preconfigured httpx client (e.g. with a mock transport)
+        """
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.auth_url = auth_url
+        self.rate_limiter = rate_limiter
+        self.client = client or httpx.AsyncClient(
+            base_url=base_url,
+            headers={"User-Agent": user_agent},
+            limits=httpx.Limits(max_connections=max_connections),
+            timeout=30.0,
+        )
+
+        self._token: Optional[str] = None
+        self._token_expires = 0.0
+        self._token_lock = asyncio.Lock()
+
+    async def _authorization(self) -> dict:
+        if self.auth_url is None:
+            return {}
+
+        async with self._token_lock:
+            if self._token is None or time.monotonic() >= self._token_expires:
+                response = await self.client.post(
+                    self.auth_url,
+                    auth=(self.client_id, self.client_secret),
+                    data={"grant_type": "client_credentials"},
+                )
+                response.raise_for_status()
+                payload = response.json()
+                self._token = payload["access_token"]
+                # Renew a minute early
+                self._token_expires = time.monotonic() + payload.get("expires_in", 3600) - 60
+
+        return {"Authorization": f"Bearer {self._token}"}
+
+    async def get_json(self, path: str, params: Optional[dict] = None):
+        """
+        GET a JSON endpoint, waiting for the rate limiter first.
+
+        Retries on 429 (after the reported reset) and on server errors.
+        """
+        params = {"raw_json": 1, **(params or {})}
+
+        for attempt in range(MAX_RETRIES + 1):
+            await self.rate_limiter.acquire()
+            response = await self.client.get(
+                path, params=params, headers=await self._authorization()
+            )
+            self.rate_limiter.update_from_headers(response.headers)
+
+            if response.status_code == 429 and attempt < MAX_RETRIES:
+                delay = _retry_after(response.headers)
+                if delay is None:
+                    delay = max(2 ** attempt, self.rate_limiter.token_interval())
+                self.rate_limiter.block_for(delay)
+                continue
+            if response.status_code == 401 and self.auth_url and attempt < MAX_RETRIES:
+                # Token revoked or expired early
+                self._token = None
+                continue
+            if response.status_code >= 500 and attempt < MAX_RETRIES:
+                await asyncio.sleep(2 ** attempt)
+                continue
+
+            response.raise_for_status()
+            return response.json()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+# Marks the end of the merged output of scrape_many()
+_DONE = object()
+
+
+class AsyncRedditScraper:
+    """Concurrent scraper yielding the same dictionaries as RedditScraper."""
+
+    def __init__(self, fetcher: RedditFetcher):
+        self.fetcher = fetcher
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.fetcher.aclose()
+
+    async def scrape_subreddit(
+        self,
+        subreddit_name: str,
+        limit: int = 100,
+        time_filter: str = "week"
+    ) -> AsyncIterator[dict]:
+        """
+        Scrape top posts from a subreddit, one listing page at a time.
+
+        Args:
+            subreddit_name: Name of the subreddit (without r/)
+            limit: Maximum number of posts to fetch
+            time_filter: Time filter for top posts (hour, day, week, month, year, all)
+
+        Yields:
+            Dictionary with post data
+        """
+        after = None
+        fetched = 0
+        while fetched < limit:
+            params = {"t": time_filter, "limit": min(LISTING_PAGE_SIZE, limit - fetched)}
+            if after:
+                params["after"] = after
+
+            listing = await self.fetcher.get_json(f"/r/{subreddit_name}/top", params)
+            data = listing["data"]
+            for child in data["children"]:
+                if child["kind"] != "t3":
+                    continue
+                fetched += 1
+                yield _submission_to_dict(child["data"])
+                if fetched >= limit:
+                    return
+
+            after = data.get("after")
+            if not after or not data["children"]:
+                return
+
+    async def _listing_page(self, path: str, params: dict) -> List[dict]:
+        listing = await self.fetcher.get_json(path, params)
+        return [
+            _submission_to_dict(child["data"])
+            for child in listing["data"]["children"]
+            if child["kind"] == "t3"
+        ]
+
+    async def scrape_new(
+        self,
+        subreddit_name: str,
+        cursor: Optional[Cursor] = None,
+        limit: int = 100
+    ) -> AsyncIterator[dict]:
+        """
+        Scrape posts newer than a cursor from a subreddit's new listing.
+
+        Same paging as RedditScraper.scrape_new: forward from the cursor
+        with "before" (oldest first), falling back to a walk down from the
+        newest post when the cursor post no longer exists. A walk cut off by
+        the limit only moves the cursor to its oldest post.
+
+        Args:
+            subreddit_name: Name of the subreddit (without r/)
+            cursor: Newest post already ingested, or None
+            limit: Maximum number of posts to fetch
+
+        Yields:
+            Dictionary with post data, oldest first
+        """
+        path = f"/r/{subreddit_name}/new"
+
+        if cursor is not None:
+            before = cursor.fullname
+            fetched = 0
+            while fetched < limit:
+                page_size = min(LISTING_PAGE_SIZE, limit - fetched)
+                page = await self._listing_page(path, {"before": before, "limit": page_size})
+                # Pages are newest first
+                for post in reversed(page):
+                    yield post
+                fetched += len(page)
+                if len(page) < page_size:
+                    break
+                before = page[0]["fullname"]
+
+            if fetched:
+                return
+
+        # No cursor, nothing new, or a deleted cursor post: walk down from the newest
+        posts = []
+        after = None
+        while len(posts) < limit:
+            page_size = min(LISTING_PAGE_SIZE, limit - len(posts))
+            params = {"limit": page_size}
+            if after:
+                params["after"] = after
+            page = await self._listing_page(path, params)
+
+            unseen = list(takewhile(lambda post: not reached(post, cursor), page))
+            posts.extend(unseen)
+            if len(unseen) < len(page) or len(page) < page_size:
+                break
+            after = page[-1]["fullname"]
+        else:
+            # Cut off by the limit above older unfetched posts
+            mark_partial_walk(posts)
+
+        for post in reversed(posts):
+            yield post
+
+    async def scrape_comments(
+        self,
+        submission_id: str,
+        subreddit: str,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[dict]:
+        """
+        Walk a submission's comment tree breadth-first, yielding comments as they arrive.
+
+        "Load more" stubs are queued like comments and only expanded when
+        the walk reaches them, at most MORE_CHILDREN_BATCH ids per request.
+        Besides unexpanded stubs (ids only), memory holds just the part of
+        the last response not yielded yet, however large the thread is.
+
+        Args:
+            submission_id: Submission id (without the t3_ prefix)
+            subreddit: Subreddit name stored with each comment
+            limit: Maximum number of comments to yield (None for all)
+
+        Yields:
+            Comment dictionaries, parents before replies
+        """
+        _, comment_listing = await self.fetcher.get_json(f"/comments/{submission_id}")
+        queue = deque(comment_listing["data"]["children"])
+        del comment_listing
+
+        yielded = 0
+        while queue and (limit is None or yielded < limit):
+            child = queue.popleft()
+            if child["kind"] == "more":
+                queue.extend(await self._expand_more(submission_id, child["data"]))
+                continue
+            if child["kind"] != "t1":
+                continue
+
+            data = child["data"]
+            replies = data.get("replies")
+            if replies:
+                queue.extend(replies["data"]["children"])
+            yield _comment_to_dict(data, subreddit)
+            yielded += 1
+
+    async def _expand_more(self, submission_id: str, more: dict) -> List[dict]:
+        """Fetch the children of a "load more" stub, re-queuing ids left over."""
+        ids = more.get("children") or []
+
+        if not ids:
+            # "Continue this thread": the parent's replies only come with a
+            # listing rooted at the parent
+            parent_id = more["parent_id"].split("_", 1)[1]
+            _, listing = await self.fetcher.get_json(f"/comments/{submission_id}", {"comment": parent_id})
+            children = []
+            for parent in listing["data"]["children"]:
+                replies = parent["data"].get("replies") if parent["kind"] == "t1" else None
+                if replies:
+                    children.extend(replies["data"]["children"])
+            return children
+
+        response = await self.fetcher.get_json("/api/morechildren", {
+            "api_type": "json",
+            "link_id": f"t3_{submission_id}",
+            "children": ",".join(ids[:MORE_CHILDREN_BATCH]),
+        })
+        # Flat list of comments and stubs, each after its parent
+        children = response["json"]["data"]["things"]
+        if len(ids) > MORE_CHILDREN_BATCH:
+            children.append({"kind": "more", "data": {**more, "children": ids[MORE_CHILDREN_BATCH:]}})
+        return children
+
+    async def scrape_many(
+        self,
+        subreddits: Iterable[str],
+        limit: int = 100,
+        time_filter: str = "week",
+        include_comments: bool = False,
+        cursors: Optional[Dict[str, Cursor]] = None,
+        queue_size: int = 1000,
+        max_comments: Optional[int] = None,
+        comment_trees: int = COMMENT_TREES_IN_FLIGHT
+    ) -> AsyncIterator[dict]:
+        """
+        Scrape several subreddits (and optionally comments) concurrently.
+
+        Results are yielded as they arrive, interleaved across subreddits.
+        The internal queue is bounded, so fetching pauses while the consumer
+        is busy (e.g. writing a batch to the database). Comment trees are
+        streamed (see scrape_comments), comment_trees at a time, so memory
+        stays bounded even for megathreads.
+
+        Args:
+            subreddits: Subreddit names (without r/)
+            limit: Maximum posts per subreddit
+            time_filter: Time filter for top posts
+            include_comments: Also fetch each post's comment tree
+            cursors: If given, fetch only posts newer than these cursors (keyed
+                by lowercased subreddit) from the new listing instead of top posts
+            queue_size: Maximum results buffered ahead of the consumer
+            max_comments: Maximum comments per post (None for all)
+            comment_trees: Comment trees walked at once
+
+        Yields:
+            Post and comment dictionaries
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        trees = asyncio.Semaphore(comment_trees)
+
+        async def fetch_comments(post: dict):
+            async with trees:
+                async for comment in self.scrape_comments(post["reddit_id"], post["subreddit"], limit=max_comments):
+                    await queue.put(comment)
+
+        async def crawl(subreddit: str, tasks: asyncio.TaskGroup):
+            if cursors is None:
+                posts = self.scrape_subreddit(subreddit, limit=limit, time_filter=time_filter)
+            else:
+                posts = self.scrape_new(subreddit, cursors.get(subreddit.lower()), limit=limit)
+
+            async for post in posts:
+                await queue.put(post)
+                if include_comments and post.get("num_comments"):
+                    tasks.create_task(fetch_comments(post))
+
+        async def produce():
+            try:
+                async with asyncio.TaskGroup() as tasks:
+                    for subreddit in subreddits:
+                        tasks.create_task(crawl(subreddit, tasks))
+            finally:
+                await queue.put(_DONE)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (item := await queue.get()) is not _DONE:
+                yield item
+            # Re-raise fetch errors
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+                try:
+                    await producer
+                except asyncio.CancelledError:
+                    pass
+
+
+def _retry_after(headers) -> Optional[float]:
+    """
+    Seconds to wait after a 429, from the reset or Retry-After header.
+
+    Retry-After may be a number of seconds or an HTTP date. Headers that
+    don't parse (or give a negative or infinite wait) are ignored.
+
+    Returns:
+        Seconds to wait, or None if no header gives a usable value
+    """
+    reset = headers.get("x-ratelimit-reset")
+    retry_after = headers.get("retry-after")
+    for value in (reset, retry_after):
+        if not value:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                continue
+        if math.isfinite(seconds):
+            return max(0.0, seconds)
+    return None
+
+
+def _submission_to_dict(data: dict) -> dict:
+    """Convert a listing's t3 data to the RedditScraper dictionary."""
+    return {
+        "reddit_id": data["id"],
+        "fullname": data.get("name") or f"t3_{data['id']}",
+        "title": data["title"],
+        "body": data.get("selftext") or "",
+        "subreddit": data["subreddit"],
+        "posted_at": datetime.utcfromtimestamp(data["created_utc"]),
+        "created_utc": data["created_utc"],
+        "score": data.get("score", 0),
+        "num_comments": data.get("num_comments", 0),
+        "url": data.get("url"),
+        "is_comment": False,
+    }
+
+
+def _comment_to_dict(data: dict, subreddit: str) -> dict:
+    """Convert t1 data to the RedditScraper dictionary."""
+    return {
+        "reddit_id": data["id"],
+        "title": None,
+        "body": data.get("body") or "",
+        "subreddit": subreddit,
+        "posted_at": datetime.utcfromtimestamp(data["created_utc"]),
+        "score": data.get("score", 0),
+        "is_comment": True,
+    }
+
+
+def create_async_scraper() -> Optional[AsyncRedditScraper]:
+    """
+    Create a concurrent Reddit scraper from settings.
+
+    Returns None if credentials are not configured (unless reddit_auth_url
+    is empty, e.g. for a local fake server).
+    """
+    settings = get_settings()
+    auth_url = settings.reddit_auth_url or None
+
+    if auth_url and (not settings.reddit_client_id or not settings.reddit_client_secret):
+        return None
+
+    fetcher = HttpRedditFetcher(
+        client_id=settings.reddit_client_id,
+        client_secret=settings.reddit_client_secret,
+        user_agent=settings.reddit_user_agent,
+        rate_limiter=RateLimiter(settings.reddit_requests_per_minute),
+        base_url=settings.reddit_api_url,
+        auth_url=auth_url,
+        max_connections=settings.reddit_max_connections,
+    )
+    return AsyncRedditScraper(fetcher)
@@ -0,0 +1,103 @@
+"""
+Per-subreddit high-water marks for incremental scraping.
+
+The scrape_cursors table remembers the newest post ingested from each
+subreddit listing. Scrapers walk the "new" listing from that cursor and
+stop at already-ingested content, so a run only fetches what was posted
+since the last one. Cursors advance in the same transaction as the posts
+they cover (see IngestPipeline), so an interrupted run resumes without gaps.
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..database import dialect_insert
+from ..models import ScrapeCursor
+
+NEW_LISTING = "new"
+
+# Set on posts of a newest-first walk that the limit cut off, all but the
+# oldest: the posts are ingested, but the cursor only moves to the oldest
+# one, so the next run pages forward over everything above it
+PARTIAL_WALK = "partial_walk"
+
+
+class Cursor(NamedTuple):
+    """Newest ingested post of a listing."""
+    fullname: str  # e.g. "t3_abc123"
+    created_utc: float
+
+
+def load_cursors(db: Session, listing: str = NEW_LISTING) -> Dict[str, Cursor]:
+    """
+    Load the cursors of a listing.
+
+    Returns:
+        Dictionary of lowercased subreddit name -> Cursor
+    """
+    rows = db.execute(
+        select(ScrapeCursor.subreddit, ScrapeCursor.last_fullname, ScrapeCursor.last_created_utc)
+        .where(ScrapeCursor.listing == listing)
+    )
+    return {subreddit: Cursor(fullname, created_utc) for subreddit, fullname, created_utc in rows}
+
+
+def mark_partial_walk(posts: List[dict]):
+    """Keep the cursor at the oldest of a cut-off walk's posts (newest first), in place."""
+    for post in posts[:-1]:
+        post[PARTIAL_WALK] = True
+
+
+def reached(post: dict, cursor: Optional[Cursor]) -> bool:
+    """Whether a post (newest-first walk) is at or past the cursor."""
+    if cursor is None:
+        return False
+    return post["fullname"] == cursor.fullname or post["created_utc"] < cursor.created_utc
+
+
+def advance_cursors(db: Session, posts: Iterable[dict], listing: str = NEW_LISTING) -> int:
+    """
+    Move cursors forward to the newest of the given posts.
+
+    Comments and PARTIAL_WALK posts are ignored, and a cursor never moves
+    backwards. Does not commit.
+
+    Args:
+        db: Session holding the transaction that ingests the posts
+        posts: Scraped post dictionaries
+        listing: Listing the posts were fetched from
+
+    Returns:
+        Number of subreddits whose cursor was written
+    """
+    newest = {}
+    for post in posts:
+        if post.get("is_comment") or post.get(PARTIAL_WALK) or "created_utc" not in post:
+            continue
+        key = post["subreddit"].lower()
+        if key not in newest or post["created_utc"] > newest[key]["last_created_utc"]:
+            newest[key] = {
+                "subreddit": key,
+                "listing": listing,
+                "last_fullname": post["fullname"],
+                "last_created_utc": post["created_utc"],
+            }
+
+    if not newest:
+        return 0
+
+    table = ScrapeCursor.__table__
+    stmt = dialect_insert(db)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.subreddit, table.c.listing],
+        set_={
+            "last_fullname": stmt.excluded.last_fullname,
+            "last_created_utc": stmt.excluded.last_created_utc,
+            "updated_at": stmt.excluded.updated_at,
+        },
+        where=stmt.excluded.last_created_utc > table.c.last_created_utc,
+    )
+    db.execute(stmt, list(newest.values()))
+    return len(newest)
@@ -2,169 +2,258 @@
 Location extraction from text using pattern matching and NLP.
 
 Uses a combination of:
-1. Known Hawaii locations list
+1. Known places from the gazetteer (app.services.gazetteer)
 2. Pattern matching for common phrases
 3. spaCy NER for general place names (optional)
 """
 
 import re
-from typing import List, Tuple, Optional
-
-
-# Known Hawaii locations - restaurants, beaches, landmarks, etc.
-KNOWN_LOCATIONS = {
-    # Restaurants - Oahu
-    "rainbow drive-in": ("restaurant", "Honolulu", 21.2761, -157.8141),
-    "helena's hawaiian food": ("restaurant", "Honolulu", 21.3180, -157.8653),
-    "leonard's bakery": ("restaurant", "Honolulu", 21.2853, -157.8185),
-    "marukame udon": ("restaurant", "Honolulu", 21.2812, -157.8286),
-    "side street inn": ("restaurant", "Honolulu", 21.2970, -157.8432),
-    "ono seafood": ("restaurant", "Honolulu", 21.2770, -157.8152),
-    "giovanni's shrimp truck": ("restaurant", "Kahuku", 21.6836, -157.9436),
-    "ted's bakery": ("restaurant", "Haleiwa", 21.6478, -158.0631),
-    "matsumoto shave ice": ("restaurant", "Haleiwa", 21.5922, -158.1032),
-    "duke's waikiki": ("restaurant", "Honolulu", 21.2766, -157.8263),
-
-    # Restaurants - Maui
-    "mama's fish house": ("restaurant", "Paia", 20.9369, -156.3456),
-    "tin roof maui": ("restaurant", "Kahului", 20.8893, -156.4729),
-    "ululani's shave ice": ("restaurant", "Lahaina", 20.8783, -156.6825),
-
-    # Restaurants - Big Island
-    "cafe 100": ("restaurant", "Hilo", 19.7114, -155.0850),
-    "ken's house of pancakes": ("restaurant", "Hilo", 19.7222, -155.0839),
-
-    # Beaches - Oahu
-    "waikiki beach": ("beach", "Honolulu", 21.2766, -157.8278),
-    "lanikai beach": ("beach", "Kailua", 21.3920, -157.7150),
-    "kailua beach": ("beach", "Kailua", 21.4022, -157.7267),
-    "hanauma bay": ("beach", "Honolulu", 21.2690, -157.6940),
-    "sunset beach": ("beach", "Haleiwa", 21.6761, -158.0431),
-    "waimea bay": ("beach", "Haleiwa", 21.6422, -158.0656),
-    "north shore": ("beach", "Haleiwa", 21.6400, -158.0500),
-    "ala moana beach": ("beach", "Honolulu", 21.2890, -157.8500),
-
-    # Beaches - Maui
-    "kaanapali beach": ("beach", "Lahaina", 20.9261, -156.6944),
-    "wailea beach": ("beach", "Wailea", 20.6867, -156.4422),
-    "big beach": ("beach", "Makena", 20.6306, -156.4461),
-    "makena beach": ("beach", "Makena", 20.6306, -156.4461),
-    "ho'okipa beach": ("beach", "Paia", 20.9350, -156.3569),
-
-    # Beaches - Big Island
-    "hapuna beach": ("beach", "Waimea", 19.9889, -155.8261),
-    "punalu'u black sand beach": ("beach", "Pahala", 19.1361, -155.5047),
-
-    # Beaches - Kauai
-    "poipu beach": ("beach", "Poipu", 21.8769, -159.4583),
-    "hanalei bay": ("beach", "Hanalei", 22.2067, -159.5008),
-
-    # Parks/Hikes - Oahu
-    "diamond head": ("park", "Honolulu", 21.2614, -157.8056),
-    "manoa falls": ("park", "Honolulu", 21.3331, -157.8025),
-    "koko head": ("park", "Honolulu", 21.2781, -157.6972),
-    "pillbox hike": ("park", "Kailua", 21.3867, -157.7419),
-    "makapuu lighthouse": ("park", "Waimanalo", 21.3108, -157.6500),
-
-    # Parks/Hikes - Maui
-    "haleakala": ("park", "Kula", 20.7097, -156.1731),
-    "iao valley": ("park", "Wailuku", 20.8833, -156.5431),
-    "road to hana": ("attraction", "Hana", 20.7575, -155.9903),
-
-    # Parks/Hikes - Big Island
-    "hawaii volcanoes national park": ("park", "Volcano", 19.4194, -155.2878),
-    "akaka falls": ("park", "Honomu", 19.8536, -155.1522),
-
-    # Parks/Hikes - Kauai
-    "na pali coast": ("park", "Kauai", 22.1833, -159.6500),
-    "waimea canyon": ("park", "Waimea", 22.0728, -159.6603),
-    "kalalau trail": ("park", "Kauai", 22.2153, -159.5839),
-
-    # Entertainment/Attractions
-    "pearl harbor": ("attraction", "Honolulu", 21.3650, -157.9683),
-    "polynesian cultural center": ("attraction", "Laie", 21.6392, -157.9231),
-    "dole plantation": ("attraction", "Wahiawa", 21.5250, -158.0389),
-    "aulani disney resort": ("resort", "Ko Olina", 21.3400, -158.1300),
-}
+from typing import Dict, List, NamedTuple, Tuple, Optional
+
+from ..services.gazetteer import Gazetteer, get_gazetteer, normalize_text
+
+
+# Words introducing a place name ("went to ...", "recommend ...")
+TRIGGERS = ("at", "to", "from", "near", "visited", "went to", "tried", "love", "recommend")
+# Triggers that also introduce names without a PLACE_SUFFIXES word
+SHORT_TRIGGERS = ("at", "to", "from", "near", "visited", "went to")
+PLACE_SUFFIXES = (
+    "beach", "restaurant", "cafe", "grill", "inn", "bar", "bakery",
+    "falls", "trail", "bay", "point", "park", "resort",
+)
+MAX_NAME_WORDS = 6
+
+# Words that may follow a trigger but never start a name
+COMMON_WORDS = {"the", "a", "an", "this", "that", "it"}
+
+_WORD = r"[a-z][a-z'\-]*+"
+_SPLIT_WORDS = re.compile(r"\S+")
+
+
+def _alternation(words) -> str:
+    # Longest first, so no word is cut short by one of its prefixes
+    return "|".join(re.escape(word).replace(r"\ ", r"\s+") for word in sorted(words, key=len, reverse=True))
+
+
+class LocationMatch(NamedTuple):
+    """A location mention with its character offsets in the source text."""
+    name: str
+    place_type: str
+    city: Optional[str]
+    state: Optional[str]
+    lat: Optional[float]
+    lng: Optional[float]
+    start: int
+    end: int
+
+
+class LocationSpan(NamedTuple):
+    """Where a location is mentioned: character offsets and canonical id."""
+    start: int
+    end: int
+    # Lowercased canonical name, shared by all aliases of a place
+    key: str
 
 
 class LocationExtractor:
     """Extract location mentions from text."""
 
-    def __init__(self):
-        # Compile patterns for location mentions
-        self.patterns = [
-            r"(?:at|to|from|near|visited?|went to|tried|love|recommend)\s+([A-Z][a-zA-Z'\-\s]+(?:Beach|Restaurant|Cafe|Grill|Inn|Bar|Bakery|Falls|Trail|Bay|Point|Park|Resort))",
-            r"(?:at|to|from|near|visited?|went to)\s+([A-Z][a-zA-Z'\-\s]{2,30})",
-        ]
-        self.compiled_patterns = [re.compile(p, re.IGNORECASE) for p in self.patterns]
+    def __init__(self, gazetteer: Optional[Gazetteer] = None):
+        """
+        Args:
+            gazetteer: Known places (default: shared instance)
+        """
+        # Phrases naming a place, e.g. "went to Sandy Beach", merged into one
+        # regex that tries the suffixed form first at each trigger. Words
+        # are matched possessively and names are at most MAX_NAME_WORDS long,
+        # so a failed attempt costs a few steps instead of backtracking
+        # through the rest of the text.
+        self.pattern = re.compile(
+            rf"\b(?:"
+            rf"(?:{_alternation(TRIGGERS)})\s++(?P<suffixed>(?:{_WORD}\s++){{1,{MAX_NAME_WORDS - 1}}}(?:{_alternation(PLACE_SUFFIXES)})\b)"
+            rf"|(?:{_alternation(SHORT_TRIGGERS)})\s++(?P<short>[a-z][a-z'\-\s]{{2,30}}+)"
+            rf")",
+            re.IGNORECASE
+        )
+        # Cheap pre-filter: most texts have no trigger followed by a word
+        self.trigger_filter = re.compile(rf"\b(?:{_alternation(TRIGGERS)})\s+[a-z]", re.IGNORECASE)
+
+        # Shards are opened on first use, not when the extractor is created
+        self.gazetteer = gazetteer or get_gazetteer()
+
+    def candidate_spans(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Find place names introduced by a trigger phrase ("went to ...").
+
+        Unknown candidates are sent to the geocoder, so captures are cut
+        down to the name they start with: leading lowercase and common
+        words are dropped ("my favorite Sandy Beach"), a capture without
+        a PLACE_SUFFIXES word keeps only its capitalized words ("Kona
+        Brewing today"), and one with a suffix needs a word before it.
+        Captures with nothing left ("the store with my mom") are skipped.
+
+        Args:
+            text: Original text
 
-    def extract(self, text: str) -> List[Tuple[str, str, str, float, float]]:
+        Returns:
+            (start, end) offsets of each candidate name in order
         """
-        Extract location mentions from text.
+        first = self.trigger_filter.search(text)
+        if first is None:
+            return []
+
+        spans = []
+        for found in self.pattern.finditer(text, first.start()):
+            suffixed = found.start("suffixed") >= 0
+            start, end = found.span("suffixed" if suffixed else "short")
+            # Most captures in run-on text are lowercase words only
+            if text[start:end].islower():
+                continue
+            words = [word.span() for word in _SPLIT_WORDS.finditer(text, start, end)]
+
+            while words and (
+                not _capitalized(text, *words[0]) or text[words[0][0]:words[0][1]].lower() in COMMON_WORDS
+            ):
+                words.pop(0)
+            if suffixed:
+                if len(words) < 2:
+                    continue
+            else:
+                proper = 0
+                while proper < min(len(words), MAX_NAME_WORDS) and _capitalized(text, *words[proper]):
+                    proper += 1
+                if not proper:
+                    continue
+                words = words[:proper]
+
+            spans.append((words[0][0], words[-1][1]))
+        return spans
+
+    def extract_matches(self, text: str) -> List[LocationMatch]:
+        """
+        Extract every location occurrence from text, with offsets.
+
+        Known locations are matched on word boundaries, preferring the
+        longest name where candidates overlap, and aliases are reported
+        under their gazetteer name.
 
         Args:
             text: Text to search for location mentions
 
         Returns:
-            List of tuples: (name, place_type, city, lat, lng)
+            List of LocationMatch tuples sorted by start offset. Unknown
+            locations found by pattern matching have no type, state or
+            coordinates.
         """
         if not text:
             return []
 
-        found_locations = []
-        text_lower = text.lower()
-
-        # First, check for known locations
-        for name, (place_type, city, lat, lng) in KNOWN_LOCATIONS.items():
-            if name in text_lower:
-                found_locations.append((name.title(), place_type, city, lat, lng))
-
-        # Then try pattern matching for unknown locations
-        for pattern in self.compiled_patterns:
-            matches = pattern.findall(text)
-            for match in matches:
-                normalized = match.strip().lower()
-                # Skip if already found in known locations
-                if normalized not in KNOWN_LOCATIONS:
-                    # Skip common words
-                    if normalized not in ["the", "a", "an", "this", "that", "it"]:
-                        # These would need geocoding - return without coordinates
-                        found_locations.append((match.strip(), "unknown", None, None, None))
-
-        return found_locations
-
-    def extract_context(self, text: str, location_name: str, window: int = 100) -> str:
+        matches = []
+        text_lower = normalize_text(text)
+
+        # First, scan for known locations
+        for match in self.gazetteer.find(text_lower):
+            matches.append(LocationMatch(*match.place, match.start, match.end))
+
+        known_spans = [(m.start, m.end) for m in matches]
+
+        # Then try pattern matching for unknown locations, from the first trigger on
+        for start, end in self.candidate_spans(text):
+            name = text[start:end]
+            normalized = text_lower[start:end]
+            # Skip if already found in known locations
+            if self.gazetteer.lookup(normalized) is not None:
+                continue
+            if any(start < known_end and known_start < end for known_start, known_end in known_spans):
+                continue
+            # These would need geocoding - return without coordinates
+            matches.append(LocationMatch(name, "unknown", None, None, None, None, start, end))
+
+        matches.sort(key=lambda m: m.start)
+        return matches
+
+    def extract_spans(self, text: str) -> Tuple[List[Tuple[str, str, str, str, float, float]], List[LocationSpan]]:
         """
-        Extract text context around a location mention.
+        Extract location mentions from text, with every place they occur.
 
         Args:
-            text: Full text
-            location_name: Location name to find
-            window: Number of characters before/after to include
+            text: Text to search for location mentions
 
         Returns:
-            Context snippet
+            Tuples (name, place_type, city, state, lat, lng), one per location, and
+            a LocationSpan per occurrence sorted by start offset
         """
-        text_lower = text.lower()
-        loc_lower = location_name.lower()
+        found_locations = []
+        seen = set()
+        spans = []
 
-        idx = text_lower.find(loc_lower)
-        if idx == -1:
-            return ""
+        for match in self.extract_matches(text):
+            key = match.name.lower()
+            spans.append(LocationSpan(match.start, match.end, key))
+            if key in seen:
+                continue
+            seen.add(key)
+            found_locations.append((match.name, match.place_type, match.city, match.state, match.lat, match.lng))
 
-        start = max(0, idx - window)
-        end = min(len(text), idx + len(location_name) + window)
+        return found_locations, spans
 
-        snippet = text[start:end]
+    def extract(self, text: str) -> List[Tuple[str, str, str, str, float, float]]:
+        """
+        Extract location mentions from text.
 
-        # Add ellipsis if truncated
-        if start > 0:
-            snippet = "..." + snippet
-        if end < len(text):
-            snippet = snippet + "..."
+        Args:
+            text: Text to search for location mentions
+
+        Returns:
+            List of tuples: (name, place_type, city, state, lat, lng), one per location
+        """
+        return self.extract_spans(text)[0]
+
+    def contexts(self, text: str, spans: List[LocationSpan], window: int = 100) -> Dict[str, str]:
+        """
+        Build the text context of each location from its spans.
 
-        return snippet
+        Every occurrence contributes a window of text around it. Windows of
+        the same location that overlap are merged, and the rest are joined
+        in order.
+
+        Args:
+            text: Full text the spans were found in
+            spans: Spans from extract_spans(), sorted by start offset
+            window: Number of characters before/after each occurrence to include
+
+        Returns:
+            Context snippet for each span key
+        """
+        ranges = {}
+        for span in spans:
+            start = max(0, span.start - window)
+            end = min(len(text), span.end + window)
+            merged = ranges.setdefault(span.key, [])
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+
+        return {
+            key: " ".join(_snippet(text, start, end) for start, end in key_ranges)
+            for key, key_ranges in ranges.items()
+        }
+
+
+def _capitalized(text: str, start: int, end: int) -> bool:
+    """Whether the word at text[start:end] starts with a capital letter."""
+    return text[start:end].lstrip("'-")[:1].isupper()
+
+
+def _snippet(text: str, start: int, end: int) -> str:
+    """Slice text, with an ellipsis on each side that was truncated."""
+    snippet = text[start:end]
+    if start > 0:
+        snippet = "..." + snippet
+    if end < len(text):
+        snippet = snippet + "..."
+    return snippet
 
 
 # Singleton instance
@@ -0,0 +1,217 @@
+"""
+Background geocoding of locations the extractor doesn't know.
+
+The ingest pipeline stores mentions of ungeocoded names in the
+pending_mentions table and hands their geocode keys to a GeocodeQueue. A
+worker thread resolves the keys in batches, first through the gazetteer
+(which may have learned a name since it was queued, e.g. from a new region
+shard) and then through the (rate-limited, cached) geocoder. It creates the
+locations it finds and turns their pending mentions into real mentions;
+mentions of names the provider doesn't know are dropped. Scraping never
+waits on the provider. Keys whose lookup fails stay pending and are picked
+up again when the next queue starts.
+"""
+
+import queue
+import threading
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..database import SessionLocal
+from ..models import Location, Mention, PendingMention
+from ..services.data_version import bump_data_version
+from ..services.gazetteer import Gazetteer, Place, get_gazetteer
+from ..services.geocoder import Geocoder, get_geocoder
+from ..services.rollup import record_mentions
+
+DEFAULT_BATCH_SIZE = 50
+
+# Wakes the worker up to exit
+_STOP = object()
+
+
+class GeocodeQueue:
+    """Resolve pending mentions on a worker thread."""
+
+    def __init__(
+        self,
+        geocoder: Optional[Geocoder] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        gazetteer: Optional[Gazetteer] = None
+    ):
+        self.geocoder = geocoder or get_geocoder()
+        self.gazetteer = gazetteer or get_gazetteer()
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+
+        self.resolved = 0
+        self.not_found = 0
+        self.failed = 0
+
+        self._queue: queue.Queue = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "GeocodeQueue":
+        """Start the worker and queue keys left pending by earlier runs."""
+        db = self.session_factory()
+        try:
+            self.put_many(db.scalars(select(PendingMention.geocode_key).distinct()))
+        finally:
+            db.close()
+
+        self._thread = threading.Thread(target=self._run, name="geocode-queue", daemon=True)
+        self._thread.start()
+        return self
+
+    def put_many(self, keys):
+        """Queue geocode keys; keys already waiting are skipped."""
+        with self._lock:
+            for key in keys:
+                if key not in self._queued:
+                    self._queued.add(key)
+                    self._queue.put(key)
+
+    def pending(self) -> int:
+        """Number of keys waiting to be resolved."""
+        with self._lock:
+            return len(self._queued)
+
+    def close(self, drain: bool = True):
+        """
+        Stop the worker.
+
+        Args:
+            drain: Resolve everything queued first; otherwise stop after the
+                current batch and leave the rest pending for the next run
+        """
+        if self._thread is None:
+            return
+        if not drain:
+            with self._lock:
+                while not self._queue.empty():
+                    self._queued.discard(self._queue.get_nowait())
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            keys = [key for key in batch if key is not _STOP]
+            if keys:
+                try:
+                    self._resolve_batch(keys)
+                except Exception as e:
+                    print(f"Geocoding batch failed: {e}")
+                finally:
+                    with self._lock:
+                        self._queued.difference_update(keys)
+
+            if len(keys) < len(batch):
+                return
+
+    def _resolve_batch(self, keys: List[str]):
+        db = self.session_factory()
+        try:
+            # Known places first, then cached answers; only the rest goes to the provider
+            places = self._known_places(db, keys)
+            answers = {key: (place.lat, place.lng) for key, place in places.items()}
+            answers.update(self.geocoder.cached(db, [key for key in keys if key not in answers]))
+            for key in keys:
+                if key not in answers:
+                    answered, coords = self.geocoder.resolve(key, db)
+                    if answered:
+                        answers[key] = coords
+                    else:
+                        self.failed += 1
+
+            self._apply(db, answers, places)
+            db.commit()
+        finally:
+            db.close()
+
+    def _known_places(self, db: Session, keys: List[str]) -> Dict[str, Place]:
+        """Gazetteer places of the keys whose pending names it knows."""
+        places = {}
+        for key, name in db.execute(
+            select(PendingMention.geocode_key, PendingMention.name)
+            .where(PendingMention.geocode_key.in_(keys))
+            .distinct()
+        ):
+            place = self.gazetteer.lookup(name)
+            if place is not None:
+                places[key] = place
+        return places
+
+    def _apply(self, db: Session, answers: dict, places: Dict[str, Place]):
+        """Turn pending mentions of resolved keys into mentions."""
+        found = {key: coords for key, coords in answers.items() if coords is not None}
+        self.not_found += len(answers) - len(found)
+
+        pending = db.scalars(
+            select(PendingMention).where(PendingMention.geocode_key.in_(list(found)))
+        ).all() if found else []
+
+        # Known places are stored under their gazetteer name, so aliases
+        # share one location
+        details = {}
+        default_state = get_settings().default_state
+        for p in pending:
+            place = places.get(p.geocode_key)
+            if place:
+                details[p.id] = (place.name, place.place_type, place.city, place.state or default_state)
+            else:
+                details[p.id] = (p.name, p.place_type, p.city, p.state or default_state)
+
+        # Reuse locations created meanwhile (e.g. by another worker or
+        # scraper); names match case-insensitively, as in the pipeline
+        names = {name.lower() for name, _, _, _ in details.values()}
+        location_ids = {
+            name.lower(): location_id
+            for location_id, name in db.execute(
+                select(Location.id, Location.name).where(func.lower(Location.name).in_(names))
+            )
+        } if names else {}
+
+        mentions = []
+        for p in pending:
+            name, place_type, city, state = details[p.id]
+            location_id = location_ids.get(name.lower())
+            if location_id is None:
+                lat, lng = found[p.geocode_key]
+                location = Location(
+                    name=name, lat=lat, lng=lng, place_type=place_type, city=city, state=state
+                )
+                db.add(location)
+                db.flush()
+                location_id = location_ids[name.lower()] = location.id
+
+            mentions.append({
+                "location_id": location_id,
+                "post_id": p.post_id,
+                "sentiment_score": p.sentiment_score,
+                "sentiment_version": p.sentiment_version,
+                "context": p.context,
+                "created_at": p.created_at,
+            })
+
+        if mentions:
+            db.execute(Mention.__table__.insert(), mentions)
+            record_mentions(
+                db,
+                ((m["location_id"], m["created_at"], m["sentiment_score"]) for m in mentions)
+            )
+            bump_data_version(db, {m["location_id"] for m in mentions})
+        self.resolved += len(found)
+
+        if answers:
+            db.execute(delete(PendingMention).where(PendingMention.geocode_key.in_(list(answers))))
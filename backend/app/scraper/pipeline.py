@@ -0,0 +1,302 @@
+"""
+Batched ingestion of scraped posts into the database.
+
+Posts are processed in batches. Each batch costs a fixed number of round
+trips regardless of its size: one IN query for already-ingested reddit_ids,
+one IN query and one multi-row insert for new locations, one multi-row
+insert each for posts and mentions, one rollup upsert, one data version
+bump (with its change log insert) and one commit. Location names resolve
+through an in-memory name -> id cache loaded once per pipeline. For
+incremental scrapes the subreddit cursors advance in the same transaction
+as the batch.
+
+Names without coordinates are looked up in the geocode cache (one more IN
+query). Cache misses are stored as pending mentions and resolved by a
+GeocodeQueue in the background when one is attached; otherwise they are
+skipped.
+"""
+
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..database import dialect_insert
+from ..models import Location, Mention, PendingMention, Post
+from ..services.data_version import bump_data_version
+from ..services.geocoder import Geocoder, get_geocoder
+from ..services.rollup import record_mentions
+from ..services.sentiment import SentimentAnalyzer, get_sentiment_analyzer
+from .cursors import advance_cursors
+from .extractor import LocationExtractor, get_extractor
+from .geocode_queue import GeocodeQueue
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class IngestPipeline:
+    """Ingest scraped post dictionaries (see RedditScraper) in batches."""
+
+    def __init__(
+        self,
+        db: Session,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        extractor: Optional[LocationExtractor] = None,
+        sentiment_analyzer: Optional[SentimentAnalyzer] = None,
+        cursor_listing: Optional[str] = None,
+        geocoder: Optional[Geocoder] = None,
+        geocode_queue: Optional[GeocodeQueue] = None
+    ):
+        """
+        Args:
+            db: Database session, committed after every batch
+            batch_size: Posts per transaction
+            extractor: Location extractor (default: shared instance)
+            sentiment_analyzer: Sentiment analyzer (default: shared instance)
+            cursor_listing: Listing the posts come from (e.g. "new"); when set,
+                each batch advances the scrape cursors of its subreddits
+            geocoder: Geocoder whose cache resolves unknown names (default:
+                the queue's geocoder, or the shared instance)
+            geocode_queue: Started queue resolving cache misses in the
+                background, or None to skip them
+        """
+        self.db = db
+        self.batch_size = batch_size
+        self.cursor_listing = cursor_listing
+        self.extractor = extractor or get_extractor()
+        self.sentiment_analyzer = sentiment_analyzer or get_sentiment_analyzer()
+        self.geocode_queue = geocode_queue
+        self.geocoder = geocoder or (geocode_queue.geocoder if geocode_queue else get_geocoder())
+
+        self.posts_processed = 0
+        self.mentions_created = 0
+        self.mentions_pending = 0
+
+        self.default_state = get_settings().default_state
+        self.location_ids = self._load_location_ids()
+
+    def _load_location_ids(self) -> dict:
+        """Map lowercased location names to ids (names match case-insensitively)."""
+        return {
+            name.lower(): location_id
+            for location_id, name in self.db.execute(select(Location.id, Location.name))
+        }
+
+    def ingest(self, posts: Iterable[dict], on_batch=None):
+        """
+        Ingest posts, committing after every batch.
+
+        Args:
+            posts: Post dictionaries, e.g. from RedditScraper.scrape_subreddit
+            on_batch: Optional callback run after each commit with the pipeline
+        """
+        posts = iter(posts)
+        while True:
+            batch = list(islice(posts, self.batch_size))
+            if not batch:
+                return
+            self.ingest_batch(batch)
+            if on_batch:
+                on_batch(self)
+
+    def ingest_batch(self, batch: List[dict]):
+        """Ingest one batch of posts in a single transaction."""
+        try:
+            self._ingest_batch(batch)
+        except Exception:
+            self.db.rollback()
+            # Drop ids of locations created by the rolled-back transaction
+            self.location_ids = self._load_location_ids()
+            raise
+
+    def _ingest_batch(self, batch: List[dict]):
+        db = self.db
+
+        # Drop posts seen earlier in this batch or already in the database
+        by_id = {}
+        for post_data in batch:
+            by_id.setdefault(post_data["reddit_id"], post_data)
+
+        existing = set(db.scalars(
+            select(Post.reddit_id).where(Post.reddit_id.in_(list(by_id)))
+        ))
+
+        # Extract locations before touching the database again
+        extracted = []
+        for reddit_id, post_data in by_id.items():
+            if reddit_id in existing:
+                continue
+
+            # Combine title and body for analysis
+            text = f"{post_data['title'] or ''} {post_data['body'] or ''}".strip()
+            if not text:
+                continue
+
+            locations, spans = self.extractor.extract_spans(text)
+            if locations:
+                extracted.append((post_data, self.extractor.contexts(text, spans), locations))
+
+        pending_keys = set()
+        if extracted:
+            self._geocode_from_cache(extracted)
+            pending_keys, location_ids = self._insert_posts(extracted)
+            # Pending mentions aren't served yet, so only real ones count
+            if location_ids:
+                bump_data_version(db, location_ids)
+
+        if self.cursor_listing:
+            advance_cursors(db, batch, self.cursor_listing)
+
+        db.commit()
+
+        # Queue only after commit, so the worker sees the pending rows
+        if pending_keys:
+            self.geocode_queue.put_many(pending_keys)
+
+    def _geocode_from_cache(self, extracted):
+        """Fill in coordinates of unknown names from the geocode cache, in place."""
+        keys = {
+            self.geocoder.query_key(loc_name, city, state)
+            for _, _, locations in extracted
+            for loc_name, _, city, state, lat, _ in locations
+            if lat is None
+        }
+        answers = self.geocoder.cached(self.db, keys)
+
+        for _, _, locations in extracted:
+            resolved = []
+            for loc_name, place_type, city, state, lat, lng in locations:
+                if lat is None:
+                    key = self.geocoder.query_key(loc_name, city, state)
+                    if key in answers:
+                        if answers[key] is None:
+                            # Known not to exist
+                            continue
+                        lat, lng = answers[key]
+                resolved.append((loc_name, place_type, city, state, lat, lng))
+            locations[:] = resolved
+
+    def _insert_posts(self, extracted) -> Tuple[set, set]:
+        """
+        Insert posts with extracted locations, their mentions and rollups.
+
+        Returns:
+            Geocode keys of the pending mentions inserted, and ids of the
+            locations that got mentions
+        """
+        db = self.db
+
+        self._create_missing_locations(
+            loc for _, _, locations in extracted for loc in locations
+        )
+
+        # Insert posts; a concurrent scraper may have inserted some meanwhile
+        scraped_at = datetime.utcnow()
+        post_ids = dict(db.execute(
+            dialect_insert(db)(Post).on_conflict_do_nothing(
+                index_elements=[Post.reddit_id]
+            ).returning(Post.reddit_id, Post.id),
+            [
+                {
+                    "reddit_id": post_data["reddit_id"],
+                    "title": post_data["title"],
+                    "body": post_data["body"],
+                    "subreddit": post_data["subreddit"],
+                    "posted_at": post_data["posted_at"],
+                    "scraped_at": scraped_at,
+                }
+                for post_data, _, _ in extracted
+            ]
+        ).all())
+
+        mentions = []
+        pending = []
+        for post_data, contexts, locations in extracted:
+            post_id = post_ids.get(post_data["reddit_id"])
+            if post_id is None:
+                continue
+            self.posts_processed += 1
+
+            for loc_name, place_type, city, state, lat, lng in locations:
+                # Without coordinates the mention waits for the geocode queue
+                if (lat is None or lng is None) and self.geocode_queue is None:
+                    continue
+
+                # Sentiment is scored for the whole batch below
+                mention = {
+                    "post_id": post_id,
+                    "context": contexts[loc_name.lower()],
+                    "created_at": scraped_at,
+                }
+                if lat is None or lng is None:
+                    pending.append({
+                        **mention,
+                        "geocode_key": self.geocoder.query_key(loc_name, city, state),
+                        "name": loc_name,
+                        "place_type": place_type,
+                        "city": city,
+                        "state": state,
+                    })
+                else:
+                    mentions.append({**mention, "location_id": self.location_ids[loc_name.lower()]})
+
+        scores = self.sentiment_analyzer.analyze_batch([m["context"] for m in mentions + pending])
+        for mention, score in zip(mentions + pending, scores):
+            mention["sentiment_score"] = score
+            mention["sentiment_version"] = self.sentiment_analyzer.version
+
+        if mentions:
+            db.execute(Mention.__table__.insert(), mentions)
+            record_mentions(
+                db,
+                ((m["location_id"], m["created_at"], m["sentiment_score"]) for m in mentions)
+            )
+            self.mentions_created += len(mentions)
+
+        if pending:
+            db.execute(PendingMention.__table__.insert(), pending)
+            self.mentions_pending += len(pending)
+
+        return {p["geocode_key"] for p in pending}, {m["location_id"] for m in mentions}
+
+    def _create_missing_locations(self, locations):
+        """Insert geocoded locations missing from the name cache."""
+        new_locations = {}
+        for loc_name, place_type, city, state, lat, lng in locations:
+            if lat is None or lng is None:
+                continue
+            key = loc_name.lower()
+            if key not in self.location_ids and key not in new_locations:
+                new_locations[key] = {
+                    "name": loc_name,
+                    "lat": lat,
+                    "lng": lng,
+                    "place_type": place_type,
+                    "city": city,
+                    "state": state or self.default_state,
+                }
+
+        if not new_locations:
+            return
+
+        # Pick up locations created elsewhere, e.g. by the geocode queue
+        for location_id, name in self.db.execute(
+            select(Location.id, Location.name).where(
+                func.lower(Location.name).in_(list(new_locations))
+            )
+        ):
+            self.location_ids[name.lower()] = location_id
+            new_locations.pop(name.lower(), None)
+
+        if not new_locations:
+            return
+
+        rows = self.db.execute(
+            Location.__table__.insert().returning(Location.id, Location.name),
+            list(new_locations.values())
+        ).all()
+        for location_id, name in rows:
+            self.location_ids[name.lower()] = location_id
@@ -6,12 +6,17 @@ Set REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, and REDDIT_USER_AGENT
 in environment variables or .env file.
 """
 
+from collections import deque
 from datetime import datetime
+from itertools import takewhile
 from typing import Generator, Optional
 import praw
-from praw.models import Submission, Comment
+from praw.models import Submission, Comment, MoreComments
 
 from ..config import get_settings
+from .cursors import Cursor, mark_partial_walk, reached
+
+LISTING_PAGE_SIZE = 100
 
 
 class RedditScraper:
@@ -54,33 +59,116 @@ class RedditScraper:
         for submission in subreddit.top(time_filter=time_filter, limit=limit):
             yield self._submission_to_dict(submission)
 
+    def scrape_new(
+        self,
+        subreddit_name: str,
+        cursor: Optional[Cursor] = None,
+        limit: int = 100
+    ) -> Generator[dict, None, None]:
+        """
+        Scrape posts newer than a cursor from a subreddit's new listing.
+
+        Pages forward from the cursor with "before", so posts come out oldest
+        first and a cursor advanced after each batch never skips any. If the
+        cursor post was deleted Reddit returns nothing for it; the listing is
+        then walked from the newest post down to the cursor's timestamp.
+        Without a cursor the newest posts are fetched. When the limit cuts
+        that walk off, older posts are left unfetched, so the cursor only
+        moves to the oldest post fetched (see PARTIAL_WALK).
+
+        Args:
+            subreddit_name: Name of the subreddit (without r/)
+            cursor: Newest post already ingested, or None
+            limit: Maximum number of posts to fetch
+
+        Yields:
+            Dictionary with post data, oldest first
+        """
+        path = f"/r/{subreddit_name}/new"
+
+        if cursor is not None:
+            before = cursor.fullname
+            fetched = 0
+            while fetched < limit:
+                page_size = min(LISTING_PAGE_SIZE, limit - fetched)
+                page = [
+                    self._submission_to_dict(submission)
+                    for submission in self.reddit.get(path, params={"before": before, "limit": page_size})
+                ]
+                # Pages are newest first
+                for post in reversed(page):
+                    yield post
+                fetched += len(page)
+                if len(page) < page_size:
+                    break
+                before = page[0]["fullname"]
+
+            if fetched:
+                return
+
+        # No cursor, nothing new, or a deleted cursor post: walk down from the newest
+        posts = []
+        after = None
+        while len(posts) < limit:
+            page_size = min(LISTING_PAGE_SIZE, limit - len(posts))
+            params = {"limit": page_size}
+            if after:
+                params["after"] = after
+            page = [self._submission_to_dict(submission) for submission in self.reddit.get(path, params=params)]
+
+            unseen = list(takewhile(lambda post: not reached(post, cursor), page))
+            posts.extend(unseen)
+            if len(unseen) < len(page) or len(page) < page_size:
+                break
+            after = page[-1]["fullname"]
+        else:
+            # Cut off by the limit above older unfetched posts
+            mark_partial_walk(posts)
+
+        yield from reversed(posts)
+
     def scrape_comments(
         self,
         submission: Submission,
         limit: Optional[int] = None
     ) -> Generator[dict, None, None]:
         """
-        Scrape comments from a submission.
+        Walk a submission's comment tree breadth-first, yielding comments as they arrive.
+
+        Unlike replace_more(), which fetches the whole thread up front,
+        each MoreComments stub is expanded only when the walk reaches it.
 
         Args:
             submission: PRAW Submission object
             limit: Maximum number of comments (None for all)
 
         Yields:
-            Dictionary with comment data
+            Dictionary with comment data, parents before replies
         """
-        submission.comments.replace_more(limit=limit)
-        for comment in submission.comments.list():
-            yield self._comment_to_dict(comment, submission.subreddit.display_name)
+        subreddit = submission.subreddit.display_name
+        queue = deque(submission.comments)
+
+        yielded = 0
+        while queue and (limit is None or yielded < limit):
+            comment = queue.popleft()
+            if isinstance(comment, MoreComments):
+                queue.extend(comment.comments())
+                continue
+
+            queue.extend(comment.replies)
+            yield self._comment_to_dict(comment, subreddit)
+            yielded += 1
 
     def _submission_to_dict(self, submission: Submission) -> dict:
         """Convert PRAW Submission to dictionary."""
         return {
             "reddit_id": submission.id,
+            "fullname": submission.fullname,
             "title": submission.title,
             "body": submission.selftext,
             "subreddit": submission.subreddit.display_name,
             "posted_at": datetime.utcfromtimestamp(submission.created_utc),
+            "created_utc": submission.created_utc,
             "score": submission.score,
             "num_comments": submission.num_comments,
             "url": submission.url,
@@ -0,0 +1,115 @@
+"""
+Data version counter and change log for HTTP and result caching.
+
+Locations, mentions and the rollup only change when a writer commits (a
+scrape batch, the geocode queue, a re-score, the seeder). Each of those
+calls bump_data_version() in the same transaction, so the counter moves
+exactly when served data may have changed. The read endpoints derive
+their ETags from it and answer conditional requests without running
+their aggregates.
+
+Each bump also records which locations it changed in the data_changes
+table. A cached result computed at an older version stays valid if none
+of the locations changed since then could appear in it (see
+changed_locations()). The log only needs to reach back as far as the
+oldest live cache entry and is pruned after CHANGE_LOG_RETENTION.
+"""
+
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from ..database import dialect_insert
+from ..models import DataChange, DataVersion, Location
+
+# Counter covering everything the read API serves
+MENTIONS = "mentions"
+
+CHANGE_LOG_RETENTION = timedelta(days=1)
+# Prune the change log on every Nth version
+PRUNE_EVERY = 100
+
+
+def bump_data_version(
+    db: Session,
+    location_ids: Optional[Iterable[int]] = None,
+    name: str = MENTIONS
+) -> int:
+    """
+    Increment a data version and log the locations it changes. Does not commit.
+
+    Args:
+        db: Session holding the transaction that changes the data
+        location_ids: Locations whose mentions or stats changed, or None
+            when unknown (every cached result is then invalidated)
+        name: Counter to bump
+
+    Returns:
+        The new version
+    """
+    table = DataVersion.__table__
+    stmt = dialect_insert(db)(table).values(name=name, version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.name],
+        set_={"version": table.c.version + 1, "updated_at": stmt.excluded.updated_at},
+    )
+    version = db.scalar(stmt.returning(table.c.version))
+
+    if location_ids is None:
+        changes = [{"version": version, "location_id": None}]
+    else:
+        changes = [{"version": version, "location_id": location_id} for location_id in set(location_ids)]
+    if changes:
+        db.execute(insert(DataChange), changes)
+
+    if version % PRUNE_EVERY == 0:
+        db.execute(delete(DataChange).where(
+            DataChange.created_at < datetime.utcnow() - CHANGE_LOG_RETENTION
+        ))
+
+    return version
+
+
+def get_data_version(db: Session, name: str = MENTIONS) -> int:
+    """Current value of a data version (0 before the first write)."""
+    return db.scalar(select(DataVersion.version).where(DataVersion.name == name)) or 0
+
+
+def changed_locations(db: Session, since_version: int) -> Optional[List[Row]]:
+    """
+    Locations changed after a data version.
+
+    Args:
+        db: Database session
+        since_version: Version a cached result was computed at
+
+    Returns:
+        Rows of (id, name, city, state, place_type, lat, lng), or None if
+        the change log can't tell (an unknown change, or pruned history)
+    """
+    oldest = db.scalar(select(func.min(DataChange.version)))
+    if oldest is None or oldest > since_version + 1:
+        return None
+
+    if db.scalar(
+        select(DataChange.id)
+        .where(DataChange.version > since_version, DataChange.location_id.is_(None))
+        .limit(1)
+    ) is not None:
+        return None
+
+    changed = select(DataChange.location_id).where(DataChange.version > since_version)
+    return db.execute(
+        select(
+            Location.id,
+            Location.name,
+            Location.city,
+            Location.state,
+            Location.place_type,
+            Location.lat,
+            Location.lng
+        ).where(Location.id.in_(changed))
+    ).all()
@@ -0,0 +1,183 @@
+"""
+Server-side kernel density rasters for the heatmap layer.
+
+Mapbox's heatmap layer computes density on the client from every point,
+which gets slow on phones once there are many locations. Instead, each
+XYZ tile is rendered here as a TILE_SIZE x TILE_SIZE PNG that the map
+shows as a raster layer, so the client only decodes images.
+
+Points are binned into pixels and blurred with a Gaussian kernel. The
+kernel is separable, so the blur is two matrix products with a banded
+kernel matrix rather than a loop over points. Radius, intensity, weights
+and the color ramp follow the client heatmap layer they replace. Points
+within one radius outside the tile are included, so neighbouring tiles
+line up without seams.
+"""
+
+import struct
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+TILE_SIZE = 256
+
+# Mention count at which a location reaches full weight
+WEIGHT_SATURATION = 100
+
+# Kernel radius and intensity by zoom, interpolated linearly and clamped
+RADIUS_STOPS = ((0, 2.0), (12, 20.0))
+INTENSITY_STOPS = ((0, 1.0), (12, 3.0))
+
+# Density to color, as in the client's heatmap-color
+COLOR_RAMP = (
+    (0.0, (33, 102, 172, 0)),
+    (0.2, (103, 169, 207, 255)),
+    (0.4, (209, 229, 240, 255)),
+    (0.6, (253, 219, 199, 255)),
+    (0.8, (239, 138, 98, 255)),
+    (1.0, (178, 24, 43, 255)),
+)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _interpolate(stops, zoom: float) -> float:
+    zooms, values = zip(*stops)
+    return float(np.interp(zoom, zooms, values))
+
+
+def kernel_radius(zoom: float) -> float:
+    """Kernel radius in pixels at a zoom level."""
+    return _interpolate(RADIUS_STOPS, zoom)
+
+
+def point_weights(mention_counts: np.ndarray, sentiment_sums: np.ndarray, sentiment: bool = False) -> np.ndarray:
+    """
+    Weight of each location in the density.
+
+    Args:
+        mention_counts: Mentions per location
+        sentiment_sums: Sum of sentiment scores per location
+        sentiment: Scale weights from 0 (all negative) to 1 (all positive)
+            by average sentiment, so the raster shows where people are happy
+
+    Returns:
+        Weights in 0..1
+    """
+    weights = np.minimum(mention_counts / WEIGHT_SATURATION, 1.0)
+    if sentiment:
+        average = np.divide(
+            sentiment_sums, mention_counts,
+            out=np.zeros_like(weights), where=mention_counts > 0
+        )
+        weights = weights * (np.clip(average, -1.0, 1.0) + 1.0) / 2.0
+    return weights
+
+
+def density_grid(
+    lngs: np.ndarray,
+    lats: np.ndarray,
+    weights: np.ndarray,
+    z: int,
+    x: int,
+    y: int,
+    size: int = TILE_SIZE
+) -> np.ndarray:
+    """
+    Compute the kernel density of weighted points over one tile.
+
+    Args:
+        lngs, lats: Point coordinates in degrees
+        weights: Point weights (see point_weights)
+        z, x, y: XYZ tile
+        size: Raster width and height in pixels
+
+    Returns:
+        float32 array of shape (size, size), rows north to south, in 0..1
+    """
+    radius = kernel_radius(z)
+    margin = int(np.ceil(radius))
+    span = size + 2 * margin
+    scale = size * 2 ** z
+
+    # Web Mercator pixel coordinates within the tile plus its margin
+    px = (lngs + 180.0) / 360.0 * scale - x * size + margin
+    py = (1.0 - np.arcsinh(np.tan(np.radians(lats))) / np.pi) / 2.0 * scale - y * size + margin
+
+    inside = (px >= 0) & (px < span) & (py >= 0) & (py < span)
+    cells = py[inside].astype(np.intp) * span + px[inside].astype(np.intp)
+    grid = np.bincount(cells, weights=weights[inside], minlength=span * span).reshape(span, span)
+
+    # Row i of the kernel matrix blurs the padded grid into output pixel i
+    offsets = np.arange(span)[None, :] - (np.arange(size)[:, None] + margin)
+    sigma = radius / 3.0
+    kernel = np.exp(-(offsets ** 2) / (2.0 * sigma ** 2))
+    kernel[np.abs(offsets) > margin] = 0.0
+
+    density = kernel @ grid @ kernel.T
+    density *= _interpolate(INTENSITY_STOPS, z)
+    return np.clip(density, 0.0, 1.0).astype(np.float32)
+
+
+@lru_cache(maxsize=1)
+def _color_table() -> np.ndarray:
+    """RGBA color for each of 256 density levels."""
+    stops = np.array([stop for stop, _ in COLOR_RAMP])
+    colors = np.array([color for _, color in COLOR_RAMP], dtype=np.float64)
+    levels = np.linspace(0.0, 1.0, 256)
+    table = np.stack([np.interp(levels, stops, colors[:, channel]) for channel in range(4)], axis=1)
+    return np.round(table).astype(np.uint8)
+
+
+def colorize(density: np.ndarray) -> np.ndarray:
+    """Map densities in 0..1 to RGBA pixels through COLOR_RAMP."""
+    levels = np.round(density * 255).astype(np.uint8)
+    return _color_table()[levels]
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """
+    Encode an RGBA image as a PNG.
+
+    Args:
+        rgba: uint8 array of shape (height, width, 4)
+
+    Returns:
+        PNG file contents
+    """
+    height, width, _ = rgba.shape
+    # Each scanline starts with its filter type (0: none)
+    scanlines = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    scanlines[:, 1:] = rgba.reshape(height, width * 4)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (
+        PNG_SIGNATURE
+        + _png_chunk(b"IHDR", header)
+        + _png_chunk(b"IDAT", zlib.compress(scanlines.tobytes(), 6))
+        + _png_chunk(b"IEND", b"")
+    )
+
+
+def render_density_tile(rows, z: int, x: int, y: int, sentiment: bool = False) -> bytes:
+    """
+    Render one density tile as a PNG.
+
+    Args:
+        rows: (lng, lat, mention_count, sentiment_sum) of the locations in
+            the tile and within one kernel radius around it
+        z, x, y: XYZ tile
+        sentiment: Weight by sentiment as well (see point_weights)
+
+    Returns:
+        PNG file contents
+    """
+    points = np.array(rows, dtype=np.float64).reshape(-1, 4)
+    lngs, lats, counts, sentiment_sums = points.T
+    weights = point_weights(counts, sentiment_sums, sentiment)
+    return encode_png(colorize(density_grid(lngs, lats, weights, z, x, y)))
@@ -0,0 +1,620 @@
+"""
+Gazetteer of known places, loaded from packed on-disk shards.
+
+Places live in one shard per region (e.g. data/gazetteer/hawaii.gaz), built
+offline from a CSV file or an OpenStreetMap extract exported to GeoJSON (see
+build_gazetteer.py). A shard that is missing or older than its
+<region>.csv is rebuilt on first use.
+
+A shard is a single file of flat arrays: place coordinates, types, cities
+and states; names and aliases as UTF-8 blobs with offsets; and the 64-bit hashes
+of every normalized name and alias, sorted. Shards are memory-mapped and
+read in place, so opening one costs nothing up front and worker processes
+share the pages through the OS cache instead of each building a dict.
+
+Text is matched token by token. Tokens that start no known name are dropped
+with one vectorized lookup of their hashes, then the phrases starting at the
+remaining tokens are looked up in the sorted key hashes. Every hit is checked
+against the stored key, so hash collisions never produce a false match.
+"""
+
+import csv
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from ..config import get_settings
+
+MAGIC = b"SCGZ"
+FORMAT_VERSION = 2
+SHARD_SUFFIX = ".gaz"
+
+# Relative gazetteer directories are resolved against backend/
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Names match on whole tokens, so "bar" never matches inside "barbecue"
+_TOKEN = re.compile(r"\w+")
+
+# Curly apostrophes are common in Reddit text ("Leonard’s Bakery")
+_NORMALIZE_TABLE = str.maketrans({"\u2019": "'", "\u2018": "'"})
+
+# OpenStreetMap tags mapped to place types; other features are skipped
+OSM_PLACE_TYPES = (
+    ("amenity", {"restaurant", "cafe", "fast_food", "bar", "pub", "food_court", "ice_cream"}, "restaurant"),
+    ("natural", {"beach"}, "beach"),
+    ("leisure", {"park", "nature_reserve", "garden"}, "park"),
+    ("boundary", {"national_park"}, "park"),
+    ("waterway", {"waterfall"}, "park"),
+    ("natural", {"peak", "volcano"}, "park"),
+    ("tourism", {"hotel", "resort"}, "resort"),
+    ("tourism", {"attraction", "museum", "viewpoint", "theme_park", "zoo", "aquarium"}, "attraction"),
+)
+OSM_ALIAS_TAGS = ("alt_name", "short_name", "official_name", "old_name")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercase text for matching while keeping offsets aligned with the original.
+
+    Args:
+        text: Original text
+
+    Returns:
+        Normalized text of the same length as the input
+    """
+    normalized = text.translate(_NORMALIZE_TABLE).lower()
+    if len(normalized) != len(text):
+        # A few characters expand when lowercased (e.g. "İ"); keep those as-is
+        normalized = "".join(
+            lowered if len(lowered) == 1 else char
+            for char, lowered in ((c, c.lower()) for c in text.translate(_NORMALIZE_TABLE))
+        )
+    return normalized
+
+
+def normalize_key(name: str) -> str:
+    """Normalize a place name for lookups: lowercase, single spaces."""
+    return " ".join(normalize_text(name).split())
+
+
+# Strings hash to the sum of code point * HASH_BASE ** position, mod 2 ** 64.
+# The hash of any span of a text then follows from the text's prefix sums,
+# so all tokens and phrases of a text are hashed with a few array operations.
+HASH_BASE = 0x100000001B3
+_HASH_BASE_INVERSE = pow(HASH_BASE, -1, 2 ** 64)
+
+# Powers of HASH_BASE and of its inverse, grown as longer texts come in
+_powers = (np.ones(1, dtype=np.uint64), np.ones(1, dtype=np.uint64))
+
+
+def _power_table(base: int, size: int) -> np.ndarray:
+    table = np.ones(size, dtype=np.uint64)
+    # uint64 arithmetic wraps around, which is the mod 2 ** 64
+    np.cumprod(np.full(size - 1, base, dtype=np.uint64), out=table[1:])
+    return table
+
+
+def _hash_powers(size: int) -> Tuple[np.ndarray, np.ndarray]:
+    global _powers
+    if len(_powers[0]) < size:
+        size = max(size, 2 * len(_powers[0]))
+        _powers = (_power_table(HASH_BASE, size), _power_table(_HASH_BASE_INVERSE, size))
+    return _powers
+
+
+class _TextHashes:
+    """Hashes of the spans of one text."""
+
+    def __init__(self, text: str):
+        codes = np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype="<u4").astype(np.uint64)
+        powers, self._inverse_powers = _hash_powers(len(codes) + 1)
+        self._prefix = np.zeros(len(codes) + 1, dtype=np.uint64)
+        np.cumsum(codes * powers[:len(codes)], out=self._prefix[1:])
+
+    def spans(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Hash of text[start:end] for each start and end."""
+        return (self._prefix[ends] - self._prefix[starts]) * self._inverse_powers[starts]
+
+
+def _hash(key: str) -> int:
+    """Hash of one string, without the array set-up (for short strings)."""
+    value, power = 0, 1
+    for char in key:
+        value = (value + ord(char) * power) & 0xFFFFFFFFFFFFFFFF
+        power = (power * HASH_BASE) & 0xFFFFFFFFFFFFFFFF
+    return value
+
+
+def _hashes(keys: List[str]) -> np.ndarray:
+    """Hash of each string."""
+    ends = np.cumsum([len(key) for key in keys], dtype=np.intp)
+    starts = ends - [len(key) for key in keys]
+    return _TextHashes("".join(keys)).spans(starts, ends)
+
+
+def _contains(sorted_values: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Mask of values present in a sorted array."""
+    if not len(sorted_values):
+        return np.zeros(len(values), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_values, values), len(sorted_values) - 1)
+    return sorted_values[positions] == values
+
+
+class Place(NamedTuple):
+    """A known place."""
+    name: str
+    place_type: str
+    city: Optional[str]
+    # State code as stored on locations, e.g. "HI"
+    state: Optional[str]
+    lat: float
+    lng: float
+
+
+class GazetteerEntry(NamedTuple):
+    """A place to pack into a shard, with the other names it goes by."""
+    name: str
+    aliases: Tuple[str, ...]
+    place_type: str
+    city: Optional[str]
+    state: Optional[str]
+    lat: float
+    lng: float
+
+
+class GazetteerMatch(NamedTuple):
+    """A known place name in a text (end is exclusive)."""
+    start: int
+    end: int
+    place: Place
+
+
+def read_csv(path: str) -> Iterator[GazetteerEntry]:
+    """
+    Read places from a CSV file.
+
+    Columns: name, aliases (separated by "|", may be empty), place_type,
+    city, state (optional), lat, lng.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            aliases = tuple(alias.strip() for alias in (row.get("aliases") or "").split("|") if alias.strip())
+            yield GazetteerEntry(
+                row["name"].strip(), aliases, row["place_type"].strip(),
+                row.get("city") or None, (row.get("state") or "").strip() or None,
+                float(row["lat"]), float(row["lng"])
+            )
+
+
+def _representative_point(geometry: dict) -> Optional[Tuple[float, float]]:
+    """(lat, lng) of a point, or the mean of a line's or polygon's vertices."""
+    positions = []
+
+    def collect(coordinates):
+        if coordinates and isinstance(coordinates[0], (int, float)):
+            positions.append(coordinates)
+        else:
+            for item in coordinates:
+                collect(item)
+
+    collect(geometry.get("coordinates") or [])
+    if not positions:
+        return None
+    lng = sum(p[0] for p in positions) / len(positions)
+    lat = sum(p[1] for p in positions) / len(positions)
+    return lat, lng
+
+
+def read_geojson(path: str) -> Iterator[GazetteerEntry]:
+    """
+    Read places from an OpenStreetMap extract exported to GeoJSON.
+
+    Accepts a FeatureCollection or one feature per line (e.g. `osmium export
+    -f geojsonseq`). Features need a name tag and one of OSM_PLACE_TYPES;
+    lines and polygons are placed at the mean of their vertices.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".geojsonseq"):
+            features = (json.loads(line.strip("\x1e \n")) for line in f if line.strip("\x1e \n"))
+        else:
+            features = iter(json.load(f).get("features", []))
+
+        for feature in features:
+            tags = feature.get("properties") or {}
+            name = tags.get("name")
+            place_type = next(
+                (place_type for tag, values, place_type in OSM_PLACE_TYPES if tags.get(tag) in values), None
+            )
+            point = _representative_point(feature.get("geometry") or {})
+            if not name or place_type is None or point is None:
+                continue
+
+            aliases = tuple(
+                alias.strip()
+                for tag in OSM_ALIAS_TAGS
+                for alias in (tags.get(tag) or "").split(";")
+                if alias.strip()
+            )
+            yield GazetteerEntry(name, aliases, place_type, tags.get("addr:city"), tags.get("addr:state"), *point)
+
+
+def read_entries(path: str) -> Iterator[GazetteerEntry]:
+    """Read places from a CSV or GeoJSON file, by extension."""
+    if path.endswith((".geojson", ".geojsonseq", ".json")):
+        return read_geojson(path)
+    return read_csv(path)
+
+
+def _string_table(strings: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack strings into UTF-8 bytes and their start offsets (plus the end)."""
+    encoded = [s.encode() for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(s) for s in encoded], dtype=np.uint64)
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def build_shard(entries: Iterable[GazetteerEntry], path: str, region: str, state: Optional[str] = None) -> int:
+    """
+    Pack places into a shard file.
+
+    Names and aliases that normalize to a key already taken belong to the
+    first place that claimed them. The file is written next to path and
+    moved into place, so processes opening it meanwhile see the old or the
+    new shard, never half of one.
+
+    Args:
+        entries: Places to pack
+        path: Shard file to write
+        region: Region name recorded in the shard
+        state: State code of the entries that have none
+
+    Returns:
+        Number of places written
+    """
+    names, types, cities, states, lats, lngs = [], [], [], [], [], []
+    type_ids, city_ids, city_names = {}, {}, []
+    state_ids = {}
+    key_places = {}
+
+    for entry in entries:
+        place_idx = len(names)
+        for name in (entry.name,) + tuple(entry.aliases):
+            key = normalize_key(name)
+            if key:
+                key_places.setdefault(key, place_idx)
+
+        names.append(entry.name)
+        types.append(type_ids.setdefault(entry.place_type, len(type_ids)))
+        city = entry.city or ""
+        if city not in city_ids:
+            city_ids[city] = len(city_names)
+            city_names.append(city)
+        cities.append(city_ids[city])
+        states.append(state_ids.setdefault(entry.state or state or "", len(state_ids)))
+        lats.append(entry.lat)
+        lngs.append(entry.lng)
+
+    keys = list(key_places)
+    key_hashes = _hashes(keys)
+    order = np.argsort(key_hashes, kind="stable")
+    keys = [keys[i] for i in order]
+    name_offsets, name_blob = _string_table(names)
+    city_offsets, city_blob = _string_table(city_names)
+    key_offsets, key_blob = _string_table(keys)
+    first_tokens = [tokens[0] for tokens in map(_TOKEN.findall, keys) if tokens]
+
+    arrays = {
+        "lat": np.array(lats, dtype="<f8"),
+        "lng": np.array(lngs, dtype="<f8"),
+        "place_type": np.array(types, dtype="<u2"),
+        "city": np.array(cities, dtype="<u4"),
+        "state": np.array(states, dtype="<u2"),
+        "name_offsets": name_offsets.astype("<u8"),
+        "name_blob": name_blob,
+        "city_offsets": city_offsets.astype("<u8"),
+        "city_blob": city_blob,
+        "key_hashes": key_hashes[order].astype("<u8"),
+        "key_places": np.array([key_places[key] for key in keys], dtype="<u4"),
+        "key_offsets": key_offsets.astype("<u8"),
+        "key_blob": key_blob,
+        "first_token_hashes": np.unique(_hashes(first_tokens)).astype("<u8"),
+    }
+
+    header = {
+        "region": region,
+        "place_types": list(type_ids),
+        "states": list(state_ids),
+        "max_tokens": max((len(_TOKEN.findall(key)) for key in keys), default=0),
+        "arrays": {},
+    }
+    # Lay arrays out 8-byte aligned after the header, whose length depends
+    # on the offsets it records; grow the gap until the header fits
+    data_start = 0
+    while True:
+        offset = data_start
+        for name, array in arrays.items():
+            header["arrays"][name] = [array.dtype.str, len(array), offset]
+            offset = _align(offset + array.nbytes)
+        encoded = json.dumps(header).encode()
+        needed = _align(len(MAGIC) + 8 + len(encoded))
+        if needed <= data_start:
+            break
+        data_start = needed
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + struct.pack("<II", FORMAT_VERSION, len(encoded)) + encoded)
+            for name, array in arrays.items():
+                f.write(b"\0" * (header["arrays"][name][2] - f.tell()))
+                f.write(array.tobytes())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(names)
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) // 8 * 8
+
+
+def _format_version(path: str) -> Optional[int]:
+    """Format version of a shard file, or None if it isn't one."""
+    with open(path, "rb") as f:
+        head = f.read(len(MAGIC) + 4)
+    if len(head) < len(MAGIC) + 4 or head[:len(MAGIC)] != MAGIC:
+        return None
+    return struct.unpack_from("<I", head, len(MAGIC))[0]
+
+
+class GazetteerShard:
+    """One region's places, read from a memory-mapped shard file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a gazetteer shard")
+        version, header_len = struct.unpack_from("<II", self._mmap, len(MAGIC))
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} has format version {version}, expected {FORMAT_VERSION}")
+        start = len(MAGIC) + 8
+        header = json.loads(self._mmap[start:start + header_len])
+
+        self.region = header["region"]
+        self.place_types = header["place_types"]
+        self.states = header["states"]
+        self.max_tokens = header["max_tokens"]
+        for name, (dtype, count, offset) in header["arrays"].items():
+            setattr(self, name, np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offset))
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def _string(self, offsets: np.ndarray, blob: np.ndarray, idx: int) -> bytes:
+        return blob[int(offsets[idx]):int(offsets[idx + 1])].tobytes()
+
+    def place(self, idx: int) -> Place:
+        """Place at an index of this shard."""
+        city = self._string(self.city_offsets, self.city_blob, int(self.city[idx])).decode()
+        return Place(
+            self._string(self.name_offsets, self.name_blob, idx).decode(),
+            self.place_types[self.place_type[idx]],
+            city or None,
+            self.states[self.state[idx]] or None,
+            float(self.lat[idx]),
+            float(self.lng[idx]),
+        )
+
+    def _find_keys(self, hashes: np.ndarray, key_at: Callable[[int], str]) -> List[Tuple[int, int]]:
+        """
+        Match hashed strings against the stored keys.
+
+        Args:
+            hashes: Hash of each string
+            key_at: Returns the string at an index, to compare on a hash hit
+
+        Returns:
+            (index, place index) of each string that is a key
+        """
+        found = []
+        positions = np.searchsorted(self.key_hashes, hashes)
+        for i in np.flatnonzero(_contains(self.key_hashes, hashes)):
+            place = self._match_key(int(positions[i]), hashes[i], key_at(i))
+            if place is not None:
+                found.append((int(i), place))
+        return found
+
+    def _match_key(self, position: int, key_hash: np.uint64, key: str) -> Optional[int]:
+        """Place index of key, comparing the keys with its hash from position on."""
+        encoded = key.encode()
+        # Keys sharing a hash sit next to each other
+        while position < len(self.key_hashes) and self.key_hashes[position] == key_hash:
+            if self._string(self.key_offsets, self.key_blob, position) == encoded:
+                return int(self.key_places[position])
+            position += 1
+        return None
+
+    def lookup(self, key: str) -> Optional[int]:
+        """Index of the place with a normalized name or alias, or None."""
+        key_hash = np.uint64(_hash(key))
+        return self._match_key(int(self.key_hashes.searchsorted(key_hash)), key_hash, key)
+
+    def name_starts(self, token_hashes: np.ndarray) -> np.ndarray:
+        """Indexes of the tokens (given by hash) that some known name starts with."""
+        return np.flatnonzero(_contains(self.first_token_hashes, token_hashes))
+
+    def find(
+        self,
+        text: str,
+        hashes: _TextHashes,
+        token_starts: np.ndarray,
+        token_ends: np.ndarray,
+        starts: np.ndarray
+    ) -> List[Tuple[int, int, int]]:
+        """
+        Find every known name in a normalized text, overlaps included.
+
+        Args:
+            text: Text from normalize_text()
+            hashes: Span hashes of text
+            token_starts, token_ends: Offsets of each token in text
+            starts: Indexes of the tokens to try names from (see name_starts)
+
+        Returns:
+            (start, end, place index) of each occurrence
+        """
+        # Phrases of 1..max_tokens tokens from each start
+        last = starts[:, None] + np.arange(self.max_tokens)[None, :]
+        valid = last < len(token_starts)
+        span_starts = token_starts[np.broadcast_to(starts[:, None], last.shape)[valid]]
+        span_ends = token_ends[last[valid]]
+
+        found = self._find_keys(
+            hashes.spans(span_starts, span_ends),
+            lambda i: text[span_starts[i]:span_ends[i]]
+        )
+        return [(int(span_starts[i]), int(span_ends[i]), place) for i, place in found]
+
+
+class Gazetteer:
+    """Known places from the shards in a directory, opened on first use."""
+
+    def __init__(self, directory: str, regions: Optional[Iterable[str]] = None):
+        """
+        Args:
+            directory: Directory holding <region>.gaz shards and their
+                <region>.csv sources
+            regions: Regions to load (default: every shard or CSV source in
+                the directory)
+        """
+        self.directory = directory
+        self.regions = list(regions) if regions else None
+        self._shards: Optional[List[GazetteerShard]] = None
+        self._lock = threading.Lock()
+
+    def _region_names(self) -> List[str]:
+        if self.regions is not None:
+            return self.regions
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted({
+            name[:-len(suffix)]
+            for name in os.listdir(self.directory)
+            for suffix in (SHARD_SUFFIX, ".csv")
+            if name.endswith(suffix)
+        })
+
+    def _open_shard(self, region: str) -> Optional[GazetteerShard]:
+        path = os.path.join(self.directory, region + SHARD_SUFFIX)
+        source = os.path.join(self.directory, region + ".csv")
+        if os.path.exists(source) and (
+            not os.path.exists(path)
+            or os.path.getmtime(path) < os.path.getmtime(source)
+            or _format_version(path) != FORMAT_VERSION
+        ):
+            build_shard(read_csv(source), path, region)
+        if not os.path.exists(path):
+            return None
+        return GazetteerShard(path)
+
+    @property
+    def shards(self) -> List[GazetteerShard]:
+        """Loaded shards, opening (and if needed building) them on first access."""
+        if self._shards is None:
+            with self._lock:
+                if self._shards is None:
+                    shards = (self._open_shard(region) for region in self._region_names())
+                    self._shards = [shard for shard in shards if shard is not None]
+        return self._shards
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    def places(self) -> Iterator[Place]:
+        """Every place, shard by shard."""
+        for shard in self.shards:
+            for idx in range(len(shard)):
+                yield shard.place(idx)
+
+    def lookup(self, name: str) -> Optional[Place]:
+        """
+        Find a place by name or alias.
+
+        Args:
+            name: Name as written (case, apostrophes and spacing don't matter)
+
+        Returns:
+            The place, or None if no shard knows the name
+        """
+        key = normalize_key(name)
+        for shard in self.shards:
+            idx = shard.lookup(key)
+            if idx is not None:
+                return shard.place(idx)
+        return None
+
+    def find(self, text: str) -> List[GazetteerMatch]:
+        """
+        Find known place names in a text.
+
+        Args:
+            text: Text from normalize_text()
+
+        Returns:
+            Matches sorted by start offset. Where names overlap, the
+            leftmost one wins and, among those, the longest.
+        """
+        shards = self.shards
+        tokens = [match.span() for match in _TOKEN.finditer(text)]
+        if not shards or not tokens:
+            return []
+
+        token_starts, token_ends = np.array(tokens, dtype=np.intp).T
+        hashes = _TextHashes(text)
+        token_hashes = hashes.spans(token_starts, token_ends)
+
+        candidates = []
+        for shard in shards:
+            starts = shard.name_starts(token_hashes)
+            if len(starts):
+                candidates.extend(
+                    (start, end, shard, idx)
+                    for start, end, idx in shard.find(text, hashes, token_starts, token_ends, starts)
+                )
+        candidates.sort(key=lambda c: (c[0], c[0] - c[1]))
+
+        selected = []
+        covered_until = 0
+        for start, end, shard, idx in candidates:
+            if start >= covered_until:
+                selected.append(GazetteerMatch(start, end, shard.place(idx)))
+                covered_until = end
+        return selected
+
+
+# Singleton instance
+_gazetteer = None
+
+
+def get_gazetteer() -> Gazetteer:
+    """Get or create the gazetteer configured in settings."""
+    global _gazetteer
+    if _gazetteer is None:
+        settings = get_settings()
+        directory = os.path.join(BACKEND_DIR, settings.gazetteer_dir)
+        _gazetteer = Gazetteer(directory, settings.gazetteer_regions)
+    return _gazetteer
@@ -1,11 +1,68 @@
-from typing import Optional, Tuple
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
+"""
+Geocoding with a persistent cache in front of the provider.
+
+Every answer, including "not found", is stored in the geocode_cache table
+keyed by the normalized query, so a name is sent to the provider once.
+Negative answers expire after negative_ttl, as places get added to
+OpenStreetMap over time; provider errors are never cached. The provider is
+injectable (see GeocodingProvider), e.g. a local stub for tests.
+"""
+
+import json
+import re
 import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional, Protocol, Tuple
 
+from geopy.exc import GeocoderServiceError, GeocoderTimedOut
+from geopy.geocoders import Nominatim
+from sqlalchemy import select
+from sqlalchemy.orm import Session
 
-class Geocoder:
-    """Geocoding service using Nominatim (OpenStreetMap)."""
+from ..config import get_settings
+from ..database import SessionLocal, dialect_insert
+from ..models import GeocodeCacheEntry
+
+NEGATIVE_TTL = timedelta(days=7)
+
+# Locations store state codes; queries name the state, as Nominatim matches
+# names more reliably
+STATE_NAMES = {
+    "AL": "Alabama", "AK": "Alaska", "AZ": "Arizona", "AR": "Arkansas", "CA": "California",
+    "CO": "Colorado", "CT": "Connecticut", "DE": "Delaware", "DC": "District of Columbia",
+    "FL": "Florida", "GA": "Georgia", "HI": "Hawaii", "ID": "Idaho", "IL": "Illinois",
+    "IN": "Indiana", "IA": "Iowa", "KS": "Kansas", "KY": "Kentucky", "LA": "Louisiana",
+    "ME": "Maine", "MD": "Maryland", "MA": "Massachusetts", "MI": "Michigan", "MN": "Minnesota",
+    "MS": "Mississippi", "MO": "Missouri", "MT": "Montana", "NE": "Nebraska", "NV": "Nevada",
+    "NH": "New Hampshire", "NJ": "New Jersey", "NM": "New Mexico", "NY": "New York",
+    "NC": "North Carolina", "ND": "North Dakota", "OH": "Ohio", "OK": "Oklahoma", "OR": "Oregon",
+    "PA": "Pennsylvania", "RI": "Rhode Island", "SC": "South Carolina", "SD": "South Dakota",
+    "TN": "Tennessee", "TX": "Texas", "UT": "Utah", "VT": "Vermont", "VA": "Virginia",
+    "WA": "Washington", "WV": "West Virginia", "WI": "Wisconsin", "WY": "Wyoming",
+}
+
+# Reverse lookups are cached per ~1m cell
+REVERSE_PRECISION = 5
+
+
+class GeocodingError(Exception):
+    """Provider failed to answer (timeout, outage); the query may be retried."""
+
+
+class GeocodingProvider(Protocol):
+    """Resolves queries to coordinates and back."""
+
+    def geocode(self, query: str) -> Optional[Tuple[float, float]]:
+        """Return (lat, lng), None if not found; raise GeocodingError on failure."""
+        ...
+
+    def reverse(self, lat: float, lng: float) -> Optional[dict]:
+        """Return address components, None if not found; raise GeocodingError on failure."""
+        ...
+
+
+class NominatimProvider:
+    """Geocoding provider using Nominatim (OpenStreetMap)."""
 
     def __init__(self, user_agent: str = "scrapey/1.0"):
         self.geolocator = Nominatim(user_agent=user_agent)
@@ -19,57 +76,191 @@ class Geocoder:
             time.sleep(self._min_delay - elapsed)
         self._last_request = time.time()
 
-    def geocode(self, location_name: str, city: str = None, state: str = "Hawaii") -> Optional[Tuple[float, float]]:
+    def geocode(self, query: str) -> Optional[Tuple[float, float]]:
+        self._rate_limit()
+        try:
+            location = self.geolocator.geocode(query, timeout=10)
+        except (GeocoderTimedOut, GeocoderServiceError) as e:
+            raise GeocodingError(f"Geocoding error for '{query}': {e}") from e
+        if location:
+            return (location.latitude, location.longitude)
+        return None
+
+    def reverse(self, lat: float, lng: float) -> Optional[dict]:
+        self._rate_limit()
+        try:
+            location = self.geolocator.reverse((lat, lng), timeout=10)
+        except (GeocoderTimedOut, GeocoderServiceError) as e:
+            raise GeocodingError(f"Reverse geocoding error for ({lat}, {lng}): {e}") from e
+        if location and location.raw.get("address"):
+            return location.raw["address"]
+        return None
+
+
+class Geocoder:
+    """Cached geocoding service."""
+
+    def __init__(
+        self,
+        provider: Optional[GeocodingProvider] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+        negative_ttl: timedelta = NEGATIVE_TTL
+    ):
         """
-        Geocode a location name to coordinates.
+        Args:
+            provider: Geocoding provider (default: Nominatim)
+            session_factory: Creates sessions for cache access when the caller
+                doesn't pass one
+            negative_ttl: How long "not found" answers are trusted
+        """
+        self.provider = provider or NominatimProvider()
+        self.session_factory = session_factory
+        self.negative_ttl = negative_ttl
+
+    @staticmethod
+    def query_key(location_name: str, city: str = None, state: Optional[str] = None) -> str:
+        """
+        Build the provider query for a place, normalized for use as a cache key.
 
         Args:
             location_name: Name of the place
             city: City name (optional)
-            state: State name (default: Hawaii)
-
-        Returns:
-            Tuple of (latitude, longitude) or None if not found
+            state: State code or name (default: settings.default_state)
         """
-        self._rate_limit()
-
-        # Build search query
+        state = state or get_settings().default_state
         query_parts = [location_name]
         if city:
             query_parts.append(city)
-        query_parts.append(state)
+        query_parts.append(STATE_NAMES.get(state.upper(), state))
         query = ", ".join(query_parts)
+        query = query.replace("’", "'").replace("‘", "'")
+        return re.sub(r"\s+", " ", query).strip().lower()
+
+    def cached(self, db: Session, keys: Iterable[str]) -> Dict[str, Optional[Tuple[float, float]]]:
+        """
+        Look up several forward queries in the cache with one query.
+
+        Args:
+            db: Database session
+            keys: Keys from query_key()
+
+        Returns:
+            Dictionary of key -> (lat, lng), or None for a "not found" answer.
+            Keys without an unexpired entry are left out.
+        """
+        keys = list(set(keys))
+        if not keys:
+            return {}
+
+        now = datetime.utcnow()
+        return {
+            entry.query_key: (entry.lat, entry.lng) if entry.found else None
+            for entry in db.scalars(
+                select(GeocodeCacheEntry).where(GeocodeCacheEntry.query_key.in_(keys))
+            )
+            if entry.expires_at is None or entry.expires_at > now
+        }
+
+    def _lookup(self, db: Session, key: str, resolve: Callable[[], object], to_entry: Callable):
+        entry = db.get(GeocodeCacheEntry, key)
+        if entry is not None and (entry.expires_at is None or entry.expires_at > datetime.utcnow()):
+            return entry
 
         try:
-            location = self.geolocator.geocode(query, timeout=10)
-            if location:
-                return (location.latitude, location.longitude)
-            return None
-        except (GeocoderTimedOut, GeocoderServiceError) as e:
-            print(f"Geocoding error for '{query}': {e}")
+            answer = resolve()
+        except GeocodingError as e:
+            print(e)
             return None
 
-    def reverse_geocode(self, lat: float, lng: float) -> Optional[dict]:
+        values = {
+            "query_key": key,
+            "found": answer is not None,
+            "lat": None,
+            "lng": None,
+            "address": None,
+            "created_at": datetime.utcnow(),
+            "expires_at": None if answer is not None else datetime.utcnow() + self.negative_ttl,
+        }
+        if answer is not None:
+            values.update(to_entry(answer))
+
+        stmt = dialect_insert(db)(GeocodeCacheEntry)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[GeocodeCacheEntry.query_key],
+            set_={column: stmt.excluded[column] for column in values if column != "query_key"},
+        ), values)
+        db.commit()
+        return GeocodeCacheEntry(**values)
+
+    def _with_session(self, db: Optional[Session], fn):
+        if db is not None:
+            return fn(db)
+        db = self.session_factory()
+        try:
+            return fn(db)
+        finally:
+            db.close()
+
+    def geocode(
+        self,
+        location_name: str,
+        city: str = None,
+        state: Optional[str] = None,
+        db: Optional[Session] = None
+    ) -> Optional[Tuple[float, float]]:
+        """
+        Geocode a location name to coordinates.
+
+        Args:
+            location_name: Name of the place
+            city: City name (optional)
+            state: State code or name (default: settings.default_state)
+            db: Session for the cache (committed), or None to use a new one
+
+        Returns:
+            Tuple of (latitude, longitude) or None if not found
+        """
+        _, coords = self.resolve(self.query_key(location_name, city, state), db)
+        return coords
+
+    def resolve(self, key: str, db: Optional[Session] = None) -> Tuple[bool, Optional[Tuple[float, float]]]:
+        """
+        Geocode a query_key() key, telling provider errors apart from misses.
+
+        Returns:
+            (answered, coordinates): answered is False when the provider
+            failed and the query should be retried later
+        """
+        entry = self._with_session(db, lambda session: self._lookup(
+            session, key,
+            lambda: self.provider.geocode(key),
+            lambda coords: {"lat": coords[0], "lng": coords[1]}
+        ))
+        if entry is None:
+            return False, None
+        return True, (entry.lat, entry.lng) if entry.found else None
+
+    def reverse_geocode(self, lat: float, lng: float, db: Optional[Session] = None) -> Optional[dict]:
         """
         Reverse geocode coordinates to address info.
 
         Args:
             lat: Latitude
             lng: Longitude
+            db: Session for the cache (committed), or None to use a new one
 
         Returns:
             Dictionary with address components or None
         """
-        self._rate_limit()
-
-        try:
-            location = self.geolocator.reverse((lat, lng), timeout=10)
-            if location and location.raw.get("address"):
-                return location.raw["address"]
-            return None
-        except (GeocoderTimedOut, GeocoderServiceError) as e:
-            print(f"Reverse geocoding error for ({lat}, {lng}): {e}")
+        key = f"reverse:{lat:.{REVERSE_PRECISION}f},{lng:.{REVERSE_PRECISION}f}"
+        entry = self._with_session(db, lambda session: self._lookup(
+            session, key,
+            lambda: self.provider.reverse(lat, lng),
+            lambda address: {"lat": lat, "lng": lng, "address": json.dumps(address)}
+        ))
+        if entry is None or not entry.found:
             return None
+        return json.loads(entry.address)
 
 
 # Singleton instance
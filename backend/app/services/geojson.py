@@ -0,0 +1,73 @@
+"""
+Streaming GeoJSON encoding for large heatmap responses.
+
+Building a Pydantic model per feature, then validating and serializing
+the whole collection again through response_model, costs far more than
+the query itself once a response holds tens of thousands of features.
+feature_collection_stream() turns batches of plain result rows from an
+asyncio result into orjson-encoded FeatureCollection bytes, one batch at
+a time, so the response can be streamed while the database cursor is
+still being read.
+
+The output has the same shape as HeatmapResponse.
+"""
+
+from typing import AsyncIterable, AsyncIterator, List, Sequence
+
+import orjson
+
+# Features encoded per chunk of the streamed response
+CHUNK_FEATURES = 2000
+
+_HEAD = b'{"type":"FeatureCollection","features":['
+_TAIL = b"]}"
+
+
+def heatmap_feature(row: Sequence) -> dict:
+    """
+    Build a heatmap feature dict from a result row.
+
+    Args:
+        row: (id, name, lng, lat, place_type, city, mention_count, sentiment_sum)
+    """
+    location_id, name, lng, lat, place_type, city, mention_count, sentiment_sum = row
+    avg_sentiment = sentiment_sum / mention_count if mention_count else 0.0
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [lng, lat]},
+        "properties": {
+            "id": location_id,
+            "name": name,
+            "mention_count": mention_count,
+            "avg_sentiment": round(float(avg_sentiment), 2),
+            "place_type": place_type,
+            "city": city,
+        },
+    }
+
+
+def _encode_features(features: List[dict], first: bool) -> bytes:
+    # Encode the features as a list and drop its brackets
+    return (b"" if first else b",") + orjson.dumps(features)[1:-1]
+
+
+async def feature_collection_stream(partitions: AsyncIterable[Sequence[Sequence]]) -> AsyncIterator[bytes]:
+    """
+    Encode heatmap rows as a GeoJSON FeatureCollection from an async result.
+
+    Args:
+        partitions: Batches of rows as accepted by heatmap_feature(), e.g.
+            AsyncResult.partitions(CHUNK_FEATURES)
+
+    Yields:
+        Consecutive pieces of the JSON document, one per batch
+    """
+    yield _HEAD
+
+    first = True
+    async for rows in partitions:
+        if rows:
+            yield _encode_features([heatmap_feature(row) for row in rows], first)
+            first = False
+
+    yield _TAIL
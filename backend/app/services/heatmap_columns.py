@@ -0,0 +1,102 @@
+"""
+Compact columnar binary encoding of heatmap points.
+
+GeoJSON repeats every key for every feature. This format stores each
+property as a typed array instead, which the frontend reads with
+DataView/TypedArray views without parsing JSON per feature. Layout
+(little-endian, every section starts on a 4-byte boundary):
+
+    magic        4 bytes   b"HMC1"
+    count        uint32    number of points (n)
+    dict_size    uint32    byte length of the dictionary
+    names_size   uint32    byte length of the names blob
+    dictionary   JSON      {"place_types": [...], "cities": [...]}
+    id           uint32[n]
+    lng, lat     float32[n] each (~1 m precision)
+    mention_count uint32[n]
+    place_type   uint16[n]  index into place_types
+    city         uint16[n]  index into cities, 0xFFFF for none
+    sentiment    int8[n]    avg_sentiment in hundredths (-100..100)
+    names        UTF-8, separated by NUL, so the client decodes them in one go
+
+Decoded points carry the same values as the GeoJSON response, except the
+coordinates are rounded to float32.
+"""
+
+import json
+import struct
+import sys
+from array import array
+from typing import Iterable, Sequence
+
+MEDIA_TYPE = "application/vnd.scrapey.heatmap-columns"
+
+MAGIC = b"HMC1"
+NO_CITY = 0xFFFF
+
+
+def _padded(data: bytes) -> bytes:
+    return data + b"\0" * (-len(data) % 4)
+
+
+def _le(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def encode_heatmap_columns(rows: Iterable[Sequence]) -> bytes:
+    """
+    Encode heatmap rows in the columnar format.
+
+    Args:
+        rows: (id, name, lng, lat, place_type, city, mention_count, sentiment_sum),
+            as produced by the heatmap query
+
+    Returns:
+        The encoded document
+    """
+    ids, lngs, lats, counts = array("I"), array("f"), array("f"), array("I")
+    place_types, cities, sentiments = array("H"), array("H"), array("b")
+    names = []
+    type_index, city_index = {}, {}
+
+    for location_id, name, lng, lat, place_type, city, mention_count, sentiment_sum in rows:
+        avg_sentiment = sentiment_sum / mention_count if mention_count else 0.0
+
+        ids.append(location_id)
+        lngs.append(lng)
+        lats.append(lat)
+        counts.append(mention_count)
+        # Rounded like the GeoJSON response first, so both give the same value
+        sentiments.append(round(round(max(-1.0, min(1.0, avg_sentiment)), 2) * 100))
+        place_types.append(type_index.setdefault(place_type, len(type_index)))
+        cities.append(NO_CITY if city is None else city_index.setdefault(city, len(city_index)))
+
+        names.append(name.replace("\0", ""))
+
+    if len(city_index) >= NO_CITY:
+        raise ValueError("Too many distinct cities for the columnar format")
+
+    dictionary = json.dumps(
+        {"place_types": list(type_index), "cities": list(city_index)},
+        separators=(",", ":")
+    ).encode("utf-8")
+    dictionary = _padded(dictionary)
+
+    names = "\0".join(names).encode("utf-8")
+
+    return b"".join([
+        MAGIC,
+        struct.pack("<III", len(ids), len(dictionary), len(names)),
+        dictionary,
+        _le(ids),
+        _le(lngs),
+        _le(lats),
+        _le(counts),
+        _le(place_types),
+        _le(cities),
+        _padded(sentiments.tobytes()),
+        names,
+    ])
@@ -0,0 +1,107 @@
+"""
+Optional monthly range partitioning of the mentions table on Postgres.
+
+With mention_partitioning enabled, the mentions table is created as
+PARTITION BY RANGE (created_at) with one partition per calendar month and
+a default partition for anything outside them. Postgres then prunes
+partitions for queries that bound created_at, so time-windowed scans
+(rollup backfills, recent mentions) only touch the months involved, and
+old months can be detached or dropped as whole tables.
+
+ensure_mention_partitions() runs on every init_db() and keeps partitions
+created ahead of time. SQLite has no partitioning; there the composite
+created_at indexes serve the same queries.
+"""
+
+from datetime import date
+from typing import List
+
+from sqlalchemy import PrimaryKeyConstraint, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+
+from ..config import get_settings
+
+MONTHS_BACK = 12
+MONTHS_AHEAD = 3
+
+DEFAULT_PARTITION = "mentions_default"
+
+
+def mention_table_args() -> tuple:
+    """Primary key (and partitioning) arguments for the mentions table."""
+    settings = get_settings()
+    postgres = make_url(settings.database_url).get_backend_name() == "postgresql"
+    if not (settings.mention_partitioning and postgres):
+        return (PrimaryKeyConstraint("id"),)
+    # The partition key must be part of the primary key
+    return (
+        PrimaryKeyConstraint("id", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Name of the partition holding a month's mentions."""
+    return f"mentions_y{month.year}m{month.month:02d}"
+
+
+def is_partitioned(conn) -> bool:
+    """Whether the mentions table uses the partitioned layout."""
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'mentions' AND c.relnamespace = current_schema()::regnamespace"
+    )).first() is not None
+
+
+def ensure_mention_partitions(
+    engine,
+    months_back: int = MONTHS_BACK,
+    months_ahead: int = MONTHS_AHEAD,
+    today: date = None
+) -> List[str]:
+    """
+    Create missing monthly partitions around the current month.
+
+    A month whose rows already landed in the default partition can't get
+    its own partition; it is skipped with a warning and stays in the default.
+
+    Returns:
+        Names of the partitions created
+    """
+    if engine.dialect.name != "postgresql":
+        return []
+
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return []
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF mentions DEFAULT"))
+        existing = set(conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'mentions'::regclass"
+        )).scalars())
+
+    this_month = (today or date.today()).replace(day=1)
+    created = []
+    for offset in range(-months_back, months_ahead + 1):
+        start = _add_months(this_month, offset)
+        name = partition_name(start)
+        if name in existing:
+            continue
+
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"CREATE TABLE {name} PARTITION OF mentions "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{_add_months(start, 1).isoformat()}')"
+                ))
+            created.append(name)
+        except DBAPIError as e:
+            print(f"Skipping partition {name}: {e.orig}")
+
+    return created
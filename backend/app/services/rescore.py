@@ -0,0 +1,102 @@
+"""
+Re-score mention sentiment after the analyzer changes.
+
+Every mention records the scorer version that produced its score
+(Mention.sentiment_version). rescore_mentions() walks the mentions table in
+primary-key order, re-scores the contexts of mentions from any other
+version in parallel (SentimentAnalyzer.analyze_batch) and writes the new
+scores back with bulk updates, fixing the rollup in the same transaction.
+
+Each chunk is its own short transaction, so the API keeps serving
+consistent numbers while the job runs. Finished rows carry the current
+version, so an interrupted run resumes where it stopped and a repeated
+run is a no-op.
+"""
+
+from typing import Callable, Optional
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..models import Mention
+from .data_version import bump_data_version
+from .rollup import adjust_sentiment
+from .sentiment import SentimentAnalyzer, get_sentiment_analyzer
+
+DEFAULT_CHUNK_SIZE = 20000
+
+
+def _outdated(version: str):
+    return or_(Mention.sentiment_version.is_(None), Mention.sentiment_version != version)
+
+
+def count_outdated(db: Session, version: Optional[str] = None) -> int:
+    """Count mentions not scored by the given (default: current) scorer version."""
+    version = version or get_sentiment_analyzer().version
+    return db.scalar(select(func.count(Mention.id)).where(_outdated(version)))
+
+
+def rescore_mentions(
+    db: Session,
+    analyzer: Optional[SentimentAnalyzer] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_chunk: Optional[Callable[[int, int], None]] = None
+) -> int:
+    """
+    Re-score all mentions not scored by the analyzer's version.
+
+    Args:
+        db: Database session, committed after every chunk
+        analyzer: Sentiment analyzer (default: shared instance)
+        chunk_size: Mentions per transaction
+        on_chunk: Optional callback with (mentions rescored so far, last id)
+
+    Returns:
+        Number of mentions rescored
+    """
+    analyzer = analyzer or get_sentiment_analyzer()
+    version = analyzer.version
+
+    rescored = 0
+    last_id = 0
+    while True:
+        # Keyset pagination: each chunk is a fresh range scan of the primary
+        # key, so no cursor stays open across the commits below
+        rows = db.execute(
+            select(
+                Mention.id,
+                Mention.location_id,
+                Mention.created_at,
+                Mention.sentiment_score,
+                Mention.context
+            )
+            .where(Mention.id > last_id, _outdated(version))
+            .order_by(Mention.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return rescored
+
+        scores = analyzer.analyze_batch([row.context for row in rows])
+
+        db.execute(
+            update(Mention),
+            [
+                {"id": row.id, "sentiment_score": score, "sentiment_version": version}
+                for row, score in zip(rows, scores)
+            ]
+        )
+        adjust_sentiment(
+            db,
+            (
+                (row.location_id, row.created_at, score - (row.sentiment_score or 0.0))
+                for row, score in zip(rows, scores)
+            )
+        )
+        bump_data_version(db, {row.location_id for row in rows})
+        db.commit()
+
+        rescored += len(rows)
+        last_id = rows[-1].id
+        if on_chunk:
+            on_chunk(rescored, last_id)
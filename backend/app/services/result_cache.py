@@ -0,0 +1,230 @@
+"""
+Result cache for the heatmap and search endpoints.
+
+A few parameter combinations account for most read traffic, so encoded
+responses are cached by normalized query parameters. Every entry records
+the data version it was computed at (see data_version). When the version
+has moved on, the locations changed since then are checked against the
+entry's scope: a heatmap entry is only stale if a changed location lies
+in its bounds, a search entry only if a changed location matches its
+query text. Unaffected entries are re-stamped with the new version and
+served; affected ones are recomputed. Entries also expire after a TTL,
+which bounds how far back the change log has to reach.
+
+The default backend is an in-process LRU bounded by total bytes. With
+result_cache_url set, entries live in a Redis-compatible server instead
+(requires the redis package), shared by all uvicorn workers.
+"""
+
+import asyncio
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterable, AsyncIterator, Callable, List, Optional, Protocol
+
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from .data_version import changed_locations
+
+# Entry header: data version, creation time
+_HEADER = struct.Struct("<qd")
+
+
+class CacheBackend(Protocol):
+    """Byte store behind ResultCache."""
+
+    evictions: int
+
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    def set(self, key: str, value: bytes, ttl: float):
+        ...
+
+    def clear(self):
+        ...
+
+
+class MemoryBackend:
+    """Thread-safe in-process LRU, bounded by the total size of its values."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        # A single huge result would flush everything else
+        if len(value) > self.max_bytes // 4:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key: str):
+        value, _ = self._entries.pop(key)
+        self._size -= len(value)
+
+
+class RedisBackend:
+    """
+    Entries in a Redis-compatible server, shared between processes.
+
+    The server's own maxmemory policy bounds its size, so evictions are
+    not counted here.
+    """
+
+    def __init__(self, url: str, prefix: str = "scrapey:results:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+def cache_key(*parts) -> str:
+    """Join normalized parameters into a cache key."""
+    return "|".join("" if part is None else str(part) for part in parts)
+
+
+class ResultCache:
+    """Encoded endpoint results, invalidated by data version and change log."""
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+
+        # Updated from the threadpool lookups run in, hence the lock
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0  # Stale entries affected by a change
+        self.revalidations = 0  # Stale entries kept, no change affected them
+        self._lock = threading.Lock()
+
+    def _count(self, *counters: str):
+        with self._lock:
+            for counter in counters:
+                setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(
+        self,
+        db: Session,
+        key: str,
+        version: int,
+        affected_by: Callable[[List[Row]], bool]
+    ) -> Optional[bytes]:
+        """
+        Look up a result computed at the given data version or still valid at it.
+
+        Args:
+            db: Session used to read the change log
+            key: Cache key of the result
+            version: Current data version, read before the lookup
+            affected_by: Whether changed location rows (see changed_locations)
+                could alter the result
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        blob = self.backend.get(key)
+        if blob is None:
+            self._count("misses")
+            return None
+
+        entry_version, created = _HEADER.unpack_from(blob)
+        value = blob[_HEADER.size:]
+
+        if entry_version < version:
+            changes = changed_locations(db, entry_version)
+            if changes is None or (changes and affected_by(changes)):
+                self._count("invalidations", "misses")
+                return None
+
+            remaining = self.ttl - (time.time() - created)
+            if remaining > 0:
+                self.backend.set(key, _HEADER.pack(version, created) + value, remaining)
+            self._count("revalidations")
+
+        self._count("hits")
+        return value
+
+    def put(self, key: str, version: int, value: bytes):
+        """Store a result computed at a data version."""
+        self.backend.set(key, _HEADER.pack(version, time.time()) + value, self.ttl)
+
+    async def put_async(self, key: str, version: int, value: bytes):
+        """Like put(), in a worker thread so a network backend doesn't block the event loop."""
+        await asyncio.to_thread(self.put, key, version, value)
+
+    async def storing_async(self, key: str, version: int, chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        """Pass a streamed result through, caching it once complete."""
+        parts = []
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        await self.put_async(key, version, b"".join(parts))
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters of this process."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.backend.evictions,
+                "invalidations": self.invalidations,
+                "revalidations": self.revalidations,
+            }
+
+
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """Get or create the shared result cache, configured from settings."""
+    global _result_cache
+    if _result_cache is None:
+        settings = get_settings()
+        if settings.result_cache_url:
+            backend = RedisBackend(settings.result_cache_url)
+        else:
+            backend = MemoryBackend(settings.result_cache_max_mb * 1024 * 1024)
+        _result_cache = ResultCache(backend, settings.result_cache_ttl)
+    return _result_cache
@@ -0,0 +1,237 @@
+"""
+Pre-aggregated mention statistics per location and hourly time bucket.
+
+The heatmap and search endpoints read from the location_stats table
+instead of aggregating the whole mentions table on every request. Writers
+(the scrape pipeline, the seeder) must call record_mentions() in the same
+transaction as the mentions they insert; rebuild_stats() recomputes the
+table from scratch for backfills.
+
+The "day" and "week" views are sliding windows that start on an hour
+boundary (window_start()), so they sum at most 169 hourly buckets per
+location and give the same answer for a whole hour. Hourly buckets older
+than HOURLY_RETENTION can't fall in any window anymore; compact_stats()
+folds them into one ARCHIVE_BUCKET row per location, which keeps the
+all-time view to a handful of rows per location as history grows.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, literal, select
+from sqlalchemy.orm import Session
+
+from ..database import dialect_insert
+from ..models import LocationStat, Mention
+
+
+# Sliding windows served by the API
+WINDOWS = {
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+# Hourly buckets are kept a day longer than the longest window
+HOURLY_RETENTION = max(WINDOWS.values()) + timedelta(days=1)
+
+# Per-location row holding everything older than HOURLY_RETENTION
+ARCHIVE_BUCKET = datetime(1970, 1, 1)
+
+
+def bucket_for(timestamp: datetime) -> datetime:
+    """Return the start of the hourly bucket containing timestamp."""
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def window_start(time_range: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Start of a sliding window, aligned to its first hourly bucket.
+
+    Args:
+        time_range: "day", "week", or anything else for all time
+        now: End of the window (default: current UTC time)
+
+    Returns:
+        Bucket start, or None for all time
+    """
+    window = WINDOWS.get(time_range)
+    if window is None:
+        return None
+    return bucket_for((now or datetime.utcnow()) - window)
+
+
+def record_mentions(db: Session, mentions: Iterable[Tuple[int, datetime, float]]) -> int:
+    """
+    Add mentions to the rollup table.
+
+    Args:
+        db: Session holding the transaction that inserts the mentions
+        mentions: Tuples of (location_id, created_at, sentiment_score)
+
+    Returns:
+        Number of bucket rows touched
+    """
+    buckets = defaultdict(lambda: [0, 0.0])
+    for location_id, created_at, sentiment in mentions:
+        bucket = buckets[(location_id, bucket_for(created_at))]
+        bucket[0] += 1
+        bucket[1] += sentiment or 0.0
+
+    if not buckets:
+        return 0
+
+    rows = [
+        {
+            "location_id": location_id,
+            "bucket_start": bucket_start,
+            "mention_count": count,
+            "sentiment_sum": sentiment_sum,
+        }
+        for (location_id, bucket_start), (count, sentiment_sum) in buckets.items()
+    ]
+
+    table = LocationStat.__table__
+    stmt = dialect_insert(db)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.location_id, table.c.bucket_start],
+        set_={
+            "mention_count": table.c.mention_count + stmt.excluded.mention_count,
+            "sentiment_sum": table.c.sentiment_sum + stmt.excluded.sentiment_sum,
+        },
+    )
+    db.execute(stmt, rows)
+    return len(rows)
+
+
+def adjust_sentiment(db: Session, changes: Iterable[Tuple[int, datetime, float]]) -> int:
+    """
+    Apply sentiment score changes of existing mentions to the rollup table.
+
+    A bucket that was compacted meanwhile is recreated with a zero count
+    and the delta, which keeps totals exact; the next compaction folds it.
+
+    Args:
+        db: Session holding the transaction that updates the mentions
+        changes: Tuples of (location_id, created_at, new_score - old_score)
+
+    Returns:
+        Number of bucket rows touched
+    """
+    deltas = defaultdict(float)
+    for location_id, created_at, delta in changes:
+        deltas[(location_id, bucket_for(created_at))] += delta
+
+    rows = [
+        {"location_id": location_id, "bucket_start": bucket_start, "mention_count": 0, "sentiment_sum": delta}
+        for (location_id, bucket_start), delta in deltas.items()
+        if delta
+    ]
+    if not rows:
+        return 0
+
+    table = LocationStat.__table__
+    stmt = dialect_insert(db)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.location_id, table.c.bucket_start],
+        set_={"sentiment_sum": table.c.sentiment_sum + stmt.excluded.sentiment_sum},
+    )
+    db.execute(stmt, rows)
+    return len(rows)
+
+
+def compact_stats(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Fold hourly buckets older than HOURLY_RETENTION into the archive buckets.
+
+    Totals are unchanged and no window reaches the folded buckets, so
+    served results stay the same. Does not commit.
+
+    Args:
+        db: Database session
+        now: Current time (default: current UTC time)
+
+    Returns:
+        Number of hourly bucket rows folded
+    """
+    horizon = bucket_for(now or datetime.utcnow()) - HOURLY_RETENTION
+    table = LocationStat.__table__
+    expired = and_(table.c.bucket_start > ARCHIVE_BUCKET, table.c.bucket_start < horizon)
+
+    stmt = dialect_insert(db)(table).from_select(
+        ["location_id", "bucket_start", "mention_count", "sentiment_sum"],
+        select(
+            table.c.location_id,
+            literal(ARCHIVE_BUCKET, LocationStat.bucket_start.type),
+            func.sum(table.c.mention_count),
+            func.sum(table.c.sentiment_sum)
+        ).where(expired).group_by(table.c.location_id)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.location_id, table.c.bucket_start],
+        set_={
+            "mention_count": table.c.mention_count + stmt.excluded.mention_count,
+            "sentiment_sum": table.c.sentiment_sum + stmt.excluded.sentiment_sum,
+        },
+    )
+    db.execute(stmt)
+    return db.execute(delete(table).where(expired)).rowcount
+
+
+def rebuild_stats(db: Session, chunk_size: int = 10000) -> int:
+    """
+    Recompute the rollup table from the mentions table.
+
+    Mentions are streamed in chunks and each chunk is upserted on its own,
+    so memory stays bounded by chunk_size however large the table is.
+
+    Args:
+        db: Database session (committed by the caller)
+        chunk_size: Number of mentions streamed and upserted at a time
+
+    Returns:
+        Number of bucket rows written
+    """
+    db.query(LocationStat).delete(synchronize_session=False)
+
+    result = db.execute(
+        select(Mention.location_id, Mention.created_at, Mention.sentiment_score)
+        .execution_options(yield_per=chunk_size)
+    )
+    for chunk in result.partitions():
+        record_mentions(db, chunk)
+
+    return db.query(LocationStat).count()
+
+
+def stats_subquery(since: Optional[datetime] = None, location_ids: Optional[Iterable[int]] = None):
+    """
+    Build a per-location aggregate over the rollup table.
+
+    Args:
+        since: Only count buckets covering this time or later (None for all time).
+            The cutoff is widened to the start of its hourly bucket.
+        location_ids: Only aggregate these locations (None for all)
+
+    Returns:
+        Subquery with location_id, mention_count and sentiment_sum columns
+    """
+    location_id = LocationStat.location_id
+    if since is not None:
+        # Grouping on an expression keeps SQLite from walking the primary key
+        # (location_id first) for its ordering; it reads the covering
+        # (bucket_start, ...) index over the time range instead
+        location_id = location_id + 0
+
+    query = select(
+        location_id.label("location_id"),
+        func.sum(LocationStat.mention_count).label("mention_count"),
+        func.sum(LocationStat.sentiment_sum).label("sentiment_sum")
+    )
+
+    if since is not None:
+        query = query.where(LocationStat.bucket_start >= bucket_for(since))
+    if location_ids is not None:
+        query = query.where(LocationStat.location_id.in_(list(location_ids)))
+
+    return query.group_by(location_id).subquery()
@@ -0,0 +1,222 @@
+"""
+Full-text search over locations backed by an SQLite FTS5 trigram index.
+
+The locations_fts table indexes name, city, state and place_type of every
+location and is kept in sync by triggers, so substring searches become
+index lookups instead of leading-wildcard ILIKE scans. Trigrams need at
+least three characters; shorter queries, and databases without FTS5
+(e.g. Postgres), fall back to ILIKE in the caller.
+"""
+
+import math
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import DateTime, bindparam, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from ..models import LocationStat
+from .rollup import bucket_for
+
+FTS_TABLE = "locations_fts"
+MIN_QUERY_LENGTH = 3
+
+# Relative importance of the name, city, state and place_type columns
+COLUMN_WEIGHTS = (10.0, 3.0, 1.0, 2.0)
+
+# bm25 parameters used by text_relevance()
+BM25_K1 = 1.2
+BM25_B = 0.75
+AVERAGE_COLUMN_LENGTH = 16
+
+# Share of the final score that comes from mention count vs text relevance
+POPULARITY_WEIGHT = 0.5
+
+# Whether each database (by URL) has the index, checked once per process
+_available: Dict[str, bool] = {}
+
+_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, city, state, place_type,
+        content='locations', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON locations BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, city, state, place_type)
+        VALUES (new.id, new.name, new.city, new.state, new.place_type);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON locations BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, city, state, place_type)
+        VALUES ('delete', old.id, old.name, old.city, old.state, old.place_type);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, city, state, place_type
+    ON locations BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, city, state, place_type)
+        VALUES ('delete', old.id, old.name, old.city, old.state, old.place_type);
+        INSERT INTO {FTS_TABLE}(rowid, name, city, state, place_type)
+        VALUES (new.id, new.name, new.city, new.state, new.place_type);
+    END
+    """,
+]
+
+
+def ensure_search_index(engine) -> bool:
+    """
+    Create the FTS table and sync triggers if missing, indexing existing rows.
+
+    Args:
+        engine: Engine for the application database
+
+    Returns:
+        True if the index is available
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE}
+            ).first()
+
+            for statement in _DDL:
+                conn.execute(text(statement))
+
+            if not exists:
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    except OperationalError as e:
+        # SQLite built without FTS5 or the trigram tokenizer (< 3.34)
+        print(f"Full-text search index unavailable: {e}")
+        _available[str(engine.url)] = False
+        return False
+
+    _available[str(engine.url)] = True
+    return True
+
+
+def _has_search_index(db: Session) -> bool:
+    bind = db.get_bind()
+    if bind.dialect.name != "sqlite":
+        return False
+
+    key = str(bind.url)
+    if key not in _available:
+        _available[key] = db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE}
+        ).first() is not None
+    return _available[key]
+
+
+def search_candidates(
+    db: Session,
+    q: str,
+    limit: int,
+    since: Optional[datetime] = None
+) -> Optional[List[Tuple[int, float]]]:
+    """
+    Find locations whose text contains q, for ranking by blend_scores().
+
+    Broad queries match far more locations than are ranked, so the
+    candidates are picked in SQL from every match: the best text matches
+    by FTS5's bm25() and the most mentioned matches by the rollup. A
+    popular place therefore never falls outside the candidates just
+    because many weaker text matches come first.
+
+    Args:
+        db: Database session
+        q: Search query, matched as a case-insensitive substring
+        limit: Candidates taken by each ordering (up to twice as many in all)
+        since: Count mentions from this time on (None for all time)
+
+    Returns:
+        List of (location_id, relevance) with higher relevance better, or
+        None when the index cannot answer this query
+    """
+    q = q.strip()
+    if len(q) < MIN_QUERY_LENGTH or not _has_search_index(db):
+        return None
+
+    phrase = '"' + q.replace('"', '""') + '"'
+    columns = f"{FTS_TABLE}.rowid, {FTS_TABLE}.name, {FTS_TABLE}.city, {FTS_TABLE}.state, {FTS_TABLE}.place_type"
+    weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS)
+
+    best_text = db.execute(
+        text(
+            f"SELECT {columns} FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :phrase "
+            f"ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT :limit"
+        ),
+        {"phrase": phrase, "limit": limit}
+    ).all()
+
+    # Mentions per match through the rollup's primary key, one location at a time
+    bucket_filter = "AND stats.bucket_start >= :since" if since is not None else ""
+    most_mentioned = text(
+        f"SELECT {columns} FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :phrase "
+        f"ORDER BY (SELECT coalesce(sum(stats.mention_count), 0) FROM {LocationStat.__tablename__} AS stats "
+        f"WHERE stats.location_id = {FTS_TABLE}.rowid {bucket_filter}) DESC LIMIT :limit"
+    )
+    params = {"phrase": phrase, "limit": limit}
+    if since is not None:
+        most_mentioned = most_mentioned.bindparams(bindparam("since", type_=DateTime))
+        params["since"] = bucket_for(since)
+    popular = db.execute(most_mentioned, params).all()
+
+    needle = q.lower()
+    rows = {row[0]: row for row in best_text + popular}
+    return [(location_id, text_relevance(needle, row[1:])) for location_id, row in rows.items()]
+
+
+def text_relevance(needle: str, columns) -> float:
+    """
+    Score how well a location's text columns match a lowercase query.
+
+    A bm25-style score: occurrences per column, damped by column length
+    and weighted by COLUMN_WEIGHTS. FTS5's bm25() orders the candidates
+    the same way for a single-phrase query, but its scores depend on the
+    whole index; this one is comparable across queries. Names starting
+    with the query get a bonus, as search-as-you-type queries are
+    usually name prefixes.
+    """
+    score = 0.0
+    for weight, value in zip(COLUMN_WEIGHTS, columns):
+        if not value:
+            continue
+        value = value.lower()
+        occurrences = value.count(needle)
+        if occurrences:
+            length_norm = 1 - BM25_B + BM25_B * len(value) / AVERAGE_COLUMN_LENGTH
+            score += weight * occurrences * (BM25_K1 + 1) / (occurrences + BM25_K1 * length_norm)
+
+    if columns[0] and columns[0].lower().startswith(needle):
+        score += COLUMN_WEIGHTS[0]
+
+    return score
+
+
+def blend_scores(relevance: Dict[int, float], mention_counts: Dict[int, int]) -> Dict[int, float]:
+    """
+    Combine text relevance and popularity into one score per location.
+
+    Both signals are scaled to 0..1 within the candidate set; mention
+    counts are log-scaled so a few very popular places don't drown out
+    better text matches.
+    """
+    max_relevance = max(relevance.values(), default=0.0) or 1.0
+    max_popularity = math.log1p(max(mention_counts.values(), default=0)) or 1.0
+
+    return {
+        location_id: (
+            (1 - POPULARITY_WEIGHT) * score / max_relevance
+            + POPULARITY_WEIGHT * math.log1p(mention_counts.get(location_id, 0)) / max_popularity
+        )
+        for location_id, score in relevance.items()
+    }
@@ -1,11 +1,85 @@
+"""
+Sentiment scoring with VADER.
+
+VADER is pure Python, so large batches are fanned out to a process pool
+in which every worker builds its own SentimentIntensityAnalyzer once.
+Workers are spawned rather than forked: the pool starts lazily, while the
+scraper's event loop and geocode queue threads are running, and a forked
+child could inherit a lock held by one of them.
+Scores are memoized by a hash of the text: scraped contexts repeat a lot
+(cross-posts, quotes, bots), and a rescoring backfill sees many duplicates.
+"""
+
+import hashlib
+import multiprocessing
+import os
+from importlib.metadata import version as package_version
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence
+
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 
+# Batches with fewer uncached texts are scored in-process
+PARALLEL_THRESHOLD = 2000
+CHUNK_SIZE = 500
+MEMO_SIZE = 100_000
+
+# Bump when scoring changes in a way the VADER version doesn't capture
+# (e.g. text preprocessing), so the rescoring job picks up every mention
+SCORER_REVISION = 1
+SCORER_VERSION = f"vader-{package_version('vaderSentiment')}.{SCORER_REVISION}"
+
+# Analyzer of a pool worker process
+_worker_analyzer = None
+
+
+def _init_worker():
+    global _worker_analyzer
+    _worker_analyzer = SentimentIntensityAnalyzer()
+
+
+def _score_chunk(texts: List[str]) -> List[float]:
+    """Score texts in a pool worker."""
+    return [_worker_analyzer.polarity_scores(text)["compound"] for text in texts]
+
+
+def _text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
 
 class SentimentAnalyzer:
     """Wrapper for VADER sentiment analysis."""
 
-    def __init__(self):
+    # Stored with every score (Mention.sentiment_version)
+    version = SCORER_VERSION
+
+    def __init__(
+        self,
+        processes: Optional[int] = None,
+        parallel_threshold: int = PARALLEL_THRESHOLD,
+        memo_size: int = MEMO_SIZE
+    ):
+        """
+        Args:
+            processes: Pool size for analyze_batch (default: CPU count; 1 disables the pool)
+            parallel_threshold: Minimum uncached texts in a batch to use the pool
+            memo_size: Maximum memoized scores
+        """
         self.analyzer = SentimentIntensityAnalyzer()
+        self.processes = processes or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+        self.memo_size = memo_size
+
+        self._memo = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _remember(self, key: bytes, score: float):
+        if self.memo_size <= 0:
+            return
+        if len(self._memo) >= self.memo_size:
+            # Evict the oldest entry (dicts keep insertion order)
+            del self._memo[next(iter(self._memo))]
+        self._memo[key] = score
 
     def analyze(self, text: str) -> float:
         """
@@ -20,8 +94,66 @@ class SentimentAnalyzer:
         if not text:
             return 0.0
 
-        scores = self.analyzer.polarity_scores(text)
-        return scores["compound"]
+        key = _text_key(text)
+        score = self._memo.get(key)
+        if score is None:
+            score = self.analyzer.polarity_scores(text)["compound"]
+            self._remember(key, score)
+        return score
+
+    def analyze_batch(self, texts: Sequence[str]) -> List[float]:
+        """
+        Analyze many texts at once.
+
+        Memoized and duplicate texts are scored once. When enough texts are
+        left, they are split into chunks and scored by a process pool.
+
+        Args:
+            texts: The texts to analyze
+
+        Returns:
+            Compound scores in the order of texts
+        """
+        keys = [_text_key(text) if text else None for text in texts]
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key is not None and key not in self._memo and key not in missing:
+                missing[key] = text
+
+        computed = {}
+        if missing:
+            pending = list(missing.values())
+            if self.processes > 1 and len(pending) >= self.parallel_threshold:
+                chunks = [pending[i:i + CHUNK_SIZE] for i in range(0, len(pending), CHUNK_SIZE)]
+                scores = [score for chunk in self._get_pool().map(_score_chunk, chunks) for score in chunk]
+            else:
+                scores = [self.analyzer.polarity_scores(text)["compound"] for text in pending]
+
+            computed = dict(zip(missing, scores))
+            for key, score in computed.items():
+                self._remember(key, score)
+
+        # Look in computed first: a batch larger than the memo evicts its own scores
+        return [
+            0.0 if key is None else computed.get(key, self._memo.get(key))
+            for key in keys
+        ]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+        return self._pool
+
+    def close(self):
+        """Shut down the worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
 
     def analyze_with_details(self, text: str) -> dict:
         """
@@ -49,3 +181,9 @@ def get_sentiment_analyzer() -> SentimentAnalyzer:
     if _analyzer is None:
         _analyzer = SentimentAnalyzer()
     return _analyzer
+
+
+def shutdown_sentiment_analyzer():
+    """Shut down the shared analyzer's worker pool, if one was started."""
+    if _analyzer is not None:
+        _analyzer.close()
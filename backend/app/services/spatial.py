@@ -0,0 +1,240 @@
+"""
+Geohash spatial index for bounding-box queries on locations.
+
+Every location stores the geohash of its coordinates in an indexed column.
+A bounding box is covered by a small set of geohash cells; consecutive
+cells are merged into key ranges, so a box query becomes a handful of
+index range scans followed by an exact lat/lng check on the candidates.
+This works the same on SQLite and Postgres without extensions.
+"""
+
+import math
+from typing import List, Tuple
+
+from sqlalchemy import and_, false, or_, update
+from sqlalchemy.orm import Session
+
+GEOHASH_PRECISION = 9  # ~5m cells
+MAX_COVER_CELLS = 64
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Sorts after every base32 character, used as an open upper bound
+_AFTER_ALL = "~"
+
+
+def _bit_split(precision: int) -> Tuple[int, int]:
+    """Return (lat_bits, lng_bits) for a geohash precision."""
+    total = 5 * precision
+    return total // 2, (total + 1) // 2
+
+
+def _cell_index(value: float, low: float, high: float, bits: int) -> int:
+    index = int((value - low) / (high - low) * (1 << bits))
+    return min(max(index, 0), (1 << bits) - 1)
+
+
+def _interleave(lat_index: int, lng_index: int, precision: int) -> int:
+    """Interleave cell indexes into a geohash integer (longitude bit first)."""
+    lat_bits, lng_bits = _bit_split(precision)
+    value = 0
+    for bit in range(5 * precision):
+        if bit % 2 == 0:
+            lng_bits -= 1
+            value = (value << 1) | ((lng_index >> lng_bits) & 1)
+        else:
+            lat_bits -= 1
+            value = (value << 1) | ((lat_index >> lat_bits) & 1)
+    return value
+
+
+def _to_string(value: int, precision: int) -> str:
+    chars = []
+    for _ in range(precision):
+        chars.append(_BASE32[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def encode(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    """
+    Encode coordinates as a geohash.
+
+    Args:
+        lat: Latitude
+        lng: Longitude
+        precision: Number of geohash characters
+
+    Returns:
+        Geohash string
+    """
+    lat_bits, lng_bits = _bit_split(precision)
+    value = _interleave(
+        _cell_index(lat, -90.0, 90.0, lat_bits),
+        _cell_index(lng, -180.0, 180.0, lng_bits),
+        precision
+    )
+    return _to_string(value, precision)
+
+
+def covering_ranges(
+    min_lat: float,
+    max_lat: float,
+    min_lng: float,
+    max_lng: float,
+    max_cells: int = MAX_COVER_CELLS
+) -> List[Tuple[str, str]]:
+    """
+    Cover a bounding box with geohash key ranges.
+
+    Uses the finest precision at which the box spans at most max_cells
+    cells, then merges cells that are adjacent in geohash order.
+
+    Returns:
+        List of (low, high) ranges; a geohash g is inside when low <= g < high.
+        Empty when the box is inverted (min > max), which no cell covers.
+    """
+    if min_lat > max_lat or min_lng > max_lng:
+        return []
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_bits, lng_bits = _bit_split(precision)
+        lat_lo = _cell_index(min_lat, -90.0, 90.0, lat_bits)
+        lat_hi = _cell_index(max_lat, -90.0, 90.0, lat_bits)
+        lng_lo = _cell_index(min_lng, -180.0, 180.0, lng_bits)
+        lng_hi = _cell_index(max_lng, -180.0, 180.0, lng_bits)
+        if (lat_hi - lat_lo + 1) * (lng_hi - lng_lo + 1) <= max_cells:
+            break
+
+    cells = sorted(
+        _interleave(lat_index, lng_index, precision)
+        for lat_index in range(lat_lo, lat_hi + 1)
+        for lng_index in range(lng_lo, lng_hi + 1)
+    )
+
+    ranges = []
+    start = end = cells[0]
+    for cell in cells[1:]:
+        if cell == end + 1:
+            end = cell
+            continue
+        ranges.append((start, end))
+        start = end = cell
+    ranges.append((start, end))
+
+    last_cell = (1 << (5 * precision)) - 1
+    return [
+        (
+            _to_string(start, precision),
+            _to_string(end + 1, precision) if end < last_cell else _AFTER_ALL
+        )
+        for start, end in ranges
+    ]
+
+
+def split_bounds(
+    min_lat: float,
+    max_lat: float,
+    min_lng: float,
+    max_lng: float
+) -> List[Tuple[float, float, float, float]]:
+    """
+    Split a bounding box into boxes that don't cross the antimeridian.
+
+    A box whose min_lng is east of its max_lng (e.g. 170 to -170) wraps
+    around the antimeridian and becomes two boxes. A box whose min_lat is
+    north of its max_lat contains nothing.
+
+    Returns:
+        List of (min_lat, max_lat, min_lng, max_lng), possibly empty
+    """
+    if min_lat > max_lat:
+        return []
+    if min_lng > max_lng:
+        return [(min_lat, max_lat, min_lng, 180.0), (min_lat, max_lat, -180.0, max_lng)]
+    return [(min_lat, max_lat, min_lng, max_lng)]
+
+
+def in_bounds(lat: float, lng: float, min_lat: float, max_lat: float, min_lng: float, max_lng: float) -> bool:
+    """Whether a point lies in a bounding box, which may cross the antimeridian."""
+    return any(
+        south <= lat <= north and west <= lng <= east
+        for south, north, west, east in split_bounds(min_lat, max_lat, min_lng, max_lng)
+    )
+
+
+def within_bounds(model, min_lat: float, max_lat: float, min_lng: float, max_lng: float):
+    """
+    Build a filter selecting rows of model inside a bounding box.
+
+    The geohash ranges let the database use the index; the lat/lng
+    comparisons then drop candidates from the edge cells. Boxes crossing
+    the antimeridian are queried as two boxes, and inverted latitudes
+    select nothing (see split_bounds).
+
+    Args:
+        model: Mapped class with geohash, lat and lng columns
+
+    Returns:
+        SQLAlchemy boolean expression
+    """
+    boxes = split_bounds(min_lat, max_lat, min_lng, max_lng)
+    if not boxes:
+        return false()
+    if len(boxes) > 1:
+        return or_(*[_within_box(model, *box) for box in boxes])
+    return _within_box(model, *boxes[0])
+
+
+def _within_box(model, min_lat: float, max_lat: float, min_lng: float, max_lng: float):
+    return and_(
+        or_(*[
+            and_(model.geohash >= low, model.geohash < high)
+            for low, high in covering_ranges(min_lat, max_lat, min_lng, max_lng)
+        ]),
+        model.lat >= min_lat,
+        model.lat <= max_lat,
+        model.lng >= min_lng,
+        model.lng <= max_lng
+    )
+
+
+def bounds_around(lat: float, lng: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    Get a bounding box enclosing a circle, for nearby-location queries.
+
+    Returns:
+        Tuple of (min_lat, max_lat, min_lng, max_lng)
+    """
+    lat_delta = radius_km / 111.32
+    lng_delta = radius_km / (111.32 * max(math.cos(math.radians(lat)), 1e-6))
+    return (
+        max(lat - lat_delta, -90.0),
+        min(lat + lat_delta, 90.0),
+        max(lng - lng_delta, -180.0),
+        min(lng + lng_delta, 180.0)
+    )
+
+
+def backfill_geohashes(db: Session, chunk_size: int = 10000) -> int:
+    """
+    Fill in missing geohashes, e.g. after upgrading an existing database.
+
+    Returns:
+        Number of locations updated
+    """
+    from ..models import Location
+
+    updated = 0
+    while True:
+        rows = db.query(Location.id, Location.lat, Location.lng).filter(
+            Location.geohash.is_(None)
+        ).limit(chunk_size).all()
+        if not rows:
+            return updated
+
+        db.execute(
+            update(Location),
+            [{"id": row.id, "geohash": encode(row.lat, row.lng)} for row in rows]
+        )
+        db.commit()
+        updated += len(rows)
@@ -0,0 +1,47 @@
+"""
+Web Mercator tile math for the tiled heatmap endpoint.
+
+Tiles use the standard XYZ scheme (x grows east, y grows south). Each tile
+is split into a CELLS_PER_TILE x CELLS_PER_TILE grid; below CLUSTER_MAX_ZOOM
+locations falling in the same cell are merged into one cluster feature.
+"""
+
+import math
+from typing import NamedTuple
+
+MAX_ZOOM = 22
+CELLS_PER_TILE = 32
+CLUSTER_MAX_ZOOM = 13
+
+
+class TileBounds(NamedTuple):
+    west: float
+    south: float
+    east: float
+    north: float
+
+
+def tile_bounds(z: int, x: int, y: int, buffer: float = 0.0) -> TileBounds:
+    """
+    Get the geographic bounds of an XYZ tile.
+
+    Args:
+        z: Zoom level
+        x: Tile column
+        y: Tile row
+        buffer: Fraction of a tile to extend each edge by
+
+    Returns:
+        TileBounds in degrees
+    """
+    n = 2 ** z
+    west = (x - buffer) / n * 360.0 - 180.0
+    east = (x + 1 + buffer) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y - buffer) / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1 + buffer) / n))))
+    return TileBounds(west, south, east, north)
+
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    """Check that tile coordinates exist at the given zoom."""
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Load test: read throughput of threadpool vs asyncio endpoints under many clients.
+
+Builds a throwaway SQLite database, then serves the same two reads (a
+bounded heatmap and a location's details with its recent mentions) from
+two apps in a uvicorn subprocess: one with sync routes on the blocking
+engine, which FastAPI runs in its threadpool, and one with async routes
+on the asyncio engine, as the API now does. Both run the endpoints'
+statements and share the pool settings. An httpx client opens the given
+number of concurrent connections, each issuing requests back to back.
+
+Usage:
+    python -m benchmarks.bench_async_reads --clients 500 1000 --seconds 15
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI, Response
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.api.heatmap import heatmap_statement
+from app.api.locations import location_statement, mention_page_statement
+from app.config import Settings
+from app.database import create_async_db_engine, create_db_engine
+from app.schemas import MentionWithPost
+from benchmarks.bench_concurrent_reads import build_database, heatmap_body
+
+# How the server subprocess finds the database and pool size
+DATABASE_ENV = "BENCH_DATABASE_URL"
+POOL_SIZE_ENV = "BENCH_POOL_SIZE"
+
+APPS = {
+    "threadpool": "threadpool_app",
+    "asyncio": "asyncio_app",
+}
+
+
+def bench_settings() -> Settings:
+    pool_size = int(os.environ.get(POOL_SIZE_ENV, "20"))
+    return Settings(db_pool_size=pool_size, db_max_overflow=pool_size)
+
+
+def location_body(row, mentions) -> dict:
+    location, mention_count, sentiment_sum = row
+    return {
+        "id": location.id,
+        "name": location.name,
+        "mention_count": mention_count,
+        "avg_sentiment": round(sentiment_sum / mention_count, 2) if mention_count else 0.0,
+        "recent_mentions": [MentionWithPost.model_validate(mention).model_dump(mode="json") for mention in mentions],
+    }
+
+
+def threadpool_app() -> FastAPI:
+    """The reads as sync routes on the blocking engine."""
+    engine = create_db_engine(os.environ[DATABASE_ENV], bench_settings())
+    SessionFactory = sessionmaker(bind=engine)
+    app = FastAPI()
+
+    def get_session():
+        db = SessionFactory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/heatmap")
+    def heatmap(min_lat: float, max_lat: float, min_lng: float, max_lng: float, db: Session = Depends(get_session)):
+        rows = db.execute(heatmap_statement("all", min_lat, max_lat, min_lng, max_lng)).all()
+        return Response(asyncio.run(heatmap_body(rows)), media_type="application/json")
+
+    @app.get("/locations/{location_id}")
+    def location(location_id: int, db: Session = Depends(get_session)):
+        row = db.execute(location_statement(location_id)).one()
+        mentions = db.scalars(mention_page_statement(location_id, None, 10)).all()
+        return location_body(row, mentions)
+
+    return app
+
+
+def asyncio_app() -> FastAPI:
+    """The reads as async routes on the asyncio engine."""
+    engine = create_async_db_engine(os.environ[DATABASE_ENV], bench_settings())
+    SessionFactory = async_sessionmaker(engine, expire_on_commit=False)
+    app = FastAPI()
+
+    async def get_session():
+        async with SessionFactory() as db:
+            yield db
+
+    @app.get("/heatmap")
+    async def heatmap(min_lat: float, max_lat: float, min_lng: float, max_lng: float, db: AsyncSession = Depends(get_session)):
+        rows = (await db.execute(heatmap_statement("all", min_lat, max_lat, min_lng, max_lng))).all()
+        body = await heatmap_body(rows)
+        return Response(body, media_type="application/json")
+
+    @app.get("/locations/{location_id}")
+    async def location(location_id: int, db: AsyncSession = Depends(get_session)):
+        row = (await db.execute(location_statement(location_id))).one()
+        mentions = (await db.scalars(mention_page_statement(location_id, None, 10))).all()
+        return location_body(row, mentions)
+
+    return app
+
+
+def start_server(app_name: str, database_url: str, port: int, pool_size: int) -> subprocess.Popen:
+    env = {**os.environ, DATABASE_ENV: database_url, POOL_SIZE_ENV: str(pool_size)}
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "--factory", f"benchmarks.bench_async_reads:{app_name}",
+            "--port", str(port), "--backlog", "4096", "--log-level", "warning", "--no-access-log",
+        ],
+        env=env
+    )
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/locations/1", timeout=1).raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"{app_name} did not start")
+
+
+async def run_clients(port: int, clients: int, seconds: float, locations: int, seed: int) -> tuple:
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as client:
+        deadline = time.perf_counter() + seconds
+
+        async def client_loop(rng: random.Random):
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                if rng.random() < 0.5:
+                    lat, lng = rng.uniform(19, 22), rng.uniform(-160, -155)
+                    request = client.get("/heatmap", params={
+                        "min_lat": lat, "max_lat": lat + 0.5, "min_lng": lng, "max_lng": lng + 0.5
+                    })
+                else:
+                    request = client.get(f"/locations/{rng.randint(1, locations)}")
+
+                start = time.perf_counter()
+                try:
+                    (await request).raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        await asyncio.gather(*(client_loop(random.Random(seed + i)) for i in range(clients)))
+
+    return latencies, errors
+
+
+def report(label: str, clients: int, latencies: list, errors: int, seconds: float):
+    latencies = sorted(latencies) or [0.0]
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))]
+
+    print(
+        f"{label:<12}{clients:>8}{len(latencies) / seconds:>10.0f}"
+        f"{percentile(50):>9.1f}{percentile(95):>9.1f}{percentile(99):>9.1f}{errors:>8}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark threadpool vs asyncio reads under concurrent clients")
+    parser.add_argument("--clients", type=int, nargs="+", default=[500, 1000])
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--locations", type=int, default=5000)
+    parser.add_argument("--mentions", type=int, default=50000)
+    parser.add_argument("--pool-size", type=int, default=20, help="Pool size (and overflow) of both engines")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'app':<12}{'clients':>8}{'reqs/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_db_engine(database_url, Settings())
+        build_database(engine, args.locations, args.mentions, args.seed)
+        engine.dispose()
+
+        for label, app_name in APPS.items():
+            server = start_server(app_name, database_url, args.port, args.pool_size)
+            try:
+                for clients in args.clients:
+                    latencies, errors = asyncio.run(
+                        run_clients(args.port, clients, args.seconds, args.locations, args.seed)
+                    )
+                    report(label, clients, latencies, errors, args.seconds)
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Load test: API read latency while the scrape pipeline ingests.
+
+Builds a throwaway SQLite database per storage configuration, then runs
+reader threads calling the heatmap and location detail endpoints while a
+writer thread ingests synthetic posts through IngestPipeline. Compares the
+old setup (rollback journal, default pragmas) with WAL and the tuned
+pragmas from Settings. Pass --database-url to run the same load against
+another, empty database, e.g. Postgres (tables are created, not dropped).
+
+Usage:
+    python -m benchmarks.bench_concurrent_reads --readers 8 --seconds 20
+    python -m benchmarks.bench_concurrent_reads --database-url postgresql://localhost/scrapey_bench
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.api.heatmap import heatmap_statement
+from app.api.locations import location_statement, mention_page_statement
+from app.config import Settings
+from app.database import Base, create_db_engine
+from app.models import Location, Mention, Post
+from app.scraper.pipeline import IngestPipeline
+from app.services.geojson import feature_collection_stream
+from app.services.gazetteer import get_gazetteer
+from app.services.rollup import rebuild_stats
+from app.services.spatial import encode
+
+CONFIGURATIONS = {
+    "rollback journal, defaults": dict(
+        sqlite_journal_mode="delete",
+        sqlite_synchronous="full",
+        sqlite_mmap_size=0,
+        sqlite_cache_size_kb=2000,
+        sqlite_busy_timeout_ms=30000,
+    ),
+    "WAL, tuned pragmas": {},
+}
+
+TEMPLATES = [
+    "Just got back from {place}, absolutely loved it!",
+    "Is {place} worth the drive? Heard mixed things.",
+    "{place} was packed today, parking was a nightmare.",
+    "Sunset at {place} never gets old",
+]
+
+
+def build_database(engine, locations: int, mentions: int, seed: int):
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    with engine.begin() as conn:
+        rows = []
+        for i in range(locations):
+            lat, lng = rng.uniform(18.9, 22.2), rng.uniform(-160.2, -154.8)
+            rows.append({
+                "name": f"Bench Place {i}",
+                "lat": lat,
+                "lng": lng,
+                "geohash": encode(lat, lng),
+                "place_type": "restaurant",
+                "city": "Honolulu",
+                "state": "HI",
+            })
+        conn.execute(insert(Location), rows)
+
+        conn.execute(insert(Post), [{
+            "reddit_id": "bench_seed",
+            "title": "seed",
+            "body": "",
+            "subreddit": "Hawaii",
+            "posted_at": now,
+        }])
+        conn.execute(insert(Mention), [
+            {
+                "location_id": rng.randint(1, locations),
+                "post_id": 1,
+                "sentiment_score": rng.uniform(-1, 1),
+                "context": "seed",
+                "created_at": now - timedelta(hours=rng.randint(0, 24 * 90)),
+            }
+            for _ in range(mentions)
+        ])
+
+    db = sessionmaker(bind=engine)()
+    rebuild_stats(db)
+    db.commit()
+    db.close()
+
+
+async def heatmap_body(rows) -> bytes:
+    """Encode heatmap rows with the endpoint's streaming GeoJSON encoder."""
+    async def batches():
+        yield rows
+
+    return b"".join([chunk async for chunk in feature_collection_stream(batches())])
+
+
+def writer(engine, stop: threading.Event, counts: dict, batch_size: int, seed: int):
+    rng = random.Random(seed)
+    names = [place.name for place in get_gazetteer().places()]
+    db = sessionmaker(bind=engine)()
+    pipeline = IngestPipeline(db, batch_size=batch_size)
+    run = f"{seed}-{time.time_ns()}"
+
+    while not stop.is_set():
+        batch = [
+            {
+                "reddit_id": f"bench_{run}_{counts['posts'] + i}",
+                "title": rng.choice(TEMPLATES).format(place=rng.choice(names)),
+                "body": "",
+                "subreddit": "Hawaii",
+                "posted_at": datetime.utcnow(),
+            }
+            for i in range(batch_size)
+        ]
+        pipeline.ingest_batch(batch)
+        counts["posts"] += batch_size
+        counts["batches"] += 1
+
+    db.close()
+
+
+def reader(engine, stop: threading.Event, latencies: list, locations: int, seed: int):
+    rng = random.Random(seed)
+    Session = sessionmaker(bind=engine)
+
+    while not stop.is_set():
+        start = time.perf_counter()
+        db = Session()
+        try:
+            if rng.random() < 0.5:
+                # The heatmap endpoint's query and encoding, on a sync session
+                lat, lng = rng.uniform(19, 22), rng.uniform(-160, -155)
+                statement = heatmap_statement("all", lat, lat + 0.5, lng, lng + 0.5)
+                asyncio.run(heatmap_body(db.execute(statement).all()))
+            else:
+                # The location detail endpoint's queries
+                location_id = rng.randint(1, locations)
+                db.execute(location_statement(location_id)).first()
+                db.scalars(mention_page_statement(location_id, None, 10)).all()
+        finally:
+            db.close()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+def run_load(engine, args) -> tuple:
+    stop = threading.Event()
+    counts = {"posts": 0, "batches": 0}
+    latencies = []
+
+    threads = [threading.Thread(target=writer, args=(engine, stop, counts, args.batch_size, args.seed))]
+    threads += [
+        threading.Thread(target=reader, args=(engine, stop, latencies, args.locations, args.seed + i))
+        for i in range(args.readers)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return latencies, counts
+
+
+def report(label: str, latencies: list, counts: dict, seconds: float):
+    latencies = sorted(latencies)
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))]
+
+    print(
+        f"{label:<28}{len(latencies) / seconds:>9.0f}"
+        f"{percentile(50):>9.1f}{percentile(95):>9.1f}{percentile(99):>9.1f}{latencies[-1]:>9.1f}"
+        f"{counts['posts'] / seconds:>12.0f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reads during concurrent ingest")
+    parser.add_argument("--locations", type=int, default=5000)
+    parser.add_argument("--mentions", type=int, default=50000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--database-url", help="Run once against this database instead")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'configuration':<28}{'reads/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'posts/s':>12}")
+
+    if args.database_url:
+        engine = create_db_engine(args.database_url, Settings())
+        build_database(engine, args.locations, args.mentions, args.seed)
+        latencies, counts = run_load(engine, args)
+        report(engine.dialect.name, latencies, counts, args.seconds)
+        engine.dispose()
+        return
+
+    for label, overrides in CONFIGURATIONS.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_db_engine(
+                f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                Settings(**overrides, db_pool_size=args.readers + 2)
+            )
+            build_database(engine, args.locations, args.mentions, args.seed)
+            latencies, counts = run_load(engine, args)
+            report(label, latencies, counts, args.seconds)
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark the extractor's trigger-phrase scan: two regexes vs the merged one.
+
+Builds synthetic post bodies and comments: short chatter without a trigger
+word, typical comments naming a place or two, and long trip reports written
+as run-on sentences. Times the two patterns the extractor used to run over
+every text, the merged pattern behind its trigger pre-filter, and the whole
+extract_matches() (known-name scan included).
+
+Usage:
+    python -m benchmarks.bench_extractor --texts 20000 --long-words 400
+"""
+
+import argparse
+import random
+import re
+import time
+
+from app.scraper.extractor import LocationExtractor
+
+# The extractor's patterns before they were merged
+LEGACY_PATTERNS = [
+    re.compile(
+        r"(?:at|to|from|near|visited?|went to|tried|love|recommend)\s+([A-Z][a-zA-Z'\-\s]+(?:Beach|Restaurant|Cafe|Grill|Inn|Bar|Bakery|Falls|Trail|Bay|Point|Park|Resort))",
+        re.IGNORECASE
+    ),
+    re.compile(r"(?:at|to|from|near|visited?|went to)\s+([A-Z][a-zA-Z'\-\s]{2,30})", re.IGNORECASE),
+]
+
+CHATTER = [
+    "lol same", "This is the way.", "Mahalo for sharing!", "Underrated comment", "Source?",
+    "Honestly this is so true", "Beautiful shot!!", "Came here to say this", "Deleted", "Big if true",
+]
+OPENERS = ["We went to", "Just got back from", "Highly recommend", "Finally tried", "Stopped at", "Drove out to"]
+PLACES = [
+    "Leonard's Bakery", "Hanauma Bay", "Sandy Beach", "Manoa Falls", "Kona Brewing", "Ono Seafood",
+    "Sunset Point", "Aunty Lani's Grill", "the Waimea Valley trail", "Rainbow Drive-In",
+]
+VERDICTS = [
+    "absolutely amazing, best malasadas ever!",
+    "way too crowded and the parking was terrible.",
+    "it was fine, nothing special honestly.",
+    "stunning views but bring water, it's hot.",
+    "overpriced and the service was rude :(",
+]
+FILLER = (
+    "and then we wanted to get some food so we walked over to see if it was open but "
+    "it was not so we decided to head back to the car and drive around for a while "
+    "because my brother wanted to look at the waves and the kids needed to stretch their legs"
+).split()
+
+
+def make_texts(count: int, long_share: float, chatter_share: float, long_words: int, seed: int) -> list:
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < chatter_share:
+            texts.append(rng.choice(CHATTER))
+        elif roll < chatter_share + long_share:
+            # Run-on trip report: long stretches of letters and spaces only
+            words = []
+            while len(words) < long_words:
+                words.extend(rng.sample(FILLER, 12))
+                if rng.random() < 0.3:
+                    words.extend(f"{rng.choice(OPENERS)} {rng.choice(PLACES)}".split())
+            texts.append(" ".join(words) + ". " + rng.choice(VERDICTS))
+        else:
+            texts.append(f"{rng.choice(OPENERS)} {rng.choice(PLACES)} - {rng.choice(VERDICTS)}")
+    return texts
+
+
+def legacy_spans(text: str) -> list:
+    spans = []
+    for pattern in LEGACY_PATTERNS:
+        for found in pattern.finditer(text):
+            spans.append(found.span(1))
+    return spans
+
+
+def timed(label: str, fn, texts: list, baseline: float = None) -> float:
+    start = time.perf_counter()
+    for text in texts:
+        fn(text)
+    elapsed = time.perf_counter() - start
+    speedup = f"  ({baseline / elapsed:.1f}x)" if baseline else ""
+    print(f"{label:<28}{elapsed:>8.2f}s{len(texts) / elapsed:>12.0f} texts/s{speedup}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark location pattern extraction")
+    parser.add_argument("--texts", type=int, default=20000)
+    parser.add_argument("--long-share", type=float, default=0.1, help="Share of long run-on posts")
+    parser.add_argument("--chatter-share", type=float, default=0.5, help="Share of texts without a trigger")
+    parser.add_argument("--long-words", type=int, default=400, help="Words per long post")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts, args.long_share, args.chatter_share, args.long_words, args.seed)
+    extractor = LocationExtractor()
+    skipped = sum(1 for text in texts if extractor.trigger_filter.search(text) is None)
+    print(f"{len(texts)} texts, {skipped} without a trigger\n")
+
+    baseline = timed("two patterns", legacy_spans, texts)
+    timed("merged pattern + pre-filter", extractor.candidate_spans, texts, baseline)
+    timed("extract_matches()", extractor.extract_matches, texts)
+
+
+if __name__ == "__main__":
+    main()
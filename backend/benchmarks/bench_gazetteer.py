@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark gazetteer shards as the number of places grows.
+
+For each size, packs synthetic places (a tenth with an alias) into a shard
+in a temporary directory, then times opening it, looking names up and
+scanning post bodies that mention some of them.
+
+Usage:
+    python -m benchmarks.bench_gazetteer --places 1000 100000 1000000 --texts 5000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app.services.gazetteer import Gazetteer, GazetteerEntry, build_shard, normalize_text
+from benchmarks.bench_extractor import make_texts
+
+SYLLABLES = ["ka", "la", "ni", "ho", "mo", "ku", "pa", "wai", "lu", "ma", "na", "po", "hea", "ki", "le"]
+SUFFIXES = ["Beach", "Bay", "Falls", "Park", "Grill", "Cafe", "Bakery", "Trail", "Point", "Market"]
+TYPES = ["beach", "beach", "park", "park", "restaurant", "restaurant", "restaurant", "park", "park", "attraction"]
+
+
+def make_entries(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    entries = []
+    names = set()
+    while len(entries) < count:
+        words = [
+            "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+            for _ in range(rng.randint(1, 3))
+        ]
+        suffix = rng.randrange(len(SUFFIXES))
+        name = " ".join(words + [SUFFIXES[suffix]])
+        if name in names:
+            continue
+        names.add(name)
+        aliases = (" ".join(words),) if rng.random() < 0.1 else ()
+        entries.append(GazetteerEntry(
+            name, aliases, TYPES[suffix], rng.choice(["Honolulu", "Hilo", "Kailua", None]), "HI",
+            rng.uniform(18.9, 22.2), rng.uniform(-160.2, -154.8)
+        ))
+    return entries
+
+
+def timed(label: str, fn, items: list):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<22}{elapsed:>8.2f}s{len(items) / elapsed:>12.0f}/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gazetteer shards")
+    parser.add_argument("--places", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--texts", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for count in args.places:
+        entries = make_entries(count, args.seed)
+        rng = random.Random(args.seed)
+        # Post bodies naming a place from the gazetteer every other time
+        texts = [
+            f"{text} Also {rng.choice(entries).name} was great." if rng.random() < 0.5 else text
+            for text in make_texts(args.texts, 0.1, 0.5, 400, args.seed)
+        ]
+        names = [rng.choice(entries).name for _ in range(args.lookups)]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.gaz")
+            start = time.perf_counter()
+            build_shard(entries, path, "bench")
+            build = time.perf_counter() - start
+
+            start = time.perf_counter()
+            gazetteer = Gazetteer(tmp)
+            gazetteer.lookup(names[0])
+            opened = time.perf_counter() - start
+
+            print(
+                f"{count} places: built in {build:.1f}s, {os.path.getsize(path) / 2 ** 20:.1f} MiB, "
+                f"opened in {opened * 1000:.1f} ms"
+            )
+            timed("lookup()", gazetteer.lookup, names)
+            timed("find() over posts", lambda text: gazetteer.find(normalize_text(text)), texts)
+
+
+if __name__ == "__main__":
+    main()
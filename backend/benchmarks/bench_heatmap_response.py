@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Benchmark /api/heatmap responses: Pydantic models, streamed orjson, columnar.
+
+For each size, builds a throwaway SQLite database with that many
+locations (each with one rollup bucket, so every location is a feature)
+and times full GET requests against two routes on the same data: the
+previous implementation, which builds a HeatmapFeature per row and lets
+FastAPI validate and serialize them through response_model, and the
+current endpoint, both as streamed GeoJSON and in the binary columnar
+format (requested through the Accept header).
+
+Usage:
+    python -m benchmarks.bench_heatmap_response --features 10000 100000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import Depends, FastAPI, Query
+from fastapi.testclient import TestClient
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.api import heatmap
+from app.config import Settings
+from app.database import Base, SessionLocal, create_async_db_engine, create_db_engine, get_async_sessionmaker, get_db
+from app.models import Location, LocationStat
+from app.schemas import GeoJSONPoint, HeatmapFeature, HeatmapProperties, HeatmapResponse
+from app.services.heatmap_columns import MEDIA_TYPE as COLUMNS_TYPE
+from app.services.result_cache import MemoryBackend, get_result_cache
+from app.services.rollup import bucket_for, stats_subquery
+from app.services.spatial import encode
+
+
+def model_heatmap(
+    time_range: Literal["all", "week", "day"] = Query("all"),
+    min_lat: Optional[float] = Query(None),
+    max_lat: Optional[float] = Query(None),
+    min_lng: Optional[float] = Query(None),
+    max_lng: Optional[float] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """The heatmap endpoint as it was before streaming, for comparison."""
+    stats = stats_subquery(heatmap.get_time_filter(time_range))
+    query = db.query(
+        Location,
+        func.coalesce(stats.c.mention_count, 0).label("mention_count"),
+        func.coalesce(stats.c.sentiment_sum, 0.0).label("sentiment_sum")
+    )
+    if time_range == "all":
+        query = query.outerjoin(stats, stats.c.location_id == Location.id)
+    else:
+        query = query.join(stats, stats.c.location_id == Location.id)
+
+    features = []
+    for location, mention_count, sentiment_sum in query.all():
+        avg_sentiment = sentiment_sum / mention_count if mention_count else 0.0
+        features.append(HeatmapFeature(
+            geometry=GeoJSONPoint(coordinates=[location.lng, location.lat]),
+            properties=HeatmapProperties(
+                id=location.id,
+                name=location.name,
+                mention_count=mention_count,
+                avg_sentiment=round(float(avg_sentiment), 2),
+                place_type=location.place_type,
+                city=location.city
+            )
+        ))
+
+    return HeatmapResponse(features=features)
+
+
+def build_database(engine, count: int, seed: int):
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(seed)
+    bucket = bucket_for(datetime.utcnow())
+
+    with engine.begin() as conn:
+        for start in range(0, count, 50000):
+            rows = []
+            for i in range(start, min(count, start + 50000)):
+                lat, lng = rng.uniform(18.9, 22.2), rng.uniform(-160.2, -154.8)
+                rows.append({
+                    "name": f"Bench Place {i}",
+                    "lat": lat,
+                    "lng": lng,
+                    "geohash": encode(lat, lng),
+                    "place_type": "restaurant",
+                    "city": "Honolulu",
+                    "state": "HI",
+                })
+            conn.execute(insert(Location), rows)
+
+        conn.execute(insert(LocationStat), [
+            {
+                "location_id": location_id,
+                "bucket_start": bucket,
+                "mention_count": rng.randint(1, 50),
+                "sentiment_sum": rng.uniform(-10, 10),
+            }
+            for location_id in range(1, count + 1)
+        ])
+
+
+def time_requests(client: TestClient, path: str, repeat: int, accept: str = "application/json") -> tuple[float, int]:
+    size = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        response = client.get(path, params={"time_range": "all"}, headers={"Accept": accept})
+        response.raise_for_status()
+        size = len(response.content)
+    return (time.perf_counter() - start) / repeat, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark heatmap response serialization")
+    parser.add_argument("--features", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    app = FastAPI()
+    app.include_router(heatmap.router, prefix="/api/heatmap")
+    app.get("/models")(model_heatmap)
+
+    # Time the queries and encoding, not result cache hits
+    get_result_cache().backend = MemoryBackend(0)
+
+    print(
+        f"{'features':>9}{'models ms':>12}{'stream ms':>12}{'columns ms':>12}"
+        f"{'json MB':>9}{'columns MB':>12}"
+    )
+
+    # One event loop for all requests, since pooled asyncio connections belong to it
+    with TestClient(app) as client:
+        for count in args.features:
+            with tempfile.TemporaryDirectory() as tmp:
+                url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+                engine = create_db_engine(url, Settings())
+                build_database(engine, count, args.seed)
+                # The old route uses SessionLocal, the endpoint asyncio sessions
+                SessionLocal.configure(bind=engine)
+                async_engine = create_async_db_engine(url, Settings())
+                get_async_sessionmaker().configure(bind=async_engine)
+
+                # Warm up the page cache and both code paths
+                client.get("/models")
+                client.get("/api/heatmap")
+
+                model_time, model_size = time_requests(client, "/models", args.repeat)
+                stream_time, stream_size = time_requests(client, "/api/heatmap", args.repeat)
+                columns_time, columns_size = time_requests(client, "/api/heatmap", args.repeat, COLUMNS_TYPE)
+                assert model_size == stream_size, "responses differ in size"
+
+                print(
+                    f"{count:>9}{model_time * 1000:>12.1f}{stream_time * 1000:>12.1f}{columns_time * 1000:>12.1f}"
+                    f"{stream_size / 1e6:>9.1f}{columns_size / 1e6:>12.1f}"
+                )
+                engine.dispose()
+                client.portal.call(async_engine.dispose)
+
+if __name__ == "__main__":
+    main()
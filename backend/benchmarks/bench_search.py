@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark /api/locations/search: FTS5 trigram index vs ILIKE scan.
+
+Builds a throwaway SQLite database with synthetic location names and
+mention rollups, then runs the search endpoint with the index enabled
+and with it forced off.
+
+Usage:
+    python -m benchmarks.bench_search --locations 1000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app.api.locations import find_locations
+from app.database import Base
+from app.models import Location, LocationStat
+from app.services import search_index
+from app.services.search_index import ensure_search_index
+from app.services.spatial import encode
+
+PREFIXES = ["Aloha", "Ono", "Kona", "Maui", "Island", "Sunset", "Paradise", "Hale", "Lani", "Mauka"]
+NOUNS = ["Grill", "Bakery", "Beach", "Cafe", "Trail", "Falls", "Bay", "Market", "Poke", "Shave Ice"]
+CITIES = ["Honolulu", "Hilo", "Kailua", "Lahaina", "Kapaa", "Kona", "Paia", "Haleiwa", "Wailea", "Lihue"]
+QUERIES = ["ono", "bakery", "sunset beach", "hale", "kona grill", "falls", "shave", "lihue", "poke", "zzzz"]
+
+
+def build_database(path: str, count: int, seed: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    rng = random.Random(seed)
+    bucket = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+    with engine.begin() as conn:
+        for start in range(0, count, 100000):
+            locations, stats = [], []
+            for i in range(start, min(start + 100000, count)):
+                lat, lng = rng.uniform(18.9, 22.2), rng.uniform(-160.2, -154.8)
+                locations.append({
+                    "id": i + 1,
+                    "name": f"{rng.choice(PREFIXES)} {rng.choice(NOUNS)} {i}",
+                    "lat": lat,
+                    "lng": lng,
+                    "geohash": encode(lat, lng),
+                    "place_type": "restaurant",
+                    "city": rng.choice(CITIES),
+                    "state": "HI",
+                })
+                count_ = int(rng.paretovariate(1.5))
+                stats.append({
+                    "location_id": i + 1,
+                    "bucket_start": bucket,
+                    "mention_count": count_,
+                    "sentiment_sum": count_ * rng.uniform(-1, 1),
+                })
+            conn.execute(insert(Location), locations)
+            conn.execute(insert(LocationStat), stats)
+        conn.execute(text("ANALYZE"))
+
+    return engine
+
+
+def time_searches(db, rounds: int) -> dict:
+    timings = {}
+    for q in QUERIES:
+        find_locations(db, q, None, 20)  # warm up
+        start = time.perf_counter()
+        for _ in range(rounds):
+            find_locations(db, q, None, 20)
+        timings[q] = (time.perf_counter() - start) / rounds * 1000
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark location search")
+    parser.add_argument("--locations", type=int, default=1000000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        print(f"Building {args.locations} locations...")
+        engine = build_database(path, args.locations, args.seed)
+
+        start = time.perf_counter()
+        ensure_search_index(engine)
+        print(f"Built FTS index in {time.perf_counter() - start:.1f}s")
+
+        db = sessionmaker(bind=engine)()
+        indexed = time_searches(db, args.rounds)
+
+        search_index._available[str(engine.url)] = False
+        scanned = time_searches(db, args.rounds)
+        db.close()
+
+        print(f"\n{'query':<15}{'ILIKE ms':>12}{'FTS ms':>12}")
+        for q in QUERIES:
+            print(f"{q:<15}{scanned[q]:>12.2f}{indexed[q]:>12.2f}")
+
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
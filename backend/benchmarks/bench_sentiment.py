@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark sentiment scoring: per-text analyze() vs analyze_batch().
+
+Scores synthetic mention contexts, a share of which repeat, one at a time
+and in batches with 1..N worker processes. Each run starts with an empty
+memo.
+
+Usage:
+    python -m benchmarks.bench_sentiment --texts 200000 --processes 8
+"""
+
+import argparse
+import os
+import random
+import time
+
+from app.services.sentiment import SentimentAnalyzer
+
+OPENERS = ["Just got back from", "Finally tried", "Don't bother with", "Can't stop thinking about", "We hiked to"]
+PLACES = ["Leonard's Bakery", "Hanauma Bay", "Diamond Head", "Giovanni's Shrimp Truck", "Manoa Falls"]
+VERDICTS = [
+    "absolutely amazing, best malasadas ever!",
+    "way too crowded and the parking was terrible.",
+    "it was fine, nothing special honestly.",
+    "stunning views but bring water, it's hot.",
+    "overpriced and the service was rude :(",
+]
+
+
+def make_texts(count: int, duplicate_share: float, seed: int) -> list:
+    rng = random.Random(seed)
+    texts = []
+    for i in range(count):
+        if texts and rng.random() < duplicate_share:
+            texts.append(rng.choice(texts))
+        else:
+            texts.append(f"{rng.choice(OPENERS)} {rng.choice(PLACES)} - {rng.choice(VERDICTS)} (#{i})")
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sentiment scoring")
+    parser.add_argument("--texts", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=20000)
+    parser.add_argument("--duplicates", type=float, default=0.2, help="Share of repeated texts")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts, args.duplicates, args.seed)
+
+    analyzer = SentimentAnalyzer(processes=1)
+    start = time.perf_counter()
+    for text in texts:
+        analyzer.analyzer.polarity_scores(text)
+    baseline = time.perf_counter() - start
+    print(f"{'polarity_scores() loop':<28}{baseline:>8.1f}s{len(texts) / baseline:>12.0f} texts/s")
+
+    process_counts = sorted({p for p in (1, 2, 4) if p <= args.processes} | {args.processes})
+    for processes in process_counts:
+        analyzer = SentimentAnalyzer(processes=processes)
+        start = time.perf_counter()
+        for i in range(0, len(texts), args.batch_size):
+            analyzer.analyze_batch(texts[i:i + args.batch_size])
+        elapsed = time.perf_counter() - start
+        analyzer.close()
+
+        label = f"analyze_batch, {processes} proc"
+        print(f"{label:<28}{elapsed:>8.1f}s{len(texts) / elapsed:>12.0f} texts/s  ({baseline / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
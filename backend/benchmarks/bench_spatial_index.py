@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark bounding-box queries on locations: full scan vs geohash index.
+
+Builds a throwaway SQLite database with synthetic locations clustered
+around a few hundred "cities", then times viewport-sized box queries
+using plain lat/lng predicates and the geohash range filter.
+
+Usage:
+    python -m benchmarks.bench_spatial_index --locations 200000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert, select, text
+
+from app.database import Base
+from app.models import Location
+from app.services.spatial import within_bounds
+
+
+def build_database(path: str, count: int, seed: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    rng = random.Random(seed)
+    cities = [(rng.uniform(-50, 60), rng.uniform(-170, 170)) for _ in range(500)]
+
+    rows = []
+    for i in range(count):
+        lat, lng = rng.choice(cities)
+        rows.append({
+            "name": f"Place {i}",
+            "lat": lat + rng.gauss(0, 0.3),
+            "lng": lng + rng.gauss(0, 0.3),
+            "place_type": "restaurant",
+            "city": None,
+            "state": None,
+        })
+
+    with engine.begin() as conn:
+        for start in range(0, count, 50000):
+            conn.execute(insert(Location), rows[start:start + 50000])
+        conn.execute(text("ANALYZE"))
+
+    return engine, cities
+
+
+def time_queries(engine, statements) -> tuple[float, int]:
+    found = 0
+    with engine.connect() as conn:
+        start = time.perf_counter()
+        for stmt in statements:
+            found += len(conn.execute(stmt).all())
+        elapsed = time.perf_counter() - start
+    return elapsed, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark spatial index vs full scan")
+    parser.add_argument("--locations", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--box-size", type=float, default=0.5, help="Box edge in degrees")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        print(f"Building {args.locations} locations...")
+        engine, cities = build_database(path, args.locations, args.seed)
+
+        rng = random.Random(args.seed + 1)
+        boxes = []
+        for _ in range(args.queries):
+            lat, lng = rng.choice(cities)
+            min_lat = lat + rng.uniform(-0.5, 0.5) - args.box_size / 2
+            min_lng = lng + rng.uniform(-0.5, 0.5) - args.box_size / 2
+            boxes.append((min_lat, min_lat + args.box_size, min_lng, min_lng + args.box_size))
+
+        scan = [
+            select(Location.id).where(
+                Location.lat >= min_lat,
+                Location.lat <= max_lat,
+                Location.lng >= min_lng,
+                Location.lng <= max_lng
+            )
+            for min_lat, max_lat, min_lng, max_lng in boxes
+        ]
+        indexed = [
+            select(Location.id).where(within_bounds(Location, *box))
+            for box in boxes
+        ]
+
+        with engine.connect() as conn:
+            for label, stmt in (("scan", scan[0]), ("geohash", indexed[0])):
+                compiled = stmt.compile(engine, compile_kwargs={"literal_binds": True})
+                plan = conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+                print(f"{label} plan: {'; '.join(row[-1] for row in plan)}")
+
+        scan_time, scan_found = time_queries(engine, scan)
+        index_time, index_found = time_queries(engine, indexed)
+
+        print(f"\n{args.queries} queries, {args.box_size} degree boxes")
+        print(f"  full scan:     {scan_time / args.queries * 1000:8.2f} ms/query ({scan_found} rows)")
+        print(f"  geohash index: {index_time / args.queries * 1000:8.2f} ms/query ({index_found} rows)")
+        print(f"  speedup:       {scan_time / index_time:8.1f}x")
+
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
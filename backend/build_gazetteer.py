@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Build a gazetteer shard from CSV files or OpenStreetMap extracts.
+
+CSV files have the columns name, aliases ("|"-separated), place_type,
+city, state, lat, lng (see data/gazetteer/hawaii.csv). OpenStreetMap
+extracts are read as GeoJSON, e.g. exported with `osmium export -f
+geojsonseq`; named restaurants, beaches, parks, attractions and resorts are
+kept. Places without a state (most OSM features have no addr:state) get
+the --state code.
+
+Usage:
+    python build_gazetteer.py data/gazetteer/hawaii.csv
+    python build_gazetteer.py washington.geojsonseq extra.csv --region washington --state WA
+"""
+
+import argparse
+import itertools
+import os
+import time
+
+from app.config import get_settings
+from app.services.gazetteer import BACKEND_DIR, SHARD_SUFFIX, build_shard, read_entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a gazetteer shard")
+    parser.add_argument("sources", nargs="+", help="CSV or GeoJSON files, merged into one shard")
+    parser.add_argument("--region", help="Shard name (default: name of the first source)")
+    parser.add_argument("--state", help="State code of places without one, e.g. WA")
+    parser.add_argument(
+        "--output-dir",
+        default=os.path.join(BACKEND_DIR, get_settings().gazetteer_dir),
+        help="Directory the API and scraper load shards from"
+    )
+    args = parser.parse_args()
+
+    region = args.region or os.path.basename(args.sources[0]).split(".")[0]
+    path = os.path.join(args.output_dir, region + SHARD_SUFFIX)
+
+    start = time.perf_counter()
+    entries = itertools.chain.from_iterable(read_entries(source) for source in args.sources)
+    places = build_shard(entries, path, region, args.state)
+    print(f"Wrote {places} places to {path} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Rebuild the location_stats rollup from the mentions table.
+
+Run this after importing mentions outside the scrape pipeline, or once
+after upgrading an existing database.
+
+Usage:
+    python rebuild_stats.py
+"""
+
+from app.database import SessionLocal, init_db
+from app.services.data_version import bump_data_version
+from app.services.rollup import compact_stats, rebuild_stats
+
+
+def main():
+    init_db()
+    db = SessionLocal()
+
+    try:
+        print("Rebuilding location stats from mentions...")
+        rows = rebuild_stats(db)
+        folded = compact_stats(db)
+        bump_data_version(db)
+        db.commit()
+        print(f"Done! Wrote {rows} stat buckets, compacted {folded} expired ones.")
+
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
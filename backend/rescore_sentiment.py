@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Re-score mention sentiment with the current analyzer.
+
+Only mentions scored by another analyzer version (or of unknown origin)
+are touched. Safe to interrupt and re-run, and to run while the API is
+serving.
+
+Usage:
+    python rescore_sentiment.py
+    python rescore_sentiment.py --chunk-size 50000 --processes 8
+"""
+
+import argparse
+
+from app.database import SessionLocal, init_db
+from app.services.rescore import DEFAULT_CHUNK_SIZE, count_outdated, rescore_mentions
+from app.services.sentiment import SentimentAnalyzer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score mention sentiment")
+    parser.add_argument(
+        "--chunk-size", "-c",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"Mentions per transaction (default: {DEFAULT_CHUNK_SIZE})"
+    )
+    parser.add_argument(
+        "--processes", "-p",
+        type=int,
+        default=None,
+        help="Scoring processes (default: CPU count)"
+    )
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    analyzer = SentimentAnalyzer(processes=args.processes)
+
+    try:
+        total = count_outdated(db, analyzer.version)
+        print(f"Re-scoring {total} mentions with {analyzer.version}...")
+
+        rescored = rescore_mentions(
+            db,
+            analyzer,
+            chunk_size=args.chunk_size,
+            on_chunk=lambda done, last_id: print(f"  {done}/{total} mentions (last id {last_id})...")
+        )
+        print(f"Done! Re-scored {rescored} mentions.")
+
+    finally:
+        analyzer.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
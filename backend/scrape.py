@@ -4,21 +4,55 @@ CLI script to run the Reddit scraper.
 
 Usage:
     python scrape.py --subreddit hawaii --limit 100
-    python scrape.py --subreddit maui --time-filter week --limit 50
+    python scrape.py --subreddit maui --listing top --time-filter week --limit 50
+    python scrape.py --all-default --comments --limit 50
+
+By default only posts newer than the last run are fetched, from the "new"
+listing; --listing top re-scrapes top posts instead.
 """
 
 import argparse
+import asyncio
 import sys
-from datetime import datetime
+from typing import Optional
 
+from app.config import get_settings
 from app.database import SessionLocal, init_db
-from app.models import Location, Post, Mention
+from app.scraper.async_reddit import create_async_scraper
+from app.scraper.cursors import NEW_LISTING, load_cursors
+from app.scraper.geocode_queue import GeocodeQueue
+from app.scraper.pipeline import DEFAULT_BATCH_SIZE, IngestPipeline
 from app.scraper.reddit import create_scraper
-from app.scraper.extractor import get_extractor
-from app.services.sentiment import get_sentiment_analyzer
-
-
-def scrape_subreddit(subreddit: str, limit: int, time_filter: str):
+from app.services.rollup import compact_stats
+from app.services.sentiment import shutdown_sentiment_analyzer
+
+
+def finish_geocoding(geocode_queue: GeocodeQueue, wait: bool):
+    """Stop the geocode queue, resolving what is left if wait is set."""
+    if wait and geocode_queue.pending():
+        print(f"Geocoding {geocode_queue.pending()} unknown places...")
+    geocode_queue.close(drain=wait)
+    print(f"Geocoded {geocode_queue.resolved} places ({geocode_queue.not_found} not found).")
+    if geocode_queue.failed or not wait:
+        print("Unresolved places stay pending and are retried on the next run.")
+
+
+def compact_rollup(db):
+    """Fold rollup buckets that no time window reaches anymore."""
+    folded = compact_stats(db)
+    db.commit()
+    if folded:
+        print(f"Compacted {folded} expired stat buckets.")
+
+
+def scrape_subreddit(
+    subreddit: str,
+    limit: int,
+    time_filter: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    listing: str = NEW_LISTING,
+    wait_for_geocoding: bool = True
+):
     """Scrape a subreddit and extract location mentions."""
 
     # Initialize components
@@ -28,102 +62,122 @@ def scrape_subreddit(subreddit: str, limit: int, time_filter: str):
         print("Set REDDIT_CLIENT_ID and REDDIT_CLIENT_SECRET environment variables.")
         sys.exit(1)
 
-    extractor = get_extractor()
-    sentiment_analyzer = get_sentiment_analyzer()
+    init_db()
+    db = SessionLocal()
+    geocode_queue = GeocodeQueue().start()
+
+    try:
+        if listing == NEW_LISTING:
+            cursor = load_cursors(db).get(subreddit.lower())
+            since = f"since {cursor.fullname}" if cursor else "no cursor yet"
+            print(f"Scraping new posts from r/{subreddit} (limit: {limit}, {since})...")
+            posts = scraper.scrape_new(subreddit, cursor, limit=limit)
+        else:
+            print(f"Scraping r/{subreddit} (limit: {limit}, time_filter: {time_filter})...")
+            posts = scraper.scrape_subreddit(subreddit, limit=limit, time_filter=time_filter)
+
+        pipeline = IngestPipeline(
+            db,
+            batch_size=batch_size,
+            cursor_listing=NEW_LISTING if listing == NEW_LISTING else None,
+            geocode_queue=geocode_queue
+        )
+
+        pipeline.ingest(
+            posts,
+            on_batch=lambda p: print(f"  Processed {p.posts_processed} posts, {p.mentions_created} mentions...")
+        )
+
+        print(f"\nDone! Processed {pipeline.posts_processed} posts, created {pipeline.mentions_created} mentions.")
+        compact_rollup(db)
+
+    finally:
+        finish_geocoding(geocode_queue, wait_for_geocoding)
+        shutdown_sentiment_analyzer()
+        db.close()
+
+
+async def scrape_concurrently(
+    subreddits: list[str],
+    limit: int,
+    time_filter: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    include_comments: bool = False,
+    listing: str = NEW_LISTING,
+    wait_for_geocoding: bool = True,
+    max_comments: Optional[int] = None
+):
+    """Scrape several subreddits at once and extract location mentions."""
+
+    scraper = create_async_scraper()
+    if not scraper:
+        print("Error: Reddit API credentials not configured.")
+        print("Set REDDIT_CLIENT_ID and REDDIT_CLIENT_SECRET environment variables.")
+        sys.exit(1)
 
     init_db()
     db = SessionLocal()
+    geocode_queue = GeocodeQueue().start()
 
     try:
-        print(f"Scraping r/{subreddit} (limit: {limit}, time_filter: {time_filter})...")
-
-        posts_processed = 0
-        mentions_created = 0
-
-        for post_data in scraper.scrape_subreddit(subreddit, limit=limit, time_filter=time_filter):
-            # Check if post already exists
-            existing = db.query(Post).filter(Post.reddit_id == post_data["reddit_id"]).first()
-            if existing:
-                continue
-
-            # Combine title and body for analysis
-            text = f"{post_data['title'] or ''} {post_data['body'] or ''}".strip()
-            if not text:
-                continue
-
-            # Extract locations
-            locations = extractor.extract(text)
-            if not locations:
-                continue
-
-            # Create post
-            post = Post(
-                reddit_id=post_data["reddit_id"],
-                title=post_data["title"],
-                body=post_data["body"],
-                subreddit=post_data["subreddit"],
-                posted_at=post_data["posted_at"],
-                scraped_at=datetime.utcnow()
-            )
-            db.add(post)
-            db.flush()
-            posts_processed += 1
-
-            # Process each found location
-            for loc_name, place_type, city, lat, lng in locations:
-                # Skip locations without coordinates (would need geocoding)
-                if lat is None or lng is None:
-                    continue
-
-                # Find or create location
-                location = db.query(Location).filter(
-                    Location.name.ilike(loc_name)
-                ).first()
-
-                if not location:
-                    location = Location(
-                        name=loc_name,
-                        lat=lat,
-                        lng=lng,
-                        place_type=place_type,
-                        city=city,
-                        state="HI"
-                    )
-                    db.add(location)
-                    db.flush()
-
-                # Get context and sentiment
-                context = extractor.extract_context(text, loc_name)
-                sentiment = sentiment_analyzer.analyze(context)
-
-                # Create mention
-                mention = Mention(
-                    location_id=location.id,
-                    post_id=post.id,
-                    sentiment_score=sentiment,
-                    context=context
-                )
-                db.add(mention)
-                mentions_created += 1
-
-            # Commit periodically
-            if posts_processed % 10 == 0:
-                db.commit()
-                print(f"  Processed {posts_processed} posts, {mentions_created} mentions...")
-
-        db.commit()
-        print(f"\nDone! Processed {posts_processed} posts, created {mentions_created} mentions.")
+        names = ", ".join(f"r/{subreddit}" for subreddit in subreddits)
+        if listing == NEW_LISTING:
+            cursors = load_cursors(db)
+            print(f"Scraping new posts from {names} (limit: {limit} each)...")
+        else:
+            cursors = None
+            print(f"Scraping {names} (limit: {limit}, time_filter: {time_filter})...")
+
+        pipeline = IngestPipeline(
+            db,
+            batch_size=batch_size,
+            cursor_listing=NEW_LISTING if listing == NEW_LISTING else None,
+            geocode_queue=geocode_queue
+        )
+
+        async def flush(batch):
+            # Database work runs in a thread so fetching continues meanwhile
+            await asyncio.to_thread(pipeline.ingest_batch, batch)
+            print(f"  Processed {pipeline.posts_processed} posts, {pipeline.mentions_created} mentions...")
+
+        async with scraper:
+            batch = []
+            async for item in scraper.scrape_many(
+                subreddits,
+                limit=limit,
+                time_filter=time_filter,
+                include_comments=include_comments,
+                cursors=cursors,
+                max_comments=max_comments
+            ):
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    await flush(batch)
+                    batch = []
+            if batch:
+                await flush(batch)
+
+        print(f"\nDone! Processed {pipeline.posts_processed} posts, created {pipeline.mentions_created} mentions.")
+        compact_rollup(db)
 
     finally:
+        finish_geocoding(geocode_queue, wait_for_geocoding)
+        shutdown_sentiment_analyzer()
         db.close()
 
 
 def main():
     parser = argparse.ArgumentParser(description="Scrape Reddit for location mentions")
-    parser.add_argument(
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument(
         "--subreddit", "-s",
-        required=True,
-        help="Subreddit to scrape (without r/)"
+        action="append",
+        help="Subreddit to scrape (without r/); repeat to scrape several concurrently"
+    )
+    target.add_argument(
+        "--all-default",
+        action="store_true",
+        help="Scrape all default subreddits concurrently"
     )
     parser.add_argument(
         "--limit", "-l",
@@ -131,15 +185,62 @@ def main():
         default=100,
         help="Maximum posts to fetch (default: 100)"
     )
+    parser.add_argument(
+        "--listing",
+        choices=[NEW_LISTING, "top"],
+        default=NEW_LISTING,
+        help="new: only posts since the last run (default); top: top posts by --time-filter"
+    )
     parser.add_argument(
         "--time-filter", "-t",
         choices=["hour", "day", "week", "month", "year", "all"],
         default="week",
         help="Time filter for top posts (default: week)"
     )
+    parser.add_argument(
+        "--batch-size", "-b",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Posts written per transaction (default: {DEFAULT_BATCH_SIZE})"
+    )
+
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Use the concurrent scraper (implied by --all-default or several --subreddit)"
+    )
+    parser.add_argument(
+        "--no-geocode-wait",
+        dest="wait_for_geocoding",
+        action="store_false",
+        help="Exit without resolving queued unknown places; they resume on the next run"
+    )
+    parser.add_argument(
+        "--comments",
+        action="store_true",
+        help="Also scrape comment trees (concurrent scraper only)"
+    )
+    parser.add_argument(
+        "--max-comments",
+        type=int,
+        default=None,
+        help="Maximum comments per post with --comments (default: all)"
+    )
 
     args = parser.parse_args()
-    scrape_subreddit(args.subreddit, args.limit, args.time_filter)
+    subreddits = get_settings().default_subreddits if args.all_default else args.subreddit
+
+    if args.use_async or args.comments or len(subreddits) > 1:
+        asyncio.run(scrape_concurrently(
+            subreddits, args.limit, args.time_filter, args.batch_size, args.comments, args.listing,
+            args.wait_for_geocoding, args.max_comments
+        ))
+    else:
+        scrape_subreddit(
+            subreddits[0], args.limit, args.time_filter, args.batch_size, args.listing,
+            args.wait_for_geocoding
+        )
 
 
 if __name__ == "__main__":
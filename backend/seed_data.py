@@ -8,6 +8,8 @@ from datetime import datetime, timedelta
 
 from app.database import SessionLocal, init_db
 from app.models import Location, Post, Mention
+from app.services.data_version import bump_data_version
+from app.services.rollup import compact_stats, record_mentions
 
 # Realistic Hawaii locations
 LOCATIONS = [
@@ -185,6 +187,7 @@ def seed_database():
         # Create posts and mentions
         posts_created = 0
         mentions_created = 0
+        stats = []
 
         for location in location_objects:
             # Each location gets 5-100 mentions
@@ -221,8 +224,12 @@ def seed_database():
                     created_at=posted_at
                 )
                 db.add(mention)
+                stats.append((location.id, posted_at, sentiment))
                 mentions_created += 1
 
+        record_mentions(db, stats)
+        compact_stats(db)
+        bump_data_version(db)
         db.commit()
         print(f"Created {posts_created} posts and {mentions_created} mentions.")
         print("Database seeding complete!")
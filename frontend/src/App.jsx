@@ -10,8 +10,9 @@ function App() {
   const [timeRange, setTimeRange] = useState('all')
   const [selectedLocation, setSelectedLocation] = useState(null)
   const [searchResults, setSearchResults] = useState([])
+  const [viewport, setViewport] = useState(null)
 
-  const { locations, loading, error, refetch } = useLocations(timeRange)
+  const { locations, loading, error, refetch } = useLocations(timeRange, viewport)
 
   const handleTimeRangeChange = useCallback((newRange) => {
     setTimeRange(newRange)
@@ -57,8 +58,10 @@ function App() {
 
       <Map
         locations={locations}
+        timeRange={timeRange}
         loading={loading}
         onLocationClick={handleLocationSelect}
+        onViewportChange={setViewport}
         selectedLocation={selectedLocation}
       />
 
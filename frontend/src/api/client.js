@@ -1,28 +1,153 @@
 const API_BASE = '/api'
 
-async function fetchApi(endpoint, options = {}) {
+// Columnar binary heatmap format, see backend/app/services/heatmap_columns.py
+const HEATMAP_COLUMNS_TYPE = 'application/vnd.scrapey.heatmap-columns'
+const NO_CITY = 0xffff
+
+// Parsed responses with their ETags, oldest first, for revalidation
+const responseCache = new Map()
+// Room for the map's tile cache (see useLocations) plus other requests
+const MAX_CACHED_RESPONSES = 300
+
+/**
+ * GET an API endpoint and parse the response
+ * Responses with an ETag are kept and revalidated with If-None-Match on
+ * the next request, so unchanged data costs a 304 and no parsing.
+ * @param {string} endpoint - Path below the API base, with query string
+ * @param {object} options - fetch() options
+ * @param {function} parse - Turns the Response into data (default: JSON)
+ */
+async function fetchApi(endpoint, options = {}, parse = (response) => response.json()) {
   const url = `${API_BASE}${endpoint}`
+  const cacheKey = `${options.headers?.Accept || ''} ${url}`
+  const cached = responseCache.get(cacheKey)
 
   const response = await fetch(url, {
+    ...options,
     headers: {
       'Content-Type': 'application/json',
+      ...(cached && { 'If-None-Match': cached.etag }),
       ...options.headers,
     },
-    ...options,
   })
 
+  if (response.status === 304 && cached) {
+    // Mark as recently used
+    responseCache.delete(cacheKey)
+    responseCache.set(cacheKey, cached)
+    return cached.data
+  }
+
   if (!response.ok) {
     const error = await response.json().catch(() => ({}))
     throw new Error(error.detail || `HTTP error ${response.status}`)
   }
 
-  return response.json()
+  const data = await parse(response)
+
+  const etag = response.headers.get('ETag')
+  if (etag) {
+    responseCache.delete(cacheKey)
+    responseCache.set(cacheKey, { etag, data })
+    while (responseCache.size > MAX_CACHED_RESPONSES) {
+      responseCache.delete(responseCache.keys().next().value)
+    }
+  }
+
+  return data
+}
+
+/**
+ * Decode the columnar heatmap format
+ * Columns are typed arrays viewing the response buffer, not copies, and
+ * names are decoded lazily; use heatmapFeature() for a single point.
+ * @param {ArrayBuffer} buffer - Response body
+ * @returns {object} { count, ids, lngs, lats, counts, sentiments, placeTypes, cities, name(i) }
+ */
+export function decodeHeatmapColumns(buffer) {
+  const header = new DataView(buffer, 0, 16)
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4))
+  if (magic !== 'HMC1') {
+    throw new Error('Unknown heatmap format')
+  }
+
+  const count = header.getUint32(4, true)
+  const dictSize = header.getUint32(8, true)
+  const namesSize = header.getUint32(12, true)
+
+  const text = new TextDecoder()
+  let offset = 16
+  const dictionary = JSON.parse(
+    text.decode(new Uint8Array(buffer, offset, dictSize)).replace(/\0+$/, '')
+  )
+  offset += dictSize
+
+  // Sections are 4-byte aligned, so typed arrays can view the buffer directly
+  const column = (ArrayType) => {
+    const values = new ArrayType(buffer, offset, count)
+    offset += values.byteLength
+    return values
+  }
+  const ids = column(Uint32Array)
+  const lngs = column(Float32Array)
+  const lats = column(Float32Array)
+  const counts = column(Uint32Array)
+  const placeTypes = column(Uint16Array)
+  const cities = column(Uint16Array)
+  const sentiments = column(Int8Array)
+  offset += (4 - (count % 4)) % 4
+  const namesOffset = offset
+
+  let names = null
+  return {
+    count,
+    ids,
+    lngs,
+    lats,
+    counts,
+    // Average sentiment times 100
+    sentiments,
+    // Indexes into dictionary.place_types / dictionary.cities (NO_CITY for none)
+    placeTypes,
+    cities,
+    dictionary,
+    name(i) {
+      if (names === null) {
+        names = text.decode(new Uint8Array(buffer, namesOffset, namesSize)).split('\0')
+      }
+      return names[i]
+    },
+  }
+}
+
+/**
+ * Build the GeoJSON feature of one point of decoded heatmap columns
+ * @param {object} columns - Result of decodeHeatmapColumns()
+ * @param {number} i - Point index
+ */
+export function heatmapFeature(columns, i) {
+  const { dictionary } = columns
+  return {
+    type: 'Feature',
+    geometry: { type: 'Point', coordinates: [columns.lngs[i], columns.lats[i]] },
+    properties: {
+      id: columns.ids[i],
+      name: columns.name(i),
+      mention_count: columns.counts[i],
+      avg_sentiment: columns.sentiments[i] / 100,
+      place_type: dictionary.place_types[columns.placeTypes[i]],
+      city: columns.cities[i] === NO_CITY ? null : dictionary.cities[columns.cities[i]],
+    },
+  }
 }
 
 /**
- * Get heatmap data for all locations
+ * Get heatmap data for all locations as columns
+ * For bulk consumers of every point (the map reads clustered tiles from
+ * getHeatmapTile() instead). Requested in the columnar binary format.
  * @param {string} timeRange - 'all' | 'week' | 'day'
  * @param {object} bounds - Optional bounding box { minLat, maxLat, minLng, maxLng }
+ * @returns {object} Columns, see decodeHeatmapColumns()
  */
 export async function getHeatmapData(timeRange = 'all', bounds = null) {
   const params = new URLSearchParams({ time_range: timeRange })
@@ -34,7 +159,39 @@ export async function getHeatmapData(timeRange = 'all', bounds = null) {
     params.append('max_lng', bounds.maxLng)
   }
 
-  return fetchApi(`/heatmap?${params}`)
+  return fetchApi(
+    `/heatmap?${params}`,
+    { headers: { Accept: HEATMAP_COLUMNS_TYPE } },
+    async (response) => decodeHeatmapColumns(await response.arrayBuffer())
+  )
+}
+
+/**
+ * Get heatmap data for one XYZ map tile
+ * Below the cluster zoom, nearby locations are merged into cluster features
+ * with `cluster: true` and a `point_count`.
+ * @param {number} z - Tile zoom
+ * @param {number} x - Tile column
+ * @param {number} y - Tile row
+ * @param {string} timeRange - 'all' | 'week' | 'day'
+ */
+export async function getHeatmapTile(z, x, y, timeRange = 'all') {
+  const params = new URLSearchParams({ time_range: timeRange })
+
+  return fetchApi(`/heatmap/tiles/${z}/${x}/${y}?${params}`)
+}
+
+/**
+ * URL template of the density raster tiles, for a Mapbox raster source
+ * The server renders the heatmap density of each tile as a PNG.
+ * @param {string} timeRange - 'all' | 'week' | 'day'
+ * @param {string} weight - 'mentions' | 'sentiment'
+ */
+export function densityTileUrl(timeRange = 'all', weight = 'mentions') {
+  const params = new URLSearchParams({ time_range: timeRange, weight })
+
+  // Mapbox loads tiles outside the page context, so the URL must be absolute
+  return `${window.location.origin}${API_BASE}/heatmap/density/{z}/{x}/{y}.png?${params}`
 }
 
 /**
@@ -60,3 +217,15 @@ export async function searchLocations(query, timeRange = 'all', limit = 20) {
 export async function getLocationDetails(locationId) {
   return fetchApi(`/locations/${locationId}`)
 }
+
+/**
+ * Get an older page of a location's mentions
+ * @param {number} locationId - Location ID
+ * @param {string} cursor - `next_cursor` from the details or a previous page
+ * @param {number} limit - Mentions per page
+ */
+export async function getLocationMentions(locationId, cursor, limit = 10) {
+  const params = new URLSearchParams({ cursor, limit: limit.toString() })
+
+  return fetchApi(`/locations/${locationId}/mentions?${params}`)
+}
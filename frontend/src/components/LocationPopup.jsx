@@ -1,19 +1,24 @@
 import { useState, useEffect } from 'react'
-import { getLocationDetails } from '../api/client'
+import { getLocationDetails, getLocationMentions } from '../api/client'
 import './LocationPopup.css'
 
 function LocationPopup({ location, onClose }) {
-  const [details, setDetails] = useState(null)
   const [loading, setLoading] = useState(true)
+  const [mentions, setMentions] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   useEffect(() => {
     if (!location?.id) return
 
     const fetchDetails = async () => {
       setLoading(true)
+      setMentions([])
+      setNextCursor(null)
       try {
         const data = await getLocationDetails(location.id)
-        setDetails(data)
+        setMentions(data.recent_mentions)
+        setNextCursor(data.next_cursor)
       } catch (error) {
         console.error('Error fetching location details:', error)
       } finally {
@@ -24,6 +29,21 @@ function LocationPopup({ location, onClose }) {
     fetchDetails()
   }, [location?.id])
 
+  const loadMoreMentions = async () => {
+    if (!nextCursor || loadingMore) return
+
+    setLoadingMore(true)
+    try {
+      const page = await getLocationMentions(location.id, nextCursor)
+      setMentions((current) => [...current, ...page.mentions])
+      setNextCursor(page.next_cursor)
+    } catch (error) {
+      console.error('Error fetching mentions:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const getSentimentLabel = (score) => {
     if (score > 0.3) return { label: 'Positive', color: '#38a169' }
     if (score < -0.3) return { label: 'Negative', color: '#e53e3e' }
@@ -78,9 +98,9 @@ function LocationPopup({ location, onClose }) {
               <div className="loading-spinner" />
               Loading mentions...
             </div>
-          ) : details?.recent_mentions?.length > 0 ? (
+          ) : mentions.length > 0 ? (
             <ul className="mentions-list">
-              {details.recent_mentions.map((mention) => (
+              {mentions.map((mention) => (
                 <li key={mention.id} className="mention-item">
                   <p className="mention-context">"{mention.context}"</p>
                   <div className="mention-meta">
@@ -99,6 +119,17 @@ function LocationPopup({ location, onClose }) {
                   </div>
                 </li>
               ))}
+              {nextCursor && (
+                <li>
+                  <button
+                    className="load-more"
+                    onClick={loadMoreMentions}
+                    disabled={loadingMore}
+                  >
+                    {loadingMore ? 'Loading...' : 'Load more mentions'}
+                  </button>
+                </li>
+              )}
             </ul>
           ) : (
             <p className="no-mentions">No recent mentions found.</p>
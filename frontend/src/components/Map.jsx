@@ -1,13 +1,14 @@
 import { useEffect, useRef, useState } from 'react'
 import mapboxgl from 'mapbox-gl'
 import { useGeolocation } from '../hooks/useGeolocation'
+import { densityTileUrl } from '../api/client'
 import './Map.css'
 
 // Hawaii center coordinates
 const HAWAII_CENTER = [-157.8583, 21.3069]
 const DEFAULT_ZOOM = 7
 
-function Map({ locations, loading, onLocationClick, selectedLocation }) {
+function Map({ locations, timeRange, loading, onLocationClick, onViewportChange, selectedLocation }) {
   const mapContainer = useRef(null)
   const map = useRef(null)
   const popupRef = useRef(null)
@@ -46,8 +47,23 @@ function Map({ locations, loading, onLocationClick, selectedLocation }) {
       'top-right'
     )
 
+    // Report the visible area so only the tiles it covers are loaded
+    const reportViewport = () => {
+      const bounds = map.current.getBounds()
+      onViewportChange({
+        zoom: map.current.getZoom(),
+        west: bounds.getWest(),
+        south: bounds.getSouth(),
+        east: bounds.getEast(),
+        north: bounds.getNorth(),
+      })
+    }
+
+    map.current.on('moveend', reportViewport)
+
     map.current.on('load', () => {
       setMapLoaded(true)
+      reportViewport()
 
       // Add empty source for locations
       map.current.addSource('locations', {
@@ -55,46 +71,23 @@ function Map({ locations, loading, onLocationClick, selectedLocation }) {
         data: { type: 'FeatureCollection', features: [] },
       })
 
-      // Heatmap layer for overview
+      // Heatmap density for overview, rendered by the server as raster tiles
+      map.current.addSource('density', {
+        type: 'raster',
+        tiles: [densityTileUrl(timeRange)],
+        tileSize: 256,
+        maxzoom: 12,
+      })
+
       map.current.addLayer({
         id: 'locations-heat',
-        type: 'heatmap',
-        source: 'locations',
+        type: 'raster',
+        source: 'density',
         maxzoom: 12,
         paint: {
-          'heatmap-weight': [
-            'interpolate',
-            ['linear'],
-            ['get', 'mention_count'],
-            0, 0,
-            100, 1,
-          ],
-          'heatmap-intensity': [
-            'interpolate',
-            ['linear'],
-            ['zoom'],
-            0, 1,
-            12, 3,
-          ],
-          'heatmap-color': [
-            'interpolate',
-            ['linear'],
-            ['heatmap-density'],
-            0, 'rgba(33,102,172,0)',
-            0.2, 'rgb(103,169,207)',
-            0.4, 'rgb(209,229,240)',
-            0.6, 'rgb(253,219,199)',
-            0.8, 'rgb(239,138,98)',
-            1, 'rgb(178,24,43)',
-          ],
-          'heatmap-radius': [
-            'interpolate',
-            ['linear'],
-            ['zoom'],
-            0, 2,
-            12, 20,
-          ],
-          'heatmap-opacity': [
+          'raster-resampling': 'linear',
+          'raster-fade-duration': 0,
+          'raster-opacity': [
             'interpolate',
             ['linear'],
             ['zoom'],
@@ -146,7 +139,7 @@ function Map({ locations, loading, onLocationClick, selectedLocation }) {
         source: 'locations',
         minzoom: 12,
         layout: {
-          'text-field': ['get', 'name'],
+          'text-field': ['coalesce', ['get', 'name'], ''],
           'text-font': ['DIN Pro Medium', 'Arial Unicode MS Bold'],
           'text-size': 12,
           'text-offset': [0, 1.5],
@@ -163,6 +156,16 @@ function Map({ locations, loading, onLocationClick, selectedLocation }) {
       map.current.on('click', 'locations-point', (e) => {
         if (e.features.length > 0) {
           const feature = e.features[0]
+
+          // Zoom into clusters until they split into individual places
+          if (feature.properties.cluster) {
+            map.current.easeTo({
+              center: feature.geometry.coordinates,
+              zoom: map.current.getZoom() + 2,
+            })
+            return
+          }
+
           onLocationClick({
             id: feature.properties.id,
             name: feature.properties.name,
@@ -182,7 +185,7 @@ function Map({ locations, loading, onLocationClick, selectedLocation }) {
         if (e.features.length > 0) {
           const feature = e.features[0]
           const coords = feature.geometry.coordinates.slice()
-          const { name, mention_count, avg_sentiment } = feature.properties
+          const { name, mention_count, avg_sentiment, cluster, point_count } = feature.properties
 
           const sentimentLabel =
             avg_sentiment > 0.3 ? 'Positive' :
@@ -195,7 +198,7 @@ function Map({ locations, loading, onLocationClick, selectedLocation }) {
           })
             .setLngLat(coords)
             .setHTML(`
-              <strong>${name}</strong><br/>
+              <strong>${cluster ? `${point_count} places` : name}</strong><br/>
               ${mention_count} mentions<br/>
               Sentiment: ${sentimentLabel}
             `)
@@ -218,7 +221,17 @@ function Map({ locations, loading, onLocationClick, selectedLocation }) {
         map.current = null
       }
     }
-  }, [onLocationClick])
+  }, [onLocationClick, onViewportChange])
+
+  // Switch the density tiles to the selected time range
+  useEffect(() => {
+    if (!map.current || !mapLoaded) return
+
+    const source = map.current.getSource('density')
+    if (source) {
+      source.setTiles([densityTileUrl(timeRange)])
+    }
+  }, [timeRange, mapLoaded])
 
   // Update locations data
   useEffect(() => {
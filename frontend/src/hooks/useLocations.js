@@ -1,34 +1,122 @@
-import { useState, useEffect, useCallback } from 'react'
-import { getHeatmapData } from '../api/client'
+import { useState, useEffect, useCallback, useRef } from 'react'
+import { getHeatmapTile } from '../api/client'
 
-export function useLocations(timeRange = 'all') {
+// Server returns unclustered points from this zoom on
+const MAX_TILE_ZOOM = 13
+const MAX_CACHED_TILES = 256
+
+function lngToTileX(lng, z) {
+  return Math.floor(((lng + 180) / 360) * 2 ** z)
+}
+
+function latToTileY(lat, z) {
+  const rad = (lat * Math.PI) / 180
+  return Math.floor(
+    ((1 - Math.log(Math.tan(rad) + 1 / Math.cos(rad)) / Math.PI) / 2) * 2 ** z
+  )
+}
+
+/**
+ * List the XYZ tiles covering a viewport
+ * @param {object} viewport - { zoom, west, south, east, north }
+ */
+export function visibleTiles(viewport) {
+  const z = Math.max(0, Math.min(MAX_TILE_ZOOM, Math.floor(viewport.zoom)))
+  const clamp = (value) => Math.max(0, Math.min(2 ** z - 1, value))
+
+  const minX = clamp(lngToTileX(viewport.west, z))
+  const maxX = clamp(lngToTileX(viewport.east, z))
+  const minY = clamp(latToTileY(viewport.north, z))
+  const maxY = clamp(latToTileY(viewport.south, z))
+
+  const tiles = []
+  for (let x = minX; x <= maxX; x++) {
+    for (let y = minY; y <= maxY; y++) {
+      tiles.push({ z, x, y })
+    }
+  }
+  return tiles
+}
+
+export function useLocations(timeRange = 'all', viewport = null) {
   const [locations, setLocations] = useState(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
+  // Tile features keyed by time range and tile, least recently used first
+  const tileCache = useRef(new Map())
+  const requestId = useRef(0)
 
   const fetchLocations = useCallback(async () => {
-    setLoading(true)
+    if (!viewport) return
+
+    const currentRequest = ++requestId.current
+    const cache = tileCache.current
+    const tiles = visibleTiles(viewport)
+    const tileKey = ({ z, x, y }) => `${timeRange}/${z}/${x}/${y}`
+    const keys = tiles.map(tileKey)
+    const showTiles = () =>
+      setLocations({
+        type: 'FeatureCollection',
+        features: keys.flatMap((key) => cache.get(key) || []),
+      })
+
+    // Show cached tiles right away; all of them are revalidated below
+    const missing = keys.some((key) => !cache.has(key))
+    if (!missing) showTiles()
+
+    setLoading(missing)
     setError(null)
 
     try {
-      const data = await getHeatmapData(timeRange)
-      setLocations(data)
+      // Unchanged tiles cost a 304: fetchApi sends their ETag and returns
+      // the data it parsed before
+      let changed = false
+      await Promise.all(
+        tiles.map(async (tile, i) => {
+          const data = await getHeatmapTile(tile.z, tile.x, tile.y, timeRange)
+          if (cache.get(keys[i]) !== data.features) changed = true
+          // Re-insert, so visible tiles are the most recently used
+          cache.delete(keys[i])
+          cache.set(keys[i], data.features)
+        })
+      )
+
+      // Ignore responses for a viewport the user already moved away from
+      if (currentRequest !== requestId.current) return
+
+      if (changed) showTiles()
+
+      // Drop the least recently used tiles once the cache is full, never
+      // the ones in view
+      const visible = new Set(keys)
+      for (const key of cache.keys()) {
+        if (cache.size <= MAX_CACHED_TILES) break
+        if (!visible.has(key)) cache.delete(key)
+      }
     } catch (err) {
+      if (currentRequest !== requestId.current) return
       setError(err.message || 'Failed to fetch locations')
       console.error('Error fetching locations:', err)
     } finally {
-      setLoading(false)
+      if (currentRequest === requestId.current) {
+        setLoading(false)
+      }
     }
-  }, [timeRange])
+  }, [timeRange, viewport])
 
   useEffect(() => {
     fetchLocations()
   }, [fetchLocations])
 
+  const refetch = useCallback(() => {
+    tileCache.current.clear()
+    return fetchLocations()
+  }, [fetchLocations])
+
   return {
     locations,
     loading,
     error,
-    refetch: fetchLocations,
+    refetch,
   }
 }